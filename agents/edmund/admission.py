@@ -0,0 +1,301 @@
+"""
+Admission control for Edmund's chat endpoints.
+Chats run only while fewer than `limit` are in flight; the rest wait in a
+bounded priority queue (interactive before batch before bulk) or are
+turned away with a 503 and Retry-After:
+
+- at arrival, when the expected queue wait already exceeds the class's
+  maximum wait (shed early instead of timing out later),
+- when the queue is full and nothing of lower priority can be evicted,
+- when a queued request is not admitted within its maximum wait.
+
+The limit adapts to observed model latency per completion token (the
+gradient method of Netflix's concurrency-limits), which streams and full
+completions report alike: while it stays near its baseline the limit
+probes upwards, and when it rises because the upstream is queueing the
+limit shrinks, so excess load waits here, where it can be prioritised and
+shed, instead of at Azure OpenAI.
+
+Clients may ask for a lower class than their ceiling, never a higher one:
+callers with a validated API key may be interactive, anonymous callers
+at most anonymous_priority (ADMISSION_ANONYMOUS_PRIORITY; batch when
+EDMUND_API_KEYS is set, interactive when no caller can be identified).
+"""
+
+import os
+import math
+import heapq
+import time
+import asyncio
+import itertools
+from typing import Dict, Any, List, Optional
+
+import metrics
+
+# Priority classes, most urgent first
+PRIORITIES = ("interactive", "batch", "bulk")
+DEFAULT_PRIORITY = "interactive"
+DEFAULT_ANONYMOUS_PRIORITY = "batch"
+
+DEFAULT_INITIAL_LIMIT = 32
+DEFAULT_MIN_LIMIT = 4
+DEFAULT_MAX_LIMIT = 256
+DEFAULT_QUEUE_SIZE = 256
+
+# Longest a request of each class may wait for a slot (seconds)
+DEFAULT_MAX_WAIT = {"interactive": 0.5, "batch": 10.0, "bulk": 30.0}
+
+# Weight of a new latency sample in the recent average, and in the
+# baseline, which follows drops quickly but rises slowly so that
+# sustained upstream queueing does not become the new normal
+SHORT_ALPHA = 0.2
+BASELINE_DOWN_ALPHA = 0.05
+BASELINE_UP_ALPHA = 0.002
+# Recent latency may exceed the baseline this much before the limit shrinks
+LATENCY_TOLERANCE = 1.5
+# Share of each limit update applied (damps oscillation)
+SMOOTHING = 0.2
+# Weight of a new sample in the average time a request holds its slot
+SERVICE_ALPHA = 0.1
+
+
+class AdmissionRejected(Exception):
+    """A request was shed; the caller should answer 503 with Retry-After"""
+
+    def __init__(self, priority: str, reason: str, retry_after: float):
+        super().__init__(f"{priority} request shed ({reason})")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """An admitted request's slot; release() it once the response is finished"""
+
+    __slots__ = ("controller", "priority", "admitted_at", "latency", "released")
+
+    def __init__(self, controller: "AdmissionController", priority: str, admitted_at: float):
+        self.controller = controller
+        self.priority = priority
+        self.admitted_at = admitted_at
+        # Set by the caller to the model seconds per completion token it saw (None: no sample, e.g. a cache hit)
+        self.latency: Optional[float] = None
+        self.released = False
+
+    def release(self):
+        """Free the slot (safe to call more than once)"""
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class _Waiter:
+    __slots__ = ("rank", "seq", "priority", "future", "enqueued_at")
+
+    def __init__(self, rank: int, seq: int, priority: str, future: asyncio.Future, enqueued_at: float):
+        self.rank = rank
+        self.seq = seq
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+
+class AdmissionController:
+    """Adaptive concurrency limit in front of a bounded priority queue"""
+
+    def __init__(self, initial_limit: int = DEFAULT_INITIAL_LIMIT, min_limit: int = DEFAULT_MIN_LIMIT,
+                 max_limit: int = DEFAULT_MAX_LIMIT, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 max_wait: Optional[Dict[str, float]] = None,
+                 anonymous_priority: str = DEFAULT_ANONYMOUS_PRIORITY, clock=time.monotonic):
+        if anonymous_priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {anonymous_priority}")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.queue_size = queue_size
+        self.max_wait = dict(DEFAULT_MAX_WAIT, **(max_wait or {}))
+        self.anonymous_priority = anonymous_priority
+        self._clock = clock
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self.service_time: Optional[float] = None
+        self.admitted = 0
+        self.rejected = 0
+
+    def priority(self, requested: Optional[str], identified: bool) -> str:
+        """
+        The class a request is queued in.
+
+        Args:
+            requested: Class the client asked for (None: as urgent as allowed)
+            identified: Whether the caller sent a validated API key
+
+        Raises:
+            ValueError: If requested is not one of PRIORITIES
+        """
+        ceiling = DEFAULT_PRIORITY if identified else self.anonymous_priority
+        if requested is None:
+            return ceiling
+        if requested not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {requested}")
+        return max(requested, ceiling, key=PRIORITIES.index)
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _grant(self, priority: str) -> Ticket:
+        self.in_flight += 1
+        self.admitted += 1
+        return Ticket(self, priority, self._clock())
+
+    def expected_wait(self, priority: str) -> float:
+        """Estimated queue wait for a new request of this class (0 before any request finished)"""
+        if self.service_time is None:
+            return 0.0
+        rank = PRIORITIES.index(priority)
+        ahead = sum(1 for waiter in self._queue if waiter.rank <= rank)
+        return (ahead + 1) * self.service_time / max(int(self.limit), 1)
+
+    def _reject(self, priority: str, reason: str, retry_after: float) -> AdmissionRejected:
+        self.rejected += 1
+        metrics.ADMISSION_REJECTED.inc(priority=priority, reason=reason)
+        return AdmissionRejected(priority, reason, max(1.0, retry_after))
+
+    async def acquire(self, priority: str = DEFAULT_PRIORITY) -> Ticket:
+        """
+        Wait for a slot.
+
+        Args:
+            priority: One of PRIORITIES
+
+        Returns:
+            The ticket to release when the response is finished
+
+        Raises:
+            AdmissionRejected: If the request is shed
+        """
+        rank = PRIORITIES.index(priority)
+        # Nobody queued ahead of this class: no reason to wait
+        if self._has_slot() and not any(waiter.rank <= rank for waiter in self._queue):
+            metrics.ADMISSION_WAIT.observe(0.0, priority=priority)
+            return self._grant(priority)
+
+        expected = self.expected_wait(priority)
+        if expected > self.max_wait[priority]:
+            raise self._reject(priority, "queue_wait", expected)
+        if len(self._queue) >= self.queue_size:
+            # Make room by turning away the newest request of the lowest class below this one
+            worst = max(self._queue)
+            if worst.rank <= rank:
+                raise self._reject(priority, "queue_full", expected)
+            self._queue.remove(worst)
+            heapq.heapify(self._queue)
+            worst.future.set_exception(self._reject(worst.priority, "evicted", self.expected_wait(worst.priority)))
+
+        waiter = _Waiter(rank, next(self._seq), priority, asyncio.get_running_loop().create_future(), self._clock())
+        heapq.heappush(self._queue, waiter)
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.max_wait[priority])
+        except BaseException:
+            # Cancelled (client went away): give back a slot granted meanwhile
+            self._abandon(waiter)
+            raise
+        if not waiter.future.done():
+            self._abandon(waiter)
+            raise self._reject(priority, "timeout", self.expected_wait(priority))
+        # Raises AdmissionRejected when a more urgent request evicted this one
+        ticket = waiter.future.result()
+        metrics.ADMISSION_WAIT.observe(self._clock() - waiter.enqueued_at, priority=priority)
+        return ticket
+
+    def _abandon(self, waiter: _Waiter):
+        if waiter.future.done():
+            if not waiter.future.cancelled() and waiter.future.exception() is None:
+                waiter.future.result().release()
+            return
+        waiter.future.cancel()
+        if waiter in self._queue:
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+
+    def _release(self, ticket: Ticket):
+        self.in_flight -= 1
+        held = self._clock() - ticket.admitted_at
+        self.service_time = held if self.service_time is None else \
+            self.service_time + SERVICE_ALPHA * (held - self.service_time)
+        if ticket.latency is not None:
+            self._observe(ticket.latency)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Admit queued requests, most urgent first, while slots are free"""
+        while self._queue and self._has_slot():
+            waiter = heapq.heappop(self._queue)
+            if not waiter.future.done():
+                waiter.future.set_result(self._grant(waiter.priority))
+
+    def _observe(self, latency: float):
+        """Adjust the limit from one model latency sample"""
+        if self.short_latency is None:
+            self.short_latency = self.baseline_latency = latency
+            return
+        self.short_latency += SHORT_ALPHA * (latency - self.short_latency)
+        alpha = BASELINE_DOWN_ALPHA if latency < self.baseline_latency else BASELINE_UP_ALPHA
+        self.baseline_latency += alpha * (latency - self.baseline_latency)
+
+        # 1 while latency is near the baseline, down to 0.5 as the upstream queues
+        gradient = max(0.5, min(1.0, LATENCY_TOLERANCE * self.baseline_latency / max(self.short_latency, 1e-9)))
+        # The sqrt headroom lets the limit probe upwards
+        target = self.limit * gradient + math.sqrt(self.limit)
+        # ...but only while the current limit is actually in use
+        if target > self.limit and self.in_flight + len(self._queue) < self.limit / 2:
+            return
+        self.limit = min(self.max_limit, max(self.min_limit,
+                                             self.limit + SMOOTHING * (target - self.limit)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._queue),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "latency_seconds": self.short_latency or 0.0,
+            "baseline_latency_seconds": self.baseline_latency or 0.0
+        }
+
+
+def create_admission_controller(max_concurrency: int = DEFAULT_MAX_LIMIT,
+                                api_keys: bool = False) -> Optional[AdmissionController]:
+    """
+    Build the controller from ADMISSION_* environment variables.
+
+    Args:
+        max_concurrency: Upper bound for the adaptive limit (EDMUND_MAX_CONCURRENCY)
+        api_keys: Whether EDMUND_API_KEYS is configured; without keys every
+            caller is anonymous, so anonymous callers are not capped by default
+
+    Returns:
+        The controller, or None when ADMISSION_CONTROL=0
+    """
+    if os.getenv('ADMISSION_CONTROL', '1') == '0':
+        return None
+    max_limit = int(os.getenv('ADMISSION_MAX_LIMIT', max_concurrency))
+    anonymous_priority = DEFAULT_ANONYMOUS_PRIORITY if api_keys else DEFAULT_PRIORITY
+    return AdmissionController(
+        initial_limit=int(os.getenv('ADMISSION_INITIAL_LIMIT', min(DEFAULT_INITIAL_LIMIT, max_limit))),
+        min_limit=int(os.getenv('ADMISSION_MIN_LIMIT', DEFAULT_MIN_LIMIT)),
+        max_limit=max_limit,
+        queue_size=int(os.getenv('ADMISSION_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)),
+        anonymous_priority=os.getenv('ADMISSION_ANONYMOUS_PRIORITY', anonymous_priority),
+        max_wait={
+            priority: float(os.getenv(f'ADMISSION_MAX_WAIT_{priority.upper()}', wait))
+            for priority, wait in DEFAULT_MAX_WAIT.items()
+        }
+    )
@@ -0,0 +1,91 @@
+"""
+Registry of the T-Minus-15 agents served by this process.
+Loads every agents/<name>/agent-config.json (plus the optional agents/<name>.yml
+profile) once at startup into a read-only mapping, so a single service can
+answer for Edmund, Teddy, Pepper, Poppy, Danny and Ollie.
+"""
+
+import os
+import json
+import glob
+import logging
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGENTS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts and lists into read-only equivalents"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _load_profile(path: str) -> Dict[str, Any]:
+    """Load an agents/<name>.yml persona profile, if present"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        # PyYAML is only needed when profiles exist next to the configs
+        import yaml
+        with open(path, 'r') as f:
+            return yaml.safe_load(f) or {}
+    except Exception as e:
+        logger.warning(f"Could not load agent profile {path}: {str(e)}")
+        return {}
+
+
+def load_registry(agents_root: str = DEFAULT_AGENTS_ROOT,
+                  extra_configs: Optional[Dict[str, Dict[str, Any]]] = None) -> Mapping[str, Any]:
+    """
+    Load every agent configuration under agents_root.
+
+    Agents are keyed by the lowercase agent.name from their config. Each
+    entry is a read-only view of the agent-config.json contents with the
+    persona profile (if any) under "profile".
+
+    Args:
+        agents_root: Directory containing <name>/agent-config.json folders
+        extra_configs: Already-loaded configs to include, keyed by name
+            (e.g. the AGENT_CONFIG_PATH config when running from a copy
+            of a single agent's folder)
+
+    Returns:
+        Immutable mapping of agent name to configuration
+    """
+    agents: Dict[str, Any] = {}
+    for config_path in sorted(glob.glob(os.path.join(agents_root, '*', 'agent-config.json'))):
+        folder = os.path.basename(os.path.dirname(config_path))
+        try:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Skipping agent config {config_path}: {str(e)}")
+            continue
+        config['profile'] = _load_profile(os.path.join(agents_root, f"{folder}.yml"))
+        name = config.get('agent', {}).get('name', folder).lower()
+        agents[name] = config
+
+    for name, config in (extra_configs or {}).items():
+        agents.setdefault(name.lower(), config)
+
+    logger.info(f"Loaded {len(agents)} agents: {', '.join(sorted(agents))}")
+    return MappingProxyType({name: _freeze(config) for name, config in agents.items()})
+
+
+def describe(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """Public summary of an agent for listings"""
+    agent = config.get('agent', {})
+    return {
+        "name": agent.get('name'),
+        "displayName": agent.get('displayName'),
+        "description": agent.get('description'),
+        "model": config.get('model', {}).get('modelName'),
+        "tags": list(agent.get('tags', ())),
+        "introduction": (config.get('profile') or {}).get('introduction', '').strip() or None
+    }
@@ -0,0 +1,214 @@
+"""
+Validated, precompiled agent configuration for Edmund's scoring engine.
+agent-config.json is checked against agent-config.schema.json once, when
+it is loaded, and compiled into a frozen AgentSnapshot holding everything
+a request needs (model parameters, prompt assembler, response metadata),
+so requests never walk the raw config. A ConfigWatcher swaps in a new
+snapshot when the file changes; invalid edits are rejected and the
+previous snapshot stays in service.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Callable, List, Mapping, NamedTuple, Optional, Tuple
+
+from agent_registry import _freeze
+from prompt_assembler import PromptAssembler
+from response_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+# Retrieval defaults when knowledge-sources.json does not override them
+DEFAULT_RETRIEVAL_TOP_K = 5
+DEFAULT_CONTEXT_WINDOW_SIZE = 4000
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agent-config.schema.json')
+DEFAULT_RELOAD_INTERVAL = 5.0
+
+
+class ConfigError(ValueError):
+    """An agent configuration that does not match the schema"""
+
+    def __init__(self, source: str, errors: List[str]):
+        super().__init__(f"Invalid agent configuration {source}: {'; '.join(errors)}")
+        self.errors = errors
+
+
+class AgentSnapshot(NamedTuple):
+    """Everything the request path reads from one agent's configuration"""
+    name: str
+    display_name: str
+    version: str
+    model: str
+    # Completion parameters passed to chat.completions.create
+    model_params: Mapping[str, Any]
+    max_tokens: int
+    # model.fallbackModels, tried in order when the model is unavailable
+    fallback_models: Tuple[str, ...]
+    # "agent" block of every response
+    agent_info: Mapping[str, str]
+    assembler: PromptAssembler
+    # Enabled entries of the config's "tools"
+    tools: Tuple[Mapping[str, Any], ...]
+    # Semantic cache partition: same system prompt and parameters
+    semantic_scope: str
+    config: Mapping[str, Any]
+
+
+@lru_cache(maxsize=1)
+def load_schema(path: str = SCHEMA_PATH) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def validate_config(config: Mapping[str, Any]) -> List[str]:
+    """
+    Check an agent configuration against agent-config.schema.json.
+
+    Returns:
+        Error messages prefixed with the offending path (empty when valid)
+    """
+    # jsonschema is only needed while (re)loading a configuration
+    import jsonschema
+
+    validator = jsonschema.Draft7Validator(load_schema())
+    errors = sorted(validator.iter_errors(_thaw(config)), key=lambda e: list(e.absolute_path))
+    return [f"{'.'.join(str(p) for p in e.absolute_path) or '<root>'}: {e.message}" for e in errors]
+
+
+def _thaw(value: Any) -> Any:
+    """Plain dicts and lists from a frozen config (for validation and JSON)"""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def compile_snapshot(config: Mapping[str, Any]) -> AgentSnapshot:
+    """Precompute the request-path view of an (already validated) configuration"""
+    config = _thaw(config)
+    agent = config.get('agent', {})
+    model_config = config.get('model', {})
+    model_params = {
+        "model": model_config.get('modelName', 'gpt-4o'),
+        "temperature": model_config.get('temperature', 0.1),
+        "max_tokens": model_config.get('maxTokens', 4096),
+        "top_p": model_config.get('topP', 0.95),
+        "frequency_penalty": model_config.get('frequencyPenalty', 0),
+        "presence_penalty": model_config.get('presencePenalty', 0)
+    }
+    system_prompt = config.get('instructions', {}).get('systemPrompt', '')
+    return AgentSnapshot(
+        name=agent.get('name', 'Edmund'),
+        display_name=agent.get('displayName', 'Edmund (the Engineer)'),
+        version=agent.get('version', '1.0.0'),
+        model=model_params['model'],
+        model_params=MappingProxyType(model_params),
+        max_tokens=model_params['max_tokens'],
+        fallback_models=tuple(model_config.get('fallbackModels', ())),
+        agent_info=MappingProxyType({
+            "name": agent.get('name', 'Edmund'),
+            "displayName": agent.get('displayName', 'Edmund (the Engineer)'),
+            "version": agent.get('version', '1.0.0')
+        }),
+        assembler=PromptAssembler(config),
+        tools=tuple(_freeze(tool) for tool in config.get('tools', []) if tool.get('enabled', True)),
+        semantic_scope=cache_key([{"role": "system", "content": system_prompt}], model_params),
+        config=_freeze(config)
+    )
+
+
+class RetrievalSettings(NamedTuple):
+    """What the request path reads from knowledge-sources.json's searchConfiguration"""
+    top_k: int
+    context_window_size: int
+    source_attribution: bool
+
+
+def compile_retrieval_settings(search_config: Mapping[str, Any]) -> RetrievalSettings:
+    """
+    Resolve the retrieval settings once, when the knowledge sources are loaded.
+
+    KNOWLEDGE_TOP_K caps searchConfiguration.maxResults.
+    """
+    return RetrievalSettings(
+        top_k=min(int(os.getenv('KNOWLEDGE_TOP_K', DEFAULT_RETRIEVAL_TOP_K)),
+                  int(search_config.get('maxResults', DEFAULT_RETRIEVAL_TOP_K))),
+        context_window_size=int(search_config.get('contextWindowSize', DEFAULT_CONTEXT_WINDOW_SIZE)),
+        source_attribution=bool(search_config.get('sourceAttribution', True))
+    )
+
+
+def load_snapshot(path: str) -> Tuple[Dict[str, Any], AgentSnapshot]:
+    """
+    Read, validate and compile an agent-config.json.
+
+    Returns:
+        (raw configuration, snapshot)
+
+    Raises:
+        ConfigError: If the configuration does not match the schema
+        OSError, json.JSONDecodeError: If the file cannot be read
+    """
+    with open(path, 'r') as f:
+        config = json.load(f)
+    errors = validate_config(config)
+    if errors:
+        raise ConfigError(path, errors)
+    return config, compile_snapshot(config)
+
+
+def compile_registry(registry: Mapping[str, Mapping[str, Any]]) -> Mapping[str, AgentSnapshot]:
+    """Snapshots of every registered agent; invalid configs are served but logged"""
+    snapshots = {}
+    for name, config in registry.items():
+        errors = validate_config(config)
+        if errors:
+            logger.warning(f"Agent {name} config does not match the schema: {'; '.join(errors)}")
+        snapshots[name] = compile_snapshot(config)
+    return MappingProxyType(snapshots)
+
+
+class ConfigWatcher:
+    """Reloads an agent-config.json when its modification time or size changes"""
+
+    def __init__(self, path: str, on_change: Callable[[Dict[str, Any], AgentSnapshot], None],
+                 interval: float = DEFAULT_RELOAD_INTERVAL):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._signature = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """Reload if the file changed; returns whether a new snapshot was installed"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            config, snapshot = load_snapshot(self.path)
+        except (OSError, ValueError) as e:
+            # ConfigError and JSONDecodeError are both ValueErrors
+            logger.error(f"Keeping the current agent configuration: {str(e)}")
+            return False
+        self.on_change(config, snapshot)
+        logger.info(f"Reloaded agent configuration from {self.path}")
+        return True
+
+    async def run(self):
+        """Poll for changes until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            self.check()
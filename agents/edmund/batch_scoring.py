@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Bulk scoring for Edmund: run a JSONL file of requests through the scoring
+engine (regression suites, document reviews) and write one JSONL result
+per request, in input order. Progress is checkpointed so an interrupted
+run resumes where it stopped.
+
+    python batch_scoring.py requests.jsonl results.jsonl --concurrency 32
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from itertools import islice
+from typing import Dict, Any, Iterator, Optional
+
+import scoring
+import fast_json
+from knowledge_index import atomic_write
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_EVERY = 100
+
+
+def read_requests(path: str) -> Iterator[str]:
+    """Non-blank lines of a JSONL file, read lazily"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    atomic_write(path, lambda f: json.dump(checkpoint, f))
+
+
+async def score_file(input_path: str, output_path: str, checkpoint_path: Optional[str] = None,
+                     concurrency: int = scoring.DEFAULT_BATCH_CONCURRENCY,
+                     checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY) -> Dict[str, Any]:
+    """
+    Score every request in a JSONL file.
+
+    Results are appended to output_path as they complete (in input order).
+    Every checkpoint_every results the output is flushed to disk and the
+    number of completed requests and the output size are recorded in the
+    checkpoint; on restart the output is cut back to the last checkpoint
+    and scoring continues with the next request. The checkpoint is removed
+    once the whole file has been scored.
+
+    Returns:
+        Run statistics including requests and tokens per second
+    """
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint"
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is not None and checkpoint.get('input') != os.path.abspath(input_path):
+        raise ValueError(f"{checkpoint_path} belongs to {checkpoint.get('input')}, not {input_path}")
+    checkpoint = checkpoint or {"input": os.path.abspath(input_path), "completed": 0, "offset": 0}
+    resumed_from = checkpoint['completed']
+    if resumed_from:
+        logger.info(f"Resuming after {resumed_from} completed requests")
+    else:
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    requests = islice(read_requests(input_path), resumed_from, None)
+    scored = tokens = errors = 0
+    started = time.perf_counter()
+    with open(output_path, 'ab') as output:
+        # Drop results written after the last checkpoint; they are scored again
+        output.truncate(checkpoint['offset'])
+        async for result in scoring.run_batch(requests, concurrency):
+            output.write(fast_json.dumps_bytes(result) + b'\n')
+            scored += 1
+            if 'error' in result:
+                errors += 1
+            else:
+                tokens += ((result.get('model') or {}).get('usage') or {}).get('total_tokens', 0)
+            if scored % checkpoint_every == 0:
+                output.flush()
+                os.fsync(output.fileno())
+                checkpoint.update(completed=resumed_from + scored, offset=output.tell())
+                save_checkpoint(checkpoint_path, checkpoint)
+                elapsed = time.perf_counter() - started
+                logger.info(f"{resumed_from + scored} requests scored ({scored / elapsed:.1f} req/s)")
+        output.flush()
+        os.fsync(output.fileno())
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": scored,
+        "resumed_from": resumed_from,
+        "errors": errors,
+        "tokens": tokens,
+        "elapsed_seconds": elapsed,
+        "requests_per_second": scored / elapsed if elapsed else 0.0,
+        "tokens_per_second": tokens / elapsed if elapsed else 0.0
+    }
+
+
+async def _main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        return await score_file(args.input, args.output, args.checkpoint,
+                                args.concurrency, args.checkpoint_every)
+    finally:
+        await scoring.shutdown_async()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Score a JSONL file of requests with Edmund")
+    parser.add_argument('input', help='JSONL file with one scoring request per line')
+    parser.add_argument('output', help='JSONL file to write results to (appended on resume)')
+    parser.add_argument('--concurrency', type=int, default=scoring.DEFAULT_BATCH_CONCURRENCY)
+    parser.add_argument('--checkpoint', help='Checkpoint file (defaults to <output>.checkpoint)')
+    parser.add_argument('--checkpoint-every', type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                        help='Results between checkpoints')
+    parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and start over')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    checkpoint = args.checkpoint or f"{args.output}.checkpoint"
+    if args.restart:
+        for path in (checkpoint, args.output):
+            if os.path.exists(path):
+                os.remove(path)
+    elif os.path.exists(args.output) and not os.path.exists(checkpoint):
+        print(f"⚠️ {args.output} exists without a checkpoint; use --restart to overwrite it")
+        return 1
+
+    scoring.init()
+    stats = asyncio.run(_main_async(args))
+    print(f"✅ Scored {stats['requests']} requests ({stats['errors']} errors) "
+          f"in {stats['elapsed_seconds']:.2f}s")
+    print(f"⏱️ {stats['requests_per_second']:.1f} requests/s, {stats['tokens_per_second']:.0f} tokens/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for Edmund's API.
+Starts fake_openai_server.py and main.py locally (no Azure credentials or
+quota), drives /chat at fixed concurrency levels (closed loop) and fixed
+request rates (open loop), and reports latency percentiles, time to first
+token, throughput and server memory. Results are written as JSON so runs
+on different commits can be compared.
+
+    python benchmark.py --concurrency 1,8,32 --rps 20,50 --duration 20s --output bench.json
+    python benchmark.py --compare bench.json --output bench-new.json
+
+--serialization instead measures, in process, the JSON work each request
+does (decode the request, encode the cache key and the response) with the
+standard library and with fast_json, on transcripts of growing size.
+
+    python benchmark.py --serialization --turns 10,100,1000
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+import fast_json
+from config_units import parse_duration
+
+DEFAULT_FAKE_PORT = 8081
+DEFAULT_SERVER_PORT = 8090
+STARTUP_TIMEOUT = 60.0
+
+PROMPTS = [
+    "How do I set up a CI/CD pipeline for a containerized service?",
+    "What belongs in step 9 of T-Minus-15?",
+    "Review this deployment strategy for zero downtime.",
+    "How should we structure infrastructure as code for three environments?"
+]
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (p in 0-100), None for no samples"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Latency percentiles, time to first token and throughput of one load level"""
+    ok = [s for s in samples if s['ok']]
+    latencies = [s['latency'] for s in ok]
+    first_tokens = [s['first_token'] for s in ok if s.get('first_token') is not None]
+    tokens = sum(s.get('tokens', 0) for s in ok)
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "elapsed_seconds": elapsed,
+        "requests_per_second": len(ok) / elapsed if elapsed else 0.0,
+        "tokens_per_second": tokens / elapsed if elapsed else 0.0,
+        "latency_seconds": {f"p{p}": percentile(latencies, p) for p in (50, 95, 99)},
+        "first_token_seconds": {f"p{p}": percentile(first_tokens, p) for p in (50, 95, 99)}
+    }
+
+
+async def send_request(client: httpx.AsyncClient, prompt: str, stream: bool) -> Dict[str, Any]:
+    """One /chat call; streaming calls also time the first token frame"""
+    started = time.perf_counter()
+    sample: Dict[str, Any] = {"ok": False, "first_token": None, "tokens": 0}
+    try:
+        if not stream:
+            response = await client.post("/chat", json={"message": prompt})
+            sample['ok'] = response.status_code == 200
+            if sample['ok']:
+                sample['tokens'] = (response.json().get('usage') or {}).get('total_tokens', 0)
+        else:
+            async with client.stream("POST", "/chat", json={"message": prompt, "stream": True}) as response:
+                event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[7:]
+                        if event == "token" and sample['first_token'] is None:
+                            sample['first_token'] = time.perf_counter() - started
+                    elif line.startswith("data: ") and event == "done":
+                        sample['ok'] = response.status_code == 200
+                        sample['tokens'] = (json.loads(line[6:]).get('usage') or {}).get('total_tokens', 0)
+    except httpx.HTTPError as e:
+        sample['error'] = str(e)
+    sample['latency'] = time.perf_counter() - started
+    return sample
+
+
+async def run_concurrency(client: httpx.AsyncClient, concurrency: int, duration: float,
+                          stream: bool = True) -> Dict[str, Any]:
+    """Closed loop: `concurrency` workers each send requests back to back for `duration`"""
+    samples: List[Dict[str, Any]] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        i = 0
+        while time.perf_counter() < deadline:
+            prompt = f"{PROMPTS[i % len(PROMPTS)]} (worker {worker_id}, request {i})"
+            samples.append(await send_request(client, prompt, stream))
+            i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(w) for w in range(concurrency)])
+    return dict(summarize(samples, time.perf_counter() - started), concurrency=concurrency)
+
+
+async def run_rate(client: httpx.AsyncClient, rps: float, duration: float,
+                   stream: bool = True) -> Dict[str, Any]:
+    """Open loop: start requests at a fixed rate whether or not earlier ones finished"""
+    tasks = []
+    started = time.perf_counter()
+    for i in range(max(1, int(rps * duration))):
+        delay = started + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        prompt = f"{PROMPTS[i % len(PROMPTS)]} (request {i})"
+        tasks.append(asyncio.ensure_future(send_request(client, prompt, stream)))
+    samples = await asyncio.gather(*tasks)
+    return dict(summarize(samples, time.perf_counter() - started), target_rps=rps)
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process (Linux /proc), None where unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+async def sample_memory(pid: int, peaks: Dict[str, int], interval: float = 0.2):
+    """Track the server's peak RSS until cancelled"""
+    while True:
+        rss = rss_bytes(pid)
+        if rss is not None:
+            peaks['peak'] = max(peaks.get('peak', 0), rss)
+        await asyncio.sleep(interval)
+
+
+def _benchmark_config(path: str) -> str:
+    """Copy of the agent config with rate limiting off, so the limiter does not cap the load"""
+    with open(path, 'r') as f:
+        config = json.load(f)
+    config.setdefault('security', {})['rateLimiting'] = {"enabled": False}
+    config.pop('upstreams', None)
+    handle, copy_path = tempfile.mkstemp(prefix='edmund-bench-', suffix='.json')
+    with os.fdopen(handle, 'w') as f:
+        json.dump(config, f)
+    return copy_path
+
+
+def start_servers(args: argparse.Namespace, config_path: str) -> List[subprocess.Popen]:
+    """Start the fake model server and main.py; returns [fake, server]"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(here, 'fake_openai_server.py'), '--port', str(args.fake_port),
+        '--latency', args.latency, '--token-latency', args.token_latency
+    ])
+    env = dict(
+        os.environ,
+        AZURE_OPENAI_ENDPOINT=f"http://127.0.0.1:{args.fake_port}",
+        AZURE_OPENAI_API_KEY="fake",
+        AGENT_CONFIG_PATH=config_path,
+        KNOWLEDGE_SOURCES_PATH=args.knowledge_sources or '',
+        PORT=str(args.port)
+    )
+    server = subprocess.Popen([sys.executable, os.path.join(here, 'main.py')], env=env, cwd=here,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return [fake, server]
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = STARTUP_TIMEOUT) -> float:
+    """Poll /health until the server answers; returns the seconds it took"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise TimeoutError(f"Server not ready after {timeout:.0f}s")
+
+
+async def run_benchmark(client: httpx.AsyncClient, concurrency_levels: List[int], rates: List[float],
+                        duration: float, stream: bool = True, pid: Optional[int] = None) -> Dict[str, Any]:
+    """Run every load level in turn against an already running server"""
+    results: Dict[str, Any] = {"concurrency": [], "rate": []}
+    memory: Dict[str, int] = {}
+    sampler = asyncio.ensure_future(sample_memory(pid, memory)) if pid else None
+    if pid:
+        results['memory_bytes'] = {"idle": rss_bytes(pid)}
+    try:
+        # Warm up connections and lazy initialization outside the measurements
+        await asyncio.gather(*[send_request(client, PROMPTS[0], stream) for _ in range(4)])
+        for concurrency in concurrency_levels:
+            results['concurrency'].append(await run_concurrency(client, concurrency, duration, stream))
+        for rps in rates:
+            results['rate'].append(await run_rate(client, rps, duration, stream))
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+    if pid:
+        results['memory_bytes'].update(peak=memory.get('peak'), final=rss_bytes(pid))
+    return results
+
+
+def make_transcript(turns: int) -> List[Dict[str, Any]]:
+    """A conversation of `turns` alternating messages of about 1KB each"""
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{PROMPTS[i % len(PROMPTS)]} " * 16}
+        for i in range(turns)
+    ]
+
+
+def _per_call(fn, repeat: int) -> float:
+    """Mean seconds per call of fn() over `repeat` calls"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def serialization_benchmark(turns_levels: List[int], repeat: int = 200) -> List[Dict[str, Any]]:
+    """
+    Time the JSON work of one request per transcript size: decoding the
+    request, encoding the sorted cache key payload and encoding the response.
+
+    Returns:
+        Per size: request bytes and seconds per request for the standard
+        library and for fast_json (whose backend is reported)
+    """
+    results = []
+    for turns in turns_levels:
+        messages = make_transcript(turns)
+        raw = json.dumps({"messages": messages})
+        result = {
+            "response": PROMPTS[0] * 20,
+            "agent": {"name": "Edmund", "displayName": "Edmund (the Engineer)", "version": "1.0.0"},
+            "model": {
+                "name": "gpt-4o",
+                "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30}
+            }
+        }
+
+        def stdlib():
+            data = json.loads(raw)
+            json.dumps({"messages": data['messages'], "params": {"model": "gpt-4o"}},
+                       sort_keys=True, separators=(',', ':')).encode('utf-8')
+            json.dumps(result)
+
+        def fast():
+            data = fast_json.loads(raw)
+            fast_json.dumps_bytes({"messages": data['messages'], "params": {"model": "gpt-4o"}}, sort_keys=True)
+            fast_json.dumps(result)
+
+        # Fewer repetitions for large transcripts keep each level around a second
+        level_repeat = max(5, repeat * 10 // max(turns, 10))
+        results.append({
+            "turns": turns,
+            "request_bytes": len(raw),
+            "stdlib_seconds": _per_call(stdlib, level_repeat),
+            "fast_seconds": _per_call(fast, level_repeat),
+            "backend": fast_json.BACKEND
+        })
+    return results
+
+
+def print_serialization_report(results: List[Dict[str, Any]]):
+    """Human readable summary of serialization_benchmark()"""
+    for level in results:
+        saved = level['stdlib_seconds'] - level['fast_seconds']
+        print(f"{level['turns']:>6} turns ({level['request_bytes'] / 1024:.0f}KB): "
+              f"json {level['stdlib_seconds'] * 1000:.3f}ms  "
+              f"{level['backend']} {level['fast_seconds'] * 1000:.3f}ms  "
+              f"⏱️ {level['stdlib_seconds'] / level['fast_seconds']:.1f}x, "
+              f"saves {saved * 1000:.3f}ms per request")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:.0f}ms" if seconds is not None else "-"
+
+
+def _print_level(label: str, level: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    latency = level['latency_seconds']
+    line = (f"{label:>12}: {level['requests_per_second']:7.1f} req/s  "
+            f"p50 {_ms(latency['p50'])}  p95 {_ms(latency['p95'])}  p99 {_ms(latency['p99'])}  "
+            f"ttft p50 {_ms(level['first_token_seconds']['p50'])}  errors {level['errors']}")
+    if baseline is not None and baseline['latency_seconds']['p95'] and latency['p95']:
+        change = latency['p95'] / baseline['latency_seconds']['p95'] - 1
+        marker = "⚠️" if change > 0.1 else "✅"
+        line += f"  {marker} p95 {change:+.0%} vs baseline"
+    print(line)
+
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    """Human readable summary, optionally against a previous run's JSON"""
+    for kind, key, unit in (("concurrency", "concurrency", ""), ("rate", "target_rps", " rps")):
+        previous = {b[key]: b for b in (baseline or {}).get(kind, [])}
+        for level in results.get(kind, []):
+            _print_level(f"{kind[0]}={level[key]}{unit}", level, previous.get(level[key]))
+    memory = results.get('memory_bytes') or {}
+    if memory.get('peak'):
+        print(f"🧠 Server memory: idle {memory['idle'] / 2**20:.0f}MB, peak {memory['peak'] / 2**20:.0f}MB")
+
+
+async def _main_async(args: argparse.Namespace, pid: Optional[int]) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url or f"http://127.0.0.1:{args.port}",
+                                 limits=limits, timeout=120.0) as client:
+        startup = await wait_until_ready(client)
+        results = await run_benchmark(
+            client,
+            [int(c) for c in args.concurrency.split(',') if c],
+            [float(r) for r in args.rps.split(',') if r],
+            parse_duration(args.duration),
+            stream=not args.no_stream,
+            pid=pid
+        )
+        results['startup_seconds'] = startup if pid else None
+        return results
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark Edmund's API against a fake model server")
+    parser.add_argument('--concurrency', default='1,8,32', help='Closed-loop concurrency levels')
+    parser.add_argument('--rps', default='10,50', help='Open-loop request rates (empty to skip)')
+    parser.add_argument('--duration', default='15s', help='Time spent at each level')
+    parser.add_argument('--latency', default='200ms', help='Fake model latency before the first token')
+    parser.add_argument('--token-latency', default='10ms', help='Fake model delay per token')
+    parser.add_argument('--no-stream', action='store_true', help='Use JSON responses instead of SSE')
+    parser.add_argument('--port', type=int, default=DEFAULT_SERVER_PORT)
+    parser.add_argument('--fake-port', type=int, default=DEFAULT_FAKE_PORT)
+    parser.add_argument('--knowledge-sources', help='knowledge-sources.json to load (none by default)')
+    parser.add_argument('--url', help='Benchmark an already running server instead of starting one')
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    parser.add_argument('--serialization', action='store_true',
+                        help='Only measure per-request JSON encoding and decoding (no servers)')
+    parser.add_argument('--turns', default='10,100,1000', help='Transcript sizes for --serialization')
+    args = parser.parse_args()
+
+    if args.serialization:
+        results = serialization_benchmark([int(t) for t in args.turns.split(',') if t])
+        print_serialization_report(results)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({"commit": _git_commit(), "serialization": results}, f, indent=2)
+            print(f"✅ Results written to {args.output}")
+        return 0
+
+    config_path = None if args.url else _benchmark_config(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agent-config.json')
+    )
+    processes = start_servers(args, config_path) if config_path else []
+    try:
+        pid = processes[1].pid if processes else None
+        results = asyncio.run(_main_async(args, pid))
+    except TimeoutError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+        if config_path:
+            os.remove(config_path)
+
+    results.update(
+        commit=_git_commit(),
+        parameters={k: v for k, v in vars(args).items() if k not in ('output', 'compare')}
+    )
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        print(f"Comparing with {args.compare} (commit {baseline.get('commit')})")
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Parsing helpers for the human-readable values used in Edmund's JSON configs,
+such as durations ("30s", "5m", "1h") and sizes ("10MB", "100MB").
+"""
+
+import re
+from typing import Union
+
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+SIZE_UNITS = {"b": 1, "kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3}
+
+VALUE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*$')
+
+
+def _split(value: str, default_unit: str):
+    match = VALUE_PATTERN.match(value)
+    if match is None:
+        raise ValueError(f"Invalid value: {value!r}")
+    return float(match.group(1)), (match.group(2) or default_unit).lower()
+
+
+def parse_duration(value: Union[str, int, float]) -> float:
+    """Convert "500ms", "30s", "5m", "1h" or "1d" (or a number of seconds) to seconds"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    number, unit = _split(value, "s")
+    if unit not in DURATION_UNITS:
+        raise ValueError(f"Unknown duration unit in {value!r}")
+    return number * DURATION_UNITS[unit]
+
+
+def parse_size(value: Union[str, int]) -> int:
+    """Convert "512KB", "10MB" or "1GB" (or a number of bytes) to bytes"""
+    if isinstance(value, int):
+        return value
+    number, unit = _split(value, "b")
+    if unit not in SIZE_UNITS:
+        raise ValueError(f"Unknown size unit in {value!r}")
+    return int(number * SIZE_UNITS[unit])
@@ -0,0 +1,297 @@
+"""
+Server-side conversation memory for Edmund (features.memoryEnabled /
+features.conversationHistory in agent-config.json).
+Clients send a session_id and only the new turn; earlier turns are kept
+here as compact records, and once a session outgrows its token budget the
+oldest turns are folded into a running summary.
+
+Session ids are random tokens issued by the server (new_session_id), so
+they cannot be guessed; ids the server never issued are rejected with
+SessionNotFoundError. A session also belongs to the caller that started
+it (the digest of its API key, or None for anonymous callers), and
+loading it as anyone else raises SessionOwnerError.
+"""
+
+import os
+import json
+import time
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from prompt_assembler import count_tokens, message_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS = 10000
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+# Random bytes in an issued session id (24 url-safe characters)
+SESSION_ID_BYTES = 18
+
+
+def new_session_id() -> str:
+    """An unguessable id for a new session"""
+    return secrets.token_urlsafe(SESSION_ID_BYTES)
+
+
+class SessionNotFoundError(LookupError):
+    """The session was never issued, or has been evicted"""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Unknown session {session_id}")
+        self.session_id = session_id
+
+
+class SessionOwnerError(PermissionError):
+    """The session was started by a different caller"""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Session {session_id} belongs to another caller")
+        self.session_id = session_id
+
+
+class Conversation:
+    """
+    One session: its owner, a running summary and the turns not yet
+    summarized.
+
+    Turns are stored as [role, content, tokens] lists so a session
+    serializes to a small JSON document.
+    """
+
+    __slots__ = ("summary", "turns", "owner")
+
+    def __init__(self, summary: str = '', turns: Optional[List[list]] = None, owner: Optional[str] = None):
+        self.summary = summary
+        self.turns = turns or []
+        self.owner = owner
+
+    @property
+    def tokens(self) -> int:
+        summary_tokens = count_tokens(self.summary) if self.summary else 0
+        return summary_tokens + sum(turn[2] for turn in self.turns)
+
+    def messages(self) -> List[Dict[str, Any]]:
+        """The history as chat messages, summary first"""
+        history = [{"role": "system", "content": SUMMARY_PREFIX + self.summary}] if self.summary else []
+        return history + [{"role": role, "content": content} for role, content, _ in self.turns]
+
+    def to_json(self) -> str:
+        return json.dumps({"owner": self.owner, "summary": self.summary, "turns": self.turns},
+                          separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, payload: str) -> 'Conversation':
+        data = json.loads(payload)
+        return cls(data.get('summary', ''), data.get('turns', []), data.get('owner'))
+
+
+class ConversationStore:
+    """
+    In-process store of conversations, least recently used first out.
+
+    Subclasses only replace _load/_save/_delete to change where sessions
+    are kept; budgeting and summarization bookkeeping are shared.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _load(self, session_id: str) -> Optional[Conversation]:
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation is not None:
+                self._sessions.move_to_end(session_id)
+            return conversation
+
+    def _save(self, session_id: str, conversation: Conversation):
+        with self._lock:
+            self._sessions[session_id] = conversation
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _load_owned(self, session_id: str, owner: Optional[str]) -> Optional[Conversation]:
+        """Load a session on behalf of a caller, checking that the caller started it"""
+        conversation = self._load(session_id)
+        if conversation is not None and conversation.owner != owner:
+            raise SessionOwnerError(session_id)
+        return conversation
+
+    def check(self, session_id: str, owner: Optional[str] = None):
+        """
+        Make sure a session a client wants to continue exists and is the caller's.
+
+        Raises:
+            SessionNotFoundError: If the session does not exist
+            SessionOwnerError: If the session belongs to another caller
+        """
+        if self._load_owned(session_id, owner) is None:
+            raise SessionNotFoundError(session_id)
+
+    def history(self, session_id: str, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Messages to send before the new turn (empty for a new session).
+
+        Raises:
+            SessionOwnerError: If the session belongs to another caller
+        """
+        conversation = self._load_owned(session_id, owner)
+        return conversation.messages() if conversation is not None else []
+
+    def append(self, session_id: str, messages: List[Dict[str, Any]], owner: Optional[str] = None) -> int:
+        """
+        Record new turns; a new session is bound to owner.
+
+        Returns:
+            The session's approximate token count afterwards
+
+        Raises:
+            SessionOwnerError: If the session belongs to another caller
+        """
+        conversation = self._load_owned(session_id, owner) or Conversation(owner=owner)
+        conversation.turns.extend(
+            [m.get('role'), m.get('content'), message_tokens(m)] for m in messages
+        )
+        self._save(session_id, conversation)
+        return conversation.tokens
+
+    def turns_to_fold(self, session_id: str, token_budget: int) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Pick the oldest turns to summarize once a session exceeds its budget.
+
+        Turns are folded until the remaining ones fit in half the budget,
+        so a session is summarized at most once per half-budget of new
+        conversation. The latest turn is always kept verbatim.
+
+        Returns:
+            (current summary, turns to fold); no turns when within budget
+        """
+        conversation = self._load(session_id)
+        if conversation is None or conversation.tokens <= token_budget:
+            return '', []
+
+        remaining = sum(turn[2] for turn in conversation.turns)
+        count = 0
+        while count < len(conversation.turns) - 1 and remaining > token_budget // 2:
+            remaining -= conversation.turns[count][2]
+            count += 1
+        folded = [{"role": role, "content": content} for role, content, _ in conversation.turns[:count]]
+        return conversation.summary, folded
+
+    def apply_summary(self, session_id: str, summary: str, folded: int):
+        """Replace the oldest `folded` turns of a session with a new summary"""
+        conversation = self._load(session_id)
+        if conversation is None:
+            return
+        conversation.summary = summary
+        del conversation.turns[:folded]
+        self._save(session_id, conversation)
+
+    def clear(self, session_id: str):
+        """Forget a session"""
+        self._delete(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "sessions": len(self), "max_sessions": self.max_sessions}
+
+
+class SqliteConversationStore(ConversationStore):
+    """
+    Conversations persisted in a SQLite file, so sessions survive restarts.
+
+    Each session is one row holding its JSON document; the least recently
+    used rows are deleted beyond max_sessions.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        # Imported lazily so the in-memory store (and memory off) has no sqlite3 import
+        import sqlite3
+
+        super().__init__(max_sessions)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "session_id TEXT PRIMARY KEY, document TEXT NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS conversations_accessed ON conversations (accessed)")
+        self._count = self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _load(self, session_id: str) -> Optional[Conversation]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT document FROM conversations WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE conversations SET accessed = ? WHERE session_id = ?", (time.time(), session_id)
+            )
+        return Conversation.from_json(row[0])
+
+    def _save(self, session_id: str, conversation: Conversation):
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE conversations SET document = ?, accessed = ? WHERE session_id = ?",
+                (conversation.to_json(), time.time(), session_id)
+            ).rowcount
+            if not updated:
+                self._db.execute(
+                    "INSERT INTO conversations (session_id, document, accessed) VALUES (?, ?, ?)",
+                    (session_id, conversation.to_json(), time.time())
+                )
+                self._count += 1
+            if self._count > self.max_sessions:
+                self._db.execute(
+                    "DELETE FROM conversations WHERE session_id IN ("
+                    "SELECT session_id FROM conversations ORDER BY accessed LIMIT ?)",
+                    (self._count - self.max_sessions,)
+                )
+                self._count = self.max_sessions
+
+    def _delete(self, session_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+            self._count = self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+def create_conversation_store(features: Dict[str, Any]) -> Optional[ConversationStore]:
+    """
+    Build the store when the agent's features enable conversation memory.
+
+    CONVERSATION_STORE_PATH selects the SQLite backend (e.g.
+    /data/conversations.db); sessions are otherwise kept in memory.
+
+    Returns:
+        The store, or None when memoryEnabled/conversationHistory are off
+    """
+    if not (features.get('memoryEnabled', False) and features.get('conversationHistory', False)):
+        return None
+    max_sessions = int(os.getenv('CONVERSATION_MAX_SESSIONS', DEFAULT_MAX_SESSIONS))
+    path = os.getenv('CONVERSATION_STORE_PATH')
+    if path:
+        return SqliteConversationStore(path, max_sessions)
+    return ConversationStore(max_sessions)
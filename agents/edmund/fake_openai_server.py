@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Azure OpenAI chat completions API.
+Lets the resilience layer, load balancing and benchmarks be exercised
+without Azure credentials or quota: each deployment answers with a
+deterministic completion after a configurable latency, and failures
+(429 with Retry-After, 5xx) can be injected per deployment.
+
+    python fake_openai_server.py --port 8081 --latency 50ms
+    AZURE_OPENAI_ENDPOINT=http://localhost:8081 AZURE_OPENAI_API_KEY=fake python main.py
+
+In tests, route an AsyncAzureOpenAI client to the app in-process with
+httpx.ASGITransport(app=fake_openai_server.app).
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+from config_units import parse_duration
+
+
+class FakeDeployment:
+    """Behaviour of one fake deployment"""
+
+    def __init__(self, latency: float = 0.0, token_latency: float = 0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        # Status codes returned (in order) before answering normally again
+        self.failures: deque = deque()
+        self.retry_after: Optional[float] = None
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def configure(self, options: Dict[str, Any]):
+        if 'latency' in options:
+            self.latency = parse_duration(options['latency'])
+        if 'token_latency' in options:
+            self.token_latency = parse_duration(options['token_latency'])
+        if 'failures' in options:
+            self.failures = deque(options['failures'])
+        if 'retry_after' in options:
+            self.retry_after = options['retry_after']
+
+
+class FakeState:
+    def __init__(self):
+        self.defaults: Dict[str, Any] = {}
+        self.deployments: Dict[str, FakeDeployment] = {}
+
+    def deployment(self, name: str) -> FakeDeployment:
+        if name not in self.deployments:
+            deployment = FakeDeployment()
+            deployment.configure(self.defaults)
+            self.deployments[name] = deployment
+        return self.deployments[name]
+
+    def reset(self, defaults: Optional[Dict[str, Any]] = None):
+        self.defaults = defaults or {}
+        self.deployments.clear()
+
+
+state = FakeState()
+app = FastAPI(title="Fake Azure OpenAI")
+
+
+def _answer_tokens(deployment: str, messages: List[Dict[str, Any]]) -> List[str]:
+    question = next((m.get('content') for m in reversed(messages) if m.get('role') == 'user'), '')
+    words = str(question).split()[:12]
+    return [f"[{deployment}]"] + [f" {word}" for word in ["Answer", "to:"] + words]
+
+
+def _usage(messages: List[Dict[str, Any]], tokens: List[str]) -> Dict[str, int]:
+    prompt_tokens = sum(len(str(m.get('content', ''))) // 4 + 4 for m in messages)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(tokens),
+        "total_tokens": prompt_tokens + len(tokens)
+    }
+
+
+def _error(status: int, retry_after: Optional[float]) -> JSONResponse:
+    headers = {}
+    if retry_after is not None:
+        headers = {"retry-after": str(int(retry_after)), "retry-after-ms": str(int(retry_after * 1000))}
+    code = "429" if status == 429 else "InternalServerError"
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"code": code, "message": f"Injected {status} from the fake server"}},
+        headers=headers
+    )
+
+
+async def _stream(deployment: str, model: str, tokens: List[str], usage: Dict[str, int],
+                  token_latency: float, include_usage: bool):
+    created = int(time.time())
+    for token in tokens:
+        if token_latency:
+            await asyncio.sleep(token_latency)
+        chunk = {
+            "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    if include_usage:
+        chunk = {
+            "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [], "usage": usage
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/openai/deployments/{deployment}/chat/completions")
+async def chat_completions(deployment: str, body: Dict[str, Any]):
+    """Azure OpenAI-shaped chat completion (streaming and non-streaming)"""
+    fake = state.deployment(deployment)
+    fake.calls += 1
+    fake.in_flight += 1
+    fake.peak_in_flight = max(fake.peak_in_flight, fake.in_flight)
+    try:
+        if fake.latency:
+            await asyncio.sleep(fake.latency)
+        if fake.failures:
+            return _error(fake.failures.popleft(), fake.retry_after)
+
+        messages = body.get('messages', [])
+        tokens = _answer_tokens(deployment, messages)
+        usage = _usage(messages, tokens)
+        model = body.get('model', deployment)
+        if body.get('stream'):
+            include_usage = bool((body.get('stream_options') or {}).get('include_usage'))
+            return StreamingResponse(
+                _stream(deployment, model, tokens, usage, fake.token_latency, include_usage),
+                media_type="text/event-stream"
+            )
+        if fake.token_latency:
+            await asyncio.sleep(fake.token_latency * len(tokens))
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+    finally:
+        fake.in_flight -= 1
+
+
+@app.get("/openai/models")
+async def list_models():
+    """Azure OpenAI-shaped model listing (what readiness checks call)"""
+    return {
+        "object": "list",
+        "data": [{"id": name, "object": "model"} for name in state.deployments]
+    }
+
+
+@app.post("/fake/deployments/{deployment}")
+async def configure_deployment(deployment: str, options: Dict[str, Any]):
+    """Set latency, token_latency, failures (status codes) or retry_after for a deployment"""
+    state.deployment(deployment).configure(options)
+    return {"deployment": deployment, "configured": options}
+
+
+@app.get("/fake/deployments")
+async def deployment_stats():
+    """Calls and peak concurrency seen per deployment"""
+    return {
+        name: {"calls": d.calls, "peak_in_flight": d.peak_in_flight, "pending_failures": len(d.failures)}
+        for name, d in state.deployments.items()
+    }
+
+
+@app.post("/fake/reset")
+async def reset(defaults: Optional[Dict[str, Any]] = None):
+    """Forget all deployments; new ones start from the given defaults"""
+    state.reset(defaults)
+    return {"reset": True}
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run a fake Azure OpenAI endpoint")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', default='0s', help='Delay before every answer, e.g. 50ms')
+    parser.add_argument('--token-latency', default='0s', help='Delay per generated token')
+    args = parser.parse_args()
+
+    state.reset({"latency": args.latency, "token_latency": args.token_latency})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
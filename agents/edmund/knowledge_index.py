@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Offline full-text knowledge index for Edmund.
+Chunks the T-Minus-15 book (AsciiDoc chapters, appendices and agent profiles)
+into section-sized passages and stores a BM25 inverted index on disk so the
+scoring engine can inject relevant passages into the prompt.
+
+Usage:
+    python knowledge_index.py build --root ../.. --output knowledge-index.json
+    python knowledge_index.py update --root ../.. --output knowledge-index.json
+    python knowledge_index.py search "how do WIP limits work"
+"""
+
+import os
+import re
+import sys
+import json
+import glob
+import math
+import heapq
+import time
+import hashlib
+import argparse
+import logging
+import tempfile
+import subprocess
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# Book content indexed by default, relative to the repository root
+DEFAULT_PATTERNS = [
+    "chapters/*.adoc",
+    "appendices/*.adoc",
+    "agents/*.yml"
+]
+DEFAULT_INCLUDE_FILE_TYPES = [".md", ".adoc", ".yml", ".yaml", ".txt"]
+DEFAULT_SOURCE_ID = "tminus15-methodology"
+
+# Passage size in words; sections longer than this are split with overlap
+MAX_CHUNK_WORDS = 180
+CHUNK_OVERLAP_WORDS = 30
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+HEADING_PATTERN = re.compile(r'^(?:={1,6}|#{1,6})\s+(.+?)\s*$')
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its "
+    "me my not of on or our so than that the their them then there these they this to us "
+    "was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms, dropping stopwords"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough model-token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def chunk_text(text: str, source: str) -> List[Dict[str, Any]]:
+    """
+    Split a document into passages.
+
+    Sections are delimited by AsciiDoc (=) or Markdown (#) headings and
+    carry the nearest heading as their title; long sections are windowed
+    into overlapping passages of at most MAX_CHUNK_WORDS words.
+
+    Args:
+        text: Document contents
+        source: Repository-relative path recorded on each passage
+
+    Returns:
+        List of {"source", "title", "text"} passages
+    """
+    sections: List[Tuple[str, List[str]]] = []
+    title = os.path.splitext(os.path.basename(source))[0].replace('-', ' ').title()
+    lines: List[str] = []
+
+    for line in text.splitlines():
+        match = HEADING_PATTERN.match(line)
+        if match:
+            if any(l.strip() for l in lines):
+                sections.append((title, lines))
+            title, lines = match.group(1), []
+        else:
+            lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((title, lines))
+
+    chunks = []
+    step = MAX_CHUNK_WORDS - CHUNK_OVERLAP_WORDS
+    for section_title, section_lines in sections:
+        words = " ".join(section_lines).split()
+        for start in range(0, max(len(words) - CHUNK_OVERLAP_WORDS, 1), step):
+            chunks.append({
+                "source": source,
+                "title": section_title,
+                "text": " ".join(words[start:start + MAX_CHUNK_WORDS])
+            })
+    return chunks
+
+
+def content_hash(data: bytes) -> str:
+    """Stable content hash used to detect changed files and passages"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_file(root: str, relative_path: str) -> bytes:
+    """Read a file under the repository root"""
+    with open(os.path.join(root, relative_path), 'rb') as f:
+        return f.read()
+
+
+def file_chunks(data: bytes, relative_path: str) -> List[Dict[str, Any]]:
+    """Chunk one file's contents, tagging each passage with its content hash"""
+    chunks = chunk_text(data.decode('utf-8'), relative_path)
+    for chunk in chunks:
+        chunk['source_id'] = DEFAULT_SOURCE_ID
+        chunk['hash'] = content_hash(f"{chunk['title']}\n{chunk['text']}".encode('utf-8'))[:16]
+    return chunks
+
+
+def atomic_write(path: str, write: Any, mode: str = 'w'):
+    """
+    Write a file via a temporary sibling and os.replace().
+
+    Readers see either the old or the new file, never a partial one, and
+    processes that already opened (or memory-mapped) the old file keep
+    their copy.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    permissions = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.chmod(temp_path, permissions)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def load_knowledge_sources(path: str) -> Dict[str, Any]:
+    """Load knowledge-sources.json, returning an empty config if it is missing"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def find_source(sources_config: Dict[str, Any], source_id: str = DEFAULT_SOURCE_ID) -> Dict[str, Any]:
+    """Find a knowledge source entry by id"""
+    for source in sources_config.get('knowledgeSources', []):
+        if source.get('id') == source_id:
+            return source
+    return {}
+
+
+def collect_files(root: str, patterns: List[str], include_file_types: List[str]) -> List[str]:
+    """Expand the glob patterns under root, keeping only the included file types"""
+    files = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(root, pattern)):
+            if os.path.isfile(path) and os.path.splitext(path)[1] in include_file_types:
+                files.add(os.path.relpath(path, root))
+    return sorted(files)
+
+
+class KnowledgeIndex:
+    """BM25 inverted index over book passages"""
+
+    def __init__(self, chunks: Optional[List[Dict[str, Any]]] = None):
+        self.chunks: List[Dict[str, Any]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.length_norms: List[float] = []
+        # Indexed file path -> content hash, and the git commit they came from
+        self.files: Dict[str, str] = {}
+        self.commit: Optional[str] = None
+        # Indexed files whose content was not committed at self.commit (edited or
+        # untracked); a diff against the commit misses them once they are reverted
+        self.uncommitted: List[str] = []
+        if chunks:
+            self.add_chunks(chunks)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_chunks(self, chunks: List[Dict[str, Any]]):
+        """Add passages to the index and recompute the BM25 statistics"""
+        for chunk in chunks:
+            doc_id = len(self.chunks)
+            self.chunks.append(chunk)
+            # Titles are indexed alongside the body so section names match
+            terms = Counter(tokenize(chunk['title'] + " " + chunk['text']))
+            chunk['length'] = sum(terms.values())
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        self._compute_statistics()
+
+    def _compute_statistics(self):
+        """Precompute IDF and per-passage length normalization for search()"""
+        count = len(self.chunks)
+        average_length = sum(c['length'] for c in self.chunks) / count if count else 1.0
+        self.idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        self.length_norms = [
+            BM25_K1 * (1 - BM25_B + BM25_B * c['length'] / average_length)
+            for c in self.chunks
+        ]
+
+    def score(self, query: str) -> Dict[int, float]:
+        """
+        BM25 scores of every passage matching at least one query term.
+
+        Only the postings of the query's terms are visited, so the cost
+        depends on how common those terms are, not on the corpus size.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + \
+                    idf * tf * (BM25_K1 + 1) / (tf + self.length_norms[doc_id])
+        return scores
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Return the top-k passages for a query.
+
+        Args:
+            query: Free-text query
+            k: Maximum number of passages to return
+
+        Returns:
+            Passages with an added 'score', best first
+        """
+        best = heapq.nlargest(k, self.score(query).items(), key=lambda item: item[1])
+        return [dict(self.chunks[doc_id], score=score) for doc_id, score in best]
+
+    def save(self, path: str):
+        """Atomically write the index to disk as JSON"""
+        atomic_write(path, lambda f: json.dump({
+            "version": INDEX_VERSION,
+            "commit": self.commit,
+            "uncommitted": self.uncommitted,
+            "files": self.files,
+            "chunks": self.chunks,
+            "postings": self.postings
+        }, f))
+
+    @classmethod
+    def load(cls, path: str) -> 'KnowledgeIndex':
+        """Load an index written by save()"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported knowledge index version: {data.get('version')}")
+
+        index = cls()
+        index.chunks = data['chunks']
+        index.postings = {term: [tuple(p) for p in docs] for term, docs in data['postings'].items()}
+        index.files = data.get('files', {})
+        index.commit = data.get('commit')
+        index.uncommitted = data.get('uncommitted', [])
+        index._compute_statistics()
+        return index
+
+
+def build_index(root: str, patterns: Optional[List[str]] = None,
+                sources_config: Optional[Dict[str, Any]] = None) -> KnowledgeIndex:
+    """
+    Chunk and index the book content under a repository root.
+
+    Args:
+        root: Repository root containing chapters/, appendices/ and agents/
+        patterns: Glob patterns relative to root (defaults to DEFAULT_PATTERNS)
+        sources_config: Parsed knowledge-sources.json; the tminus15-methodology
+            source's includeFileTypes restricts which files are indexed
+
+    Returns:
+        The populated KnowledgeIndex, with per-file hashes for update_index()
+    """
+    chunks = []
+    files = {}
+    for relative_path in collect_files(root, patterns or DEFAULT_PATTERNS, _include_file_types(sources_config)):
+        data = read_file(root, relative_path)
+        files[relative_path] = content_hash(data)
+        chunks.extend(file_chunks(data, relative_path))
+
+    logger.info(f"Indexed {len(chunks)} passages from {root}")
+    index = KnowledgeIndex(chunks)
+    index.files = files
+    _record_commit(index, root)
+    return index
+
+
+def _include_file_types(sources_config: Optional[Dict[str, Any]]) -> List[str]:
+    """includeFileTypes of the tminus15-methodology source"""
+    source = find_source(sources_config or {})
+    return source.get('indexing', {}).get('includeFileTypes', DEFAULT_INCLUDE_FILE_TYPES)
+
+
+def git_head(root: str) -> Optional[str]:
+    """Current commit of the repository at root, or None outside git"""
+    try:
+        return subprocess.run(
+            ['git', '-C', root, 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def git_changed_files(root: str, since: str) -> Optional[List[str]]:
+    """
+    Files changed between a commit and the working tree, relative to root.
+
+    Returns None when the diff cannot be computed (not a git checkout,
+    unknown commit), in which case callers fall back to hashing every file.
+    """
+    try:
+        output = subprocess.run(
+            ['git', '-C', root, 'diff', '--name-only', '--relative', since],
+            capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return [line for line in output.splitlines() if line]
+
+
+def git_uncommitted_files(root: str) -> Optional[List[str]]:
+    """
+    Files under root whose working-tree content differs from HEAD: edited,
+    deleted or untracked (ignored files excluded). None outside git.
+    """
+    changed = git_changed_files(root, 'HEAD')
+    if changed is None:
+        return None
+    try:
+        untracked = subprocess.run(
+            ['git', '-C', root, 'ls-files', '--others', '--exclude-standard'],
+            capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return changed + [line for line in untracked.splitlines() if line]
+
+
+def _record_commit(index: KnowledgeIndex, root: str):
+    """Stamp an index with the commit it was built from and its files not in that commit"""
+    index.commit = git_head(root)
+    uncommitted = set(git_uncommitted_files(root) or ())
+    index.uncommitted = sorted(p for p in index.files if p in uncommitted)
+
+
+def update_index(root: str, previous: KnowledgeIndex, patterns: Optional[List[str]] = None,
+                 sources_config: Optional[Dict[str, Any]] = None,
+                 changed_paths: Optional[Iterable[str]] = None) -> Tuple[KnowledgeIndex, List[str]]:
+    """
+    Incrementally refresh an index after the book content changed.
+
+    Only files whose content hash differs from the previous index are
+    re-read and re-chunked; passages of unchanged files are carried over
+    as-is. When changed_paths is given (e.g. from a git diff), only those
+    files, files new to the index and files that were indexed with
+    uncommitted content are hashed at all.
+
+    Args:
+        root: Repository root
+        previous: The index currently on disk
+        patterns: Glob patterns relative to root (defaults to DEFAULT_PATTERNS)
+        sources_config: Parsed knowledge-sources.json
+        changed_paths: Optional repository-relative paths known to have changed
+
+    Returns:
+        Tuple of (updated index, sorted list of changed or removed files);
+        the previous index is returned unchanged if nothing changed
+    """
+    current_files = collect_files(root, patterns or DEFAULT_PATTERNS, _include_file_types(sources_config))
+    if changed_paths is None:
+        candidates = current_files
+    else:
+        # An uncommitted edit that was indexed and later reverted leaves no diff
+        hinted = set(changed_paths) | set(previous.uncommitted)
+        candidates = [p for p in current_files if p in hinted or p not in previous.files]
+
+    files = {p: h for p, h in previous.files.items() if p in set(current_files)}
+    fresh_chunks: Dict[str, List[Dict[str, Any]]] = {}
+    for relative_path in candidates:
+        data = read_file(root, relative_path)
+        file_hash = content_hash(data)
+        if previous.files.get(relative_path) != file_hash:
+            files[relative_path] = file_hash
+            fresh_chunks[relative_path] = file_chunks(data, relative_path)
+
+    removed = [p for p in previous.files if p not in files]
+    changed = sorted(set(fresh_chunks) | set(removed))
+    if not changed:
+        return previous, []
+
+    # Rebuild in file order so the result matches a full build
+    carried: Dict[str, List[Dict[str, Any]]] = {}
+    for chunk in previous.chunks:
+        carried.setdefault(chunk['source'], []).append(
+            {key: value for key, value in chunk.items() if key != 'length'}
+        )
+    chunks = []
+    for relative_path in current_files:
+        chunks.extend(fresh_chunks.get(relative_path, carried.get(relative_path, [])))
+
+    logger.info(f"Re-indexed {len(fresh_chunks)} changed and {len(removed)} removed files")
+    index = KnowledgeIndex(chunks)
+    index.files = files
+    _record_commit(index, root)
+    return index, changed
+
+
+def mark_last_indexed(sources_path: str, source_id: str = DEFAULT_SOURCE_ID,
+                      timestamp: Optional[str] = None) -> str:
+    """
+    Record the indexing time as the source's lastIndexed in knowledge-sources.json.
+
+    Only the one value is rewritten so the hand-formatted file keeps its
+    layout; the file is replaced atomically.
+
+    Returns:
+        The timestamp written
+    """
+    timestamp = timestamp or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    with open(sources_path, 'r') as f:
+        text = f.read()
+
+    source_start = text.find(f'"id": "{source_id}"')
+    if source_start < 0:
+        raise ValueError(f"Knowledge source not found: {source_id}")
+    pattern = re.compile(r'"lastIndexed":\s*(?:null|"[^"]*")')
+    match = pattern.search(text, source_start)
+    if match is None:
+        raise ValueError(f"Knowledge source {source_id} has no lastIndexed field")
+
+    updated = text[:match.start()] + f'"lastIndexed": "{timestamp}"' + text[match.end():]
+    atomic_write(sources_path, lambda f: f.write(updated))
+    return timestamp
+
+
+def format_context(passages: List[Dict[str, Any]], max_tokens: int,
+                   source_attribution: bool = True, count=estimate_tokens) -> str:
+    """
+    Render retrieved passages as prompt context within a token budget.
+
+    Passages are added best-first and the first one that would overflow
+    max_tokens ends the context, so the result is deterministic. count
+    measures a passage in tokens (the model's tokenizer when available).
+    """
+    parts = []
+    used = 0
+    for passage in passages:
+        header = f"[{passage['source']} - {passage['title']}]\n" if source_attribution else ""
+        part = header + passage['text']
+        cost = count(part)
+        if used + cost > max_tokens:
+            break
+        parts.append(part)
+        used += cost
+    return "\n\n".join(parts)
+
+
+def update_command(args: argparse.Namespace) -> int:
+    """Run an incremental update of the full-text (and semantic) index"""
+    started = time.perf_counter()
+    sources_config = load_knowledge_sources(args.sources)
+    if not os.path.exists(args.output):
+        print(f"⚠️ No index at {args.output}; running a full build")
+        previous = KnowledgeIndex()
+    else:
+        previous = KnowledgeIndex.load(args.output)
+
+    since = args.since or previous.commit
+    changed_paths = git_changed_files(args.root, since) if since and previous.files else None
+    index, changed = update_index(args.root, previous, sources_config=sources_config,
+                                  changed_paths=changed_paths)
+
+    if changed:
+        index.save(args.output)
+    embedded = 0
+    if os.path.exists(f"{args.semantic_index}.json"):
+        # numpy is only needed when a semantic index exists
+        from semantic_index import update_semantic_index
+        _, embedded = update_semantic_index(index, args.semantic_index)
+        print(f"🧮 Embedded {embedded} new passages")
+    # A run that changed nothing leaves knowledge-sources.json (and the working tree) alone
+    if (changed or embedded) and os.path.exists(args.sources):
+        mark_last_indexed(args.sources)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {len(changed)} files re-indexed, {len(index)} passages total in {elapsed:.2f}s")
+    for relative_path in changed:
+        print(f"  📄 {relative_path}")
+    return 0
+
+
+def main():
+    """Command line entry point"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build or query Edmund's knowledge index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build the index from the book sources')
+    build_parser.add_argument('--root', default=os.path.join(here, '..', '..'))
+    build_parser.add_argument('--output', default=os.path.join(here, 'knowledge-index.json'))
+    build_parser.add_argument('--sources', default=os.path.join(here, 'knowledge-sources.json'))
+
+    update_parser = subparsers.add_parser('update', help='Re-index only the files that changed')
+    update_parser.add_argument('--root', default=os.path.join(here, '..', '..'))
+    update_parser.add_argument('--output', default=os.path.join(here, 'knowledge-index.json'))
+    update_parser.add_argument('--sources', default=os.path.join(here, 'knowledge-sources.json'))
+    update_parser.add_argument('--since', help='Git commit to diff against (defaults to the indexed commit)')
+    update_parser.add_argument('--semantic-index', default=os.path.join(here, 'semantic-index'),
+                               help='Semantic index prefix to refresh if it exists')
+
+    search_parser = subparsers.add_parser('search', help='Query an existing index')
+    search_parser.add_argument('query')
+    search_parser.add_argument('--index', default=os.path.join(here, 'knowledge-index.json'))
+    search_parser.add_argument('-k', type=int, default=5)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'build':
+        index = build_index(args.root, sources_config=load_knowledge_sources(args.sources))
+        index.save(args.output)
+        if os.path.exists(args.sources):
+            mark_last_indexed(args.sources)
+        print(f"✅ Wrote {len(index)} passages to {args.output}")
+    elif args.command == 'update':
+        return update_command(args)
+    else:
+        index = KnowledgeIndex.load(args.index)
+        started = time.perf_counter()
+        results = index.search(args.query, args.k)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for result in results:
+            print(f"{result['score']:.2f}  {result['source']} - {result['title']}")
+        print(f"⏱️ {len(results)} results in {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,49 +4,336 @@ Main FastAPI application entry point for Azure Container Apps deployment
 """
 
 import os
+import time
+import asyncio
+import hashlib
 import logging
+import ipaddress
 from contextlib import asynccontextmanager
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import Dict, Any, AsyncIterator, FrozenSet, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import uvicorn
+import startup_timing
+from startup_timing import timed
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+with timed("import.fastapi"):
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+    # Needed at import time: DrainingServer subclasses uvicorn.Server, and the
+    # image serves through it (python main.py), so uvicorn is loaded either way
+    import uvicorn
+with timed("import.openai"):
+    import openai
+
+with timed("import.scoring"):
+    import scoring
+    import metrics
+    import fast_json
+    import structured_log
+    import tracing
+    from structured_log import log_event
+    from admission import AdmissionRejected, DEFAULT_PRIORITY, PRIORITIES, Ticket, create_admission_controller
+    from agent_registry import describe
+    from agent_snapshot import ConfigWatcher, DEFAULT_RELOAD_INTERVAL
+    from config_units import parse_duration
+    from mcp_tools import load_mcp_config
+    from readiness import ReadinessMonitor, DEFAULT_INTERVAL as DEFAULT_READINESS_INTERVAL
+    from rate_limiter import create_rate_limiter, retry_after_header
+    from resilience import CircuitOpenError
+
+# Configure logging (already done by scoring's import; LOG_FORMAT=json for structured output)
+structured_log.configure()
 logger = logging.getLogger(__name__)
 
+# Per-client limiter for model-backed endpoints, None when rate limiting is off
+rate_limiter = None
+
+# SHA-256 digests of the API keys in EDMUND_API_KEYS; only these identify a caller
+api_key_digests: FrozenSet[str] = frozenset()
+
+# Proxies whose X-Forwarded-For entries are believed (TRUSTED_PROXIES, comma-separated CIDRs)
+DEFAULT_TRUSTED_PROXIES = "127.0.0.0/8,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,::1/128,fc00::/7"
+
+# Adaptive concurrency limit and priority queue for chats, None when disabled
+admission_controller = None
+
+# Polls AGENT_CONFIG_PATH and swaps in edited configurations, None when disabled
+config_watcher_task: Optional[asyncio.Task] = None
+
+# Dependency checks refreshed in the background for /health/ready
+readiness_monitor: Optional[ReadinessMonitor] = None
+readiness_task: Optional[asyncio.Task] = None
+
+# SSE responses still being written
+active_streams = 0
+
+# Used when mcp-config.json has no "deployment" block
+DEFAULT_SHUTDOWN_TIMEOUT = "30s"
+DEFAULT_DRAIN_DELAY = "5s"
+
+
+def _deployment_setting(env: str, name: str, default: str) -> float:
+    """
+    A duration from the environment or mcp-config.json's "deployment" block.
+    
+    deployment.gracefulShutdown false makes every shutdown duration 0.
+    """
+    if os.getenv(env):
+        return parse_duration(os.getenv(env))
+    deployment = load_mcp_config(os.getenv('MCP_CONFIG_PATH', './mcp-config.json')).get('deployment', {})
+    if not deployment.get('gracefulShutdown', True):
+        return 0.0
+    return parse_duration(deployment.get(name, default))
+
+
+def _shutdown_timeout() -> float:
+    """Seconds open streams get to finish once the server stops accepting (SHUTDOWN_TIMEOUT)"""
+    return _deployment_setting('SHUTDOWN_TIMEOUT', 'shutdownTimeout', DEFAULT_SHUTDOWN_TIMEOUT)
+
+
+def _drain_delay() -> float:
+    """Seconds /health/ready reports draining before the server stops accepting (DRAIN_DELAY)"""
+    return _deployment_setting('DRAIN_DELAY', 'drainDelay', DEFAULT_DRAIN_DELAY)
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn server that fails readiness before it stops.
+    
+    On SIGTERM (or SIGINT) /health/ready switches to draining while chats
+    are still served for drain_delay seconds, so the ingress stops routing
+    new ones here. Only then does uvicorn's own graceful shutdown stop
+    accepting connections and give open streams up to
+    timeout_graceful_shutdown seconds, before the lifespan shutdown closes
+    the model clients. A second signal stops at once.
+    """
+
+    def __init__(self, config: uvicorn.Config, drain_delay: float):
+        super().__init__(config)
+        self.drain_delay = drain_delay
+        self.drain_deadline: Optional[float] = None
+
+    def handle_exit(self, sig, frame):
+        if self.drain_deadline is None and self.drain_delay > 0 and readiness_monitor is not None:
+            readiness_monitor.draining = True
+            self.drain_deadline = time.monotonic() + self.drain_delay
+            logger.info(f"Draining for {self.drain_delay}s ({active_streams} open streams)")
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.drain_deadline is not None and time.monotonic() >= self.drain_deadline:
+            return True
+        return await super().on_tick(counter)
+
+
 # Application lifecycle management
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application startup and shutdown"""
+    global rate_limiter, api_key_digests, admission_controller, config_watcher_task, readiness_monitor, readiness_task
     logger.info("Starting Edmund the Engineer AI Agent")
     
-    # Initialize Azure AI Foundry connection
+    # Initialize the scoring engine (agent config + Azure OpenAI clients)
     try:
-        # This would initialize the AI Foundry project connection
-        logger.info("Initializing Azure AI Foundry connection...")
-        # await initialize_ai_foundry()
+        logger.info("Initializing scoring engine...")
+        scoring.init()
+        with timed("init.rate_limiter"):
+            mcp_config = load_mcp_config(os.getenv('MCP_CONFIG_PATH', './mcp-config.json'))
+            rate_limiter = create_rate_limiter(
+                scoring.agent_config.get('security', {}).get('rateLimiting', {}),
+                mcp_config.get('security', {}).get('rateLimiting', {})
+            )
+            api_key_digests = frozenset(
+                _digest(key.strip()) for key in os.getenv('EDMUND_API_KEYS', '').split(',') if key.strip()
+            )
+        if rate_limiter is not None:
+            logger.info(f"Rate limiting enabled ({rate_limiter.backend})")
+        with timed("init.admission"):
+            admission_controller = create_admission_controller(
+                int(os.getenv('EDMUND_MAX_CONCURRENCY', scoring.DEFAULT_MAX_CONCURRENCY)),
+                api_keys=bool(api_key_digests)
+            )
+        if admission_controller is not None:
+            logger.info(f"Admission control enabled (limit {admission_controller.max_limit}, "
+                        f"queue {admission_controller.queue_size})")
+        
+        # Hot-reload agent-config.json (CONFIG_RELOAD_INTERVAL=0 disables)
+        interval = float(os.getenv('CONFIG_RELOAD_INTERVAL', DEFAULT_RELOAD_INTERVAL))
+        if interval > 0:
+            watcher = ConfigWatcher(
+                os.getenv('AGENT_CONFIG_PATH', './agent-config.json'), scoring.reload_agent_config, interval
+            )
+            config_watcher_task = asyncio.create_task(watcher.run())
     except Exception as e:
-        logger.error(f"Failed to initialize AI Foundry: {e}")
+        logger.error(f"Failed to initialize scoring engine: {e}")
+    
+    # Started even when initialization failed, so /health/ready says why
+    readiness_monitor = ReadinessMonitor(
+        scoring.readiness_checks(),
+        critical=scoring.READINESS_CRITICAL,
+        interval=float(os.getenv('READINESS_INTERVAL', DEFAULT_READINESS_INTERVAL))
+    )
+    readiness_task = asyncio.create_task(readiness_monitor.run())
+    startup_timing.mark_ready()
     
     yield
     
+    # uvicorn has stopped accepting and waited for open streams by now (see DrainingServer)
     logger.info("Shutting down Edmund the Engineer AI Agent")
+    readiness_monitor.draining = True
+    for task in (config_watcher_task, readiness_task):
+        if task is not None:
+            task.cancel()
+    config_watcher_task = readiness_task = None
+    await scoring.shutdown_async()
+
+def _collect_rate_limit_metrics():
+    """Scrape-time counters of the rate limiter"""
+    if rate_limiter is None:
+        return []
+    return metrics.stats_gauges(
+        "edmund_rate_limit", "Rate limiter decisions", "backend",
+        {rate_limiter.backend: rate_limiter.stats()}, ("allowed", "rejected")
+    )
+
+
+def _collect_admission_metrics():
+    """Scrape-time concurrency limit, slots in use and queue depth"""
+    if admission_controller is None:
+        return []
+    return metrics.stats_gauges(
+        "edmund_admission", "Admission control", "endpoint", {"chat": admission_controller.stats()},
+        ("limit", "in_flight", "queued", "latency_seconds", "baseline_latency_seconds")
+    )
+
+
+def _collect_readiness_metrics():
+    """Scrape-time result of each cached readiness check"""
+    if readiness_monitor is None:
+        return []
+    ready = metrics.Gauge("edmund_ready", "1 while /health/ready reports ready")
+    ready.set(int(readiness_monitor.ready))
+    return [ready] + metrics.stats_gauges(
+        "edmund_dependency", "Readiness checks", "check",
+        readiness_monitor.stats(), ("up", "latency_seconds")
+    )
+
+
+metrics.register_collector(_collect_rate_limit_metrics)
+metrics.register_collector(_collect_admission_metrics)
+metrics.register_collector(_collect_readiness_metrics)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with fast_json (orjson when installed)"""
+
+    def render(self, content: Any) -> bytes:
+        return fast_json.dumps_bytes(content)
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """StreamingResponse that frees its admission slot once sent (or abandoned by the client)"""
+
+    def __init__(self, ticket: Optional[Ticket], content: Any, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.ticket is not None:
+                self.ticket.release()
+
+
+def _static_json(body: bytes) -> Response:
+    """Respond with a pre-encoded JSON body (a fresh Response each time: middleware adds headers to it)"""
+    return Response(body, media_type="application/json")
+
 
 # Create FastAPI application
 app = FastAPI(
     title="Edmund the Engineer",
     description="T-Minus-15 AI Agent for DevOps and Engineering Excellence",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
-# Configure CORS
+
+def _digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+
+
+def _parse_networks(spec: str) -> Tuple[Any, ...]:
+    return tuple(ipaddress.ip_network(cidr.strip(), strict=False) for cidr in spec.split(",") if cidr.strip())
+
+
+TRUSTED_PROXIES = _parse_networks(os.getenv('TRUSTED_PROXIES', DEFAULT_TRUSTED_PROXIES))
+
+
+def _trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def _caller_identity(request: Request) -> Optional[str]:
+    """Digest of the caller's API key, when it is one of EDMUND_API_KEYS"""
+    api_key = request.headers.get("x-api-key") or request.headers.get("authorization", "")
+    if api_key.lower().startswith("bearer "):
+        api_key = api_key[7:]
+    if not api_key:
+        return None
+    digest = _digest(api_key.strip())
+    return digest if digest in api_key_digests else None
+
+
+def _client_address(request: Request) -> str:
+    """
+    The caller's address: the peer, or when the peer is a trusted proxy
+    (e.g. Container Apps ingress) the rightmost X-Forwarded-For entry not
+    added by a trusted proxy. Entries left of that are client-supplied.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if not _trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def _client_key(request: Request) -> str:
+    """Identify the caller by validated API key, otherwise by address"""
+    identity = _caller_identity(request)
+    if identity is not None:
+        return "key:" + identity
+    return "ip:" + _client_address(request)
+
+
+@app.middleware("http")
+async def rate_limit(request: Request, call_next):
+    """Reject model-backed requests over the configured rate with 429 + Retry-After"""
+    if rate_limiter is None or request.method != "POST" or not request.url.path.endswith("/chat"):
+        return await call_next(request)
+    
+    allowed, retry_after = await rate_limiter.acheck(_client_key(request))
+    if not allowed:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Rate limit exceeded"},
+            headers={"Retry-After": retry_after_header(retry_after)}
+        )
+    return await call_next(request)
+
+
+# Configure CORS (added last so it also wraps 429 responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Configure appropriately for production
@@ -55,109 +342,332 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Bodies of the endpoints whose content never changes while the process
+# runs, encoded once instead of on every request
+HEALTH_BODY = fast_json.dumps_bytes({
+    "status": "healthy",
+    "service": "edmund-agent",
+    "version": "1.0.0"
+})
+
+ROOT_BODY = fast_json.dumps_bytes({
+    "message": "Edmund the Engineer - T-Minus-15 AI Agent",
+    "status": "operational",
+    "version": "1.0.0"
+})
+
+CONFIG_BODY = fast_json.dumps_bytes({
+    "agent_name": "Edmund the Engineer",
+    "specialization": "DevOps and Engineering Excellence",
+    "ai_foundry_enabled": bool(os.getenv("AZURE_AI_PROJECT_CONNECTION_STRING")),
+    "environment": os.getenv("AZURE_ENV_NAME", "development"),
+    "features": [
+        "Azure DevOps Integration",
+        "Engineering Best Practices",
+        "CI/CD Pipeline Optimization",
+        "Code Quality Analysis",
+        "Technical Documentation"
+    ]
+})
+
+CAPABILITIES_BODY = fast_json.dumps_bytes({
+    "primary_role": "DevOps and Engineering Excellence",
+    "capabilities": [
+        "Azure DevOps pipeline optimization",
+        "CI/CD best practices implementation",
+        "Code quality and security analysis",
+        "Infrastructure as Code (IaC) guidance",
+        "Git workflow optimization",
+        "Technical documentation generation",
+        "Performance monitoring and optimization",
+        "Cloud architecture recommendations"
+    ],
+    "knowledge_domains": [
+        "Azure DevOps Services",
+        "Azure Resource Manager",
+        "Docker and Kubernetes",
+        "Git and version control",
+        "Software development lifecycle",
+        "Agile and DevOps methodologies",
+        "Security best practices",
+        "Monitoring and observability"
+    ],
+    "integration_points": [
+        "Azure AI Foundry",
+        "Azure DevOps",
+        "GitHub",
+        "Azure Monitor",
+        "Azure Key Vault"
+    ]
+})
+
+# /agents body with the registry it was built from (rebuilt after a config reload)
+_agents_body: tuple = (None, b'')
+
+
 @app.get("/")
-async def root() -> Dict[str, str]:
+async def root() -> Response:
     """Root endpoint"""
-    return {
-        "message": "Edmund the Engineer - T-Minus-15 AI Agent",
-        "status": "operational",
-        "version": "1.0.0"
-    }
+    return _static_json(ROOT_BODY)
 
 @app.get("/health")
-async def health_check() -> Dict[str, str]:
-    """Health check endpoint for container orchestration"""
-    try:
-        # Add any health checks here (database connections, AI service availability, etc.)
-        return {
-            "status": "healthy",
-            "service": "edmund-agent",
-            "version": "1.0.0"
-        }
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        raise HTTPException(status_code=503, detail="Service unhealthy")
+@app.get("/health/live")
+async def liveness() -> Response:
+    """Liveness: the process is up and answering (no dependency is contacted)"""
+    return _static_json(HEALTH_BODY)
+
+@app.get("/health/ready")
+async def readiness() -> Response:
+    """Readiness: the last background dependency report, 503 unless ready (or only degraded)"""
+    if readiness_monitor is None:
+        return FastJSONResponse({"status": "starting", "ready": False, "checks": {}}, status_code=503)
+    report = readiness_monitor.report()
+    return FastJSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/metrics")
+async def get_metrics() -> PlainTextResponse:
+    """Prometheus metrics: latency histograms, token usage, outcomes and cache statistics"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/startup")
+async def get_startup() -> Dict[str, Any]:
+    """Import and initialization time per subsystem, for diagnosing cold starts"""
+    return startup_timing.report()
 
 @app.get("/config")
-async def get_config() -> Dict[str, Any]:
+async def get_config() -> Response:
     """Get current configuration (non-sensitive data only)"""
-    return {
-        "agent_name": "Edmund the Engineer",
-        "specialization": "DevOps and Engineering Excellence",
-        "ai_foundry_enabled": bool(os.getenv("AZURE_AI_PROJECT_CONNECTION_STRING")),
-        "environment": os.getenv("AZURE_ENV_NAME", "development"),
-        "features": [
-            "Azure DevOps Integration",
-            "Engineering Best Practices",
-            "CI/CD Pipeline Optimization",
-            "Code Quality Analysis",
-            "Technical Documentation"
-        ]
-    }
+    return _static_json(CONFIG_BODY)
 
-@app.post("/chat")
-async def chat(message: Dict[str, str]) -> Dict[str, str]:
-    """Chat endpoint for interacting with Edmund"""
+def _utc_timestamp() -> str:
+    """Current UTC time in ISO 8601 format"""
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Events frame"""
+    return f"event: {event}\ndata: {fast_json.dumps(data)}\n\n"
+
+
+def _chat_messages(message: Dict[str, Any]) -> list:
+    """Accept either a single 'message' string or a full 'messages' transcript"""
+    messages = message.get("messages")
+    if messages:
+        return messages
+    user_message = message.get("message", "")
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Message is required")
+    return [{"role": "user", "content": user_message}]
+
+
+def _request_priority(message: Dict[str, Any], request: Request) -> str:
+    """
+    Priority class: the X-Request-Priority header or "priority" field,
+    capped by the caller's identity (see AdmissionController.priority)
+    """
+    requested = request.headers.get("x-request-priority") or message.get("priority")
+    if requested is not None and not isinstance(requested, str):
+        raise HTTPException(status_code=400, detail="Unknown priority")
+    requested = requested.lower() if requested else None
+    if admission_controller is None:
+        if requested is not None and requested not in PRIORITIES:
+            raise HTTPException(status_code=400, detail=f"Unknown priority: {requested}")
+        return requested or DEFAULT_PRIORITY
+    try:
+        return admission_controller.priority(requested, _caller_identity(request) is not None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _open_session(message: Dict[str, Any], agent_name: Optional[str], caller: Optional[str]) -> Optional[str]:
+    """The chat's session id (see scoring.open_session); unknown ids get a 404, others' a 403"""
+    try:
+        return scoring.open_session(message.get("session_id"), agent_name, caller)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Session belongs to another caller")
+
+
+async def _admit(priority: str) -> Optional[Ticket]:
+    """Wait for an admission slot; shed requests get a 503 with Retry-After"""
+    if admission_controller is None:
+        return None
+    try:
+        return await admission_controller.acquire(priority)
+    except AdmissionRejected as e:
+        log_event(logger, logging.WARNING, "request.shed", sampled=True,
+                  priority=priority, reason=e.reason, retry_after=e.retry_after)
+        raise HTTPException(
+            status_code=503,
+            detail="Server overloaded, retry later",
+            headers={"Retry-After": retry_after_header(e.retry_after)}
+        )
+
+
+async def _stream_chat(data: Dict[str, Any], started_at: str, agent_name: Optional[str] = None,
+                       trace_context: Any = None, ticket: Optional[Ticket] = None,
+                       caller: Optional[str] = None) -> AsyncIterator[str]:
+    """Relay scoring.stream_async events to the client as SSE frames"""
+    global active_streams
+    active_streams += 1
+    opened = time.monotonic()
+    try:
+        with tracing.start_span("chat", {"edmund.stream": True}, trace_context):
+            async for event in scoring.stream_async(data, agent_name, caller):
+                if event["type"] == "token":
+                    yield _sse_event("token", {"content": event["content"]})
+                else:
+                    # Model seconds per completion token is the sample admission control adapts to
+                    usage = event["model"]["usage"]
+                    if ticket is not None and not event.get("cached") and usage and usage["completion_tokens"]:
+                        ticket.latency = (time.monotonic() - opened) / usage["completion_tokens"]
+                    yield _sse_event("done", {
+                        "agent": event["agent"]["displayName"],
+                        "model": event["model"]["name"],
+                        "usage": event["model"]["usage"],
+                        "cached": event.get("cached", False),
+                        "session_id": data.get("session_id"),
+                        "started_at": started_at,
+                        "timestamp": _utc_timestamp()
+                    })
+    except PermissionError as e:
+        # conversation_store.SessionOwnerError: the session_id is another caller's
+        logger.warning(f"Chat stream rejected: {e}")
+        yield _sse_event("error", {"error": "Session belongs to another caller", "timestamp": _utc_timestamp()})
+    except openai.OpenAIError as e:
+        logger.error(f"Chat stream model error: {e}")
+        yield _sse_event("error", {"error": "AI model error", "timestamp": _utc_timestamp()})
+    except Exception as e:
+        logger.error(f"Chat stream error: {e}")
+        yield _sse_event("error", {"error": "Internal server error", "timestamp": _utc_timestamp()})
+    finally:
+        active_streams -= 1
+
+
+async def _chat(message: Dict[str, Any], request: Request, agent_name: Optional[str] = None):
+    """
+    Answer a chat request as the given agent (Edmund when agent_name is None).
+    
+    Streams tokens as Server-Sent Events when the body sets "stream": true or
+    the client sends "Accept: text/event-stream"; otherwise returns the full
+    completion as JSON. Requests wait for an admission slot in their priority
+    class ("X-Request-Priority: batch" or "bulk" yields to interactive chats)
+    and get a 503 with Retry-After when shed.
+    """
     try:
-        user_message = message.get("message", "")
-        if not user_message:
-            raise HTTPException(status_code=400, detail="Message is required")
+        messages = _chat_messages(message)
+        caller = _caller_identity(request)
+        started_at = _utc_timestamp()
+        
+        if scoring.async_client is None:
+            raise HTTPException(status_code=503, detail="Scoring engine not initialized")
+        if agent_name is not None and agent_name.lower() not in scoring.agent_registry:
+            raise HTTPException(status_code=404, detail=f"Unknown agent: {agent_name}")
+        # With memory on, history is kept server-side under a session id issued
+        # by the first reply and bound to the caller's API key; later turns send
+        # that session_id and only the new message
+        data = {"messages": messages, "session_id": _open_session(message, agent_name, caller)}
+        priority = _request_priority(message, request)
         
-        # This is where you would integrate with Azure AI Foundry
-        # For now, return a simple response
-        response = f"Edmund here! I received your message: '{user_message}'. "
-        response += "I'm ready to help with DevOps and engineering excellence!"
+        # Continue the caller's trace when it sends a traceparent header
+        trace_context = tracing.extract(request.headers)
+        wants_stream = bool(message.get("stream")) or \
+            "text/event-stream" in request.headers.get("accept", "")
+        ticket = await _admit(priority)
+        if wants_stream:
+            # The response releases the slot once the stream is finished
+            return AdmittedStreamingResponse(
+                ticket,
+                _stream_chat(data, started_at, agent_name, trace_context, ticket, caller),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
         
-        return {
-            "response": response,
-            "agent": "Edmund the Engineer",
-            "timestamp": "2024-01-01T00:00:00Z"  # You'd use actual timestamp
-        }
+        try:
+            with tracing.start_span("chat", {"edmund.stream": False}, trace_context), \
+                    metrics.model_time() as model_time:
+                result = await scoring.process_async(data, agent_name, caller)
+            if ticket is not None and not result.get("cached"):
+                ticket.latency = model_time.per_token
+        finally:
+            if ticket is not None:
+                ticket.release()
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        
+        # Returned as a response so FastAPI does not re-encode the dict
+        return FastJSONResponse({
+            "response": result["response"],
+            "agent": result["agent"]["displayName"],
+            "model": result["model"]["name"],
+            "usage": result["model"]["usage"],
+            "cached": result.get("cached", False),
+            "session_id": data["session_id"],
+            "started_at": started_at,
+            "timestamp": _utc_timestamp()
+        })
     
+    except HTTPException:
+        raise
+    except PermissionError as e:
+        # conversation_store.SessionOwnerError: the session_id is another caller's
+        logger.warning(f"Chat rejected: {e}")
+        raise HTTPException(status_code=403, detail="Session belongs to another caller")
+    except CircuitOpenError as e:
+        logger.warning(f"Chat rejected: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="AI model temporarily unavailable",
+            headers={"Retry-After": retry_after_header(e.retry_after)}
+        )
+    except openai.OpenAIError as e:
+        logger.error(f"Chat model error: {e}")
+        raise HTTPException(status_code=502, detail="AI model error")
     except Exception as e:
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+
+@app.post("/chat")
+async def chat(message: Dict[str, Any], request: Request):
+    """Chat endpoint for interacting with Edmund"""
+    return await _chat(message, request)
+
+
+@app.get("/agents")
+async def list_agents() -> Response:
+    """List the T-Minus-15 agents this service can answer as"""
+    global _agents_body
+    registry, body = _agents_body
+    if registry is not scoring.agent_registry:
+        registry = scoring.agent_registry
+        body = fast_json.dumps_bytes({
+            "agents": [describe(config) for _, config in sorted(registry.items())]
+        })
+        _agents_body = (registry, body)
+    return _static_json(body)
+
+
+@app.post("/agents/{agent_name}/chat")
+async def agent_chat(agent_name: str, message: Dict[str, Any], request: Request):
+    """Chat endpoint for any registered agent (teddy, pepper, poppy, danny, ollie, edmund)"""
+    return await _chat(message, request, agent_name)
+
 @app.get("/capabilities")
-async def get_capabilities() -> Dict[str, Any]:
+async def get_capabilities() -> Response:
     """Get Edmund's capabilities and specializations"""
-    return {
-        "primary_role": "DevOps and Engineering Excellence",
-        "capabilities": [
-            "Azure DevOps pipeline optimization",
-            "CI/CD best practices implementation",
-            "Code quality and security analysis",
-            "Infrastructure as Code (IaC) guidance",
-            "Git workflow optimization",
-            "Technical documentation generation",
-            "Performance monitoring and optimization",
-            "Cloud architecture recommendations"
-        ],
-        "knowledge_domains": [
-            "Azure DevOps Services",
-            "Azure Resource Manager",
-            "Docker and Kubernetes",
-            "Git and version control",
-            "Software development lifecycle",
-            "Agile and DevOps methodologies",
-            "Security best practices",
-            "Monitoring and observability"
-        ],
-        "integration_points": [
-            "Azure AI Foundry",
-            "Azure DevOps",
-            "GitHub",
-            "Azure Monitor",
-            "Azure Key Vault"
-        ]
-    }
+    return _static_json(CAPABILITIES_BODY)
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(
-        "main:app",
+    # The app object rather than "main:app", so DrainingServer sees this module's readiness_monitor
+    config = uvicorn.Config(
+        app,
         host="0.0.0.0",
         port=port,
         log_level="info",
-        reload=False  # Set to True for development
-    )
\ No newline at end of file
+        # Bounds how long open streams delay shutdown
+        timeout_graceful_shutdown=int(_shutdown_timeout())
+    )
+    DrainingServer(config, _drain_delay()).run()
\ No newline at end of file
@@ -0,0 +1,412 @@
+"""
+MCP tool execution for Edmund's scoring engine.
+Exposes the tools of the enabled servers in mcp-config.json to the model
+and runs the tool calls it makes. All calls of one model turn are
+dispatched concurrently over a shared, pooled (HTTP/2 when h2 is
+installed) connection pool, each with its server's timeoutSeconds and
+retryAttempts, and their results are returned as tool messages.
+Results of read-only tools are cached for a per-tool TTL, and identical
+calls in flight at the same time share one request.
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import base64
+import logging
+import importlib.util
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+
+import httpx
+
+from config_units import parse_duration
+from resilience import RETRYABLE_STATUS
+import tracing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_SECONDS = 30
+DEFAULT_RETRY_ATTEMPTS = 3
+INITIAL_BACKOFF = 0.2
+MAX_BACKOFF = 5.0
+MAX_CONNECTIONS = 100
+
+# Read-only tool results are reused for this long unless the tool sets "cacheTtl"
+DEFAULT_TOOL_CACHE_TTL = "2m"
+DEFAULT_TOOL_CACHE_ENTRIES = 1024
+
+# Tools with side effects are never cached
+MUTATING_PREFIXES = ("create_", "update_", "delete_", "trigger_", "scale_")
+
+PROTOCOL_VERSION = "2025-03-26"
+ENV_REFERENCE = re.compile(r"\$\{(\w+)\}")
+
+
+class McpToolError(Exception):
+    """A tool call the server rejected or that could not be completed"""
+
+
+def expand_env(value: Any) -> Any:
+    """Replace ${VAR} references in config strings with environment values"""
+    if isinstance(value, str):
+        return ENV_REFERENCE.sub(lambda m: os.getenv(m.group(1), ''), value)
+    if isinstance(value, dict):
+        return {k: expand_env(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [expand_env(v) for v in value]
+    return value
+
+
+def load_mcp_config(path: str) -> Dict[str, Any]:
+    """Load mcp-config.json, returning an empty config if it is missing"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _auth_headers(authentication: Dict[str, Any]) -> Dict[str, str]:
+    auth_type = authentication.get('type')
+    if auth_type in ('bearer_token', 'token') and authentication.get('token'):
+        return {"Authorization": f"Bearer {authentication['token']}"}
+    if auth_type == 'basic_auth' and authentication.get('username'):
+        credentials = f"{authentication['username']}:{authentication.get('password', '')}"
+        return {"Authorization": f"Basic {base64.b64encode(credentials.encode()).decode()}"}
+    return {}
+
+
+def _rpc_result(response: httpx.Response) -> Dict[str, Any]:
+    """
+    The JSON-RPC result from a JSON or single-event SSE response.
+
+    Raises:
+        McpToolError: If the server reported an error or its response is
+            not a JSON-RPC object
+    """
+    try:
+        if response.headers.get('content-type', '').startswith('text/event-stream'):
+            events = [line[5:].strip() for line in response.text.splitlines() if line.startswith('data:')]
+            body = json.loads(events[-1]) if events else {}
+        else:
+            body = response.json()
+    except ValueError as e:
+        raise McpToolError(f"malformed response: {str(e)}")
+    if not isinstance(body, dict):
+        raise McpToolError(f"malformed response: expected a JSON object, got {type(body).__name__}")
+    if 'error' in body:
+        error = body['error']
+        raise McpToolError(error.get('message', str(error)) if isinstance(error, dict) else str(error))
+    result = body.get('result', {})
+    if not isinstance(result, dict):
+        raise McpToolError(f"malformed result: expected a JSON object, got {type(result).__name__}")
+    return result
+
+
+def _tool_output(result: Dict[str, Any]) -> str:
+    """Text of a tools/call result, as the model will see it"""
+    texts = [item.get('text', '') for item in result.get('content', []) if item.get('type') == 'text']
+    output = "\n".join(texts) if texts else json.dumps(result.get('content', result))
+    if result.get('isError'):
+        raise McpToolError(output)
+    return output
+
+
+def is_mutating(tool: str) -> bool:
+    return tool.startswith(MUTATING_PREFIXES)
+
+
+def tool_cache_ttl(tool: Dict[str, Any]) -> float:
+    """Seconds a tool's results may be reused (0 for mutating tools or a "cacheTtl" of 0s)"""
+    if is_mutating(tool['name']):
+        return 0.0
+    return parse_duration(tool.get('cacheTtl', DEFAULT_TOOL_CACHE_TTL))
+
+
+class ToolResultCache:
+    """
+    LRU cache of tool outputs keyed on tool name and canonical arguments.
+
+    Concurrent calls with the same key are coalesced: the first one runs
+    and the others await its result. Only successful outputs are stored;
+    a failure is passed to every waiter and the next call tries again.
+    When the first caller is cancelled, a waiter takes over the call.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_TOOL_CACHE_ENTRIES, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(tool: str, arguments: Dict[str, Any]) -> str:
+        return f"{tool}:{json.dumps(arguments, sort_keys=True, separators=(',', ':'))}"
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, output = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return output
+
+    def _set(self, key: str, output: str, ttl: float):
+        self._entries[key] = (self._clock() + ttl, output)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_call(self, tool: str, arguments: Dict[str, Any], ttl: float,
+                          call: Callable[[], Awaitable[str]]) -> str:
+        """
+        Cached output for the call, or run it (once for all identical
+        concurrent callers) and cache the output for ttl seconds.
+        """
+        if ttl <= 0:
+            return await call()
+        key = self.key(tool, arguments)
+        output = self._get(key)
+        if output is not None:
+            self.hits += 1
+            return output
+        pending = self._in_flight.get(key)
+        while pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Re-raise our own cancellation; if the leader was cancelled, run the call ourselves
+                if not pending.cancelled():
+                    raise
+            pending = self._in_flight.get(key)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            output = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieved here so an error nobody else awaited is not logged as unhandled
+            future.exception()
+            raise
+        else:
+            self._set(key, output, ttl)
+            future.set_result(output)
+            return output
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
+
+
+class McpServer:
+    """One MCP server reached over streamable HTTP (JSON-RPC over POST)"""
+
+    def __init__(self, server_config: Dict[str, Any], http: httpx.AsyncClient):
+        connection = server_config.get('connection', {})
+        configuration = server_config.get('configuration', {})
+        self.id = server_config.get('id')
+        self.url = connection.get('url')
+        self.http = http
+        self.timeout = float(configuration.get('timeoutSeconds', DEFAULT_TIMEOUT_SECONDS))
+        self.retry_attempts = int(configuration.get('retryAttempts', DEFAULT_RETRY_ATTEMPTS))
+        self.tools = server_config.get('tools', [])
+        self.headers = {
+            "Accept": "application/json, text/event-stream",
+            **_auth_headers(connection.get('authentication', {}))
+        }
+        self._request_id = 0
+        self._session_lock = asyncio.Lock()
+        self._initialized = False
+
+    async def _post(self, method: str, params: Dict[str, Any], notification: bool = False) -> httpx.Response:
+        payload = {"jsonrpc": "2.0", "method": method, "params": params}
+        if not notification:
+            self._request_id += 1
+            payload['id'] = self._request_id
+        response = await self.http.post(self.url, json=payload, headers=self.headers, timeout=self.timeout)
+        if response.status_code in RETRYABLE_STATUS:
+            raise httpx.HTTPStatusError(
+                f"{self.id} returned {response.status_code}", request=response.request, response=response
+            )
+        response.raise_for_status()
+        return response
+
+    async def _initialize(self):
+        """MCP handshake, once per server; keeps the session id for later calls"""
+        async with self._session_lock:
+            if self._initialized:
+                return
+            response = await self._post("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "edmund", "version": "1.0.0"}
+            })
+            _rpc_result(response)
+            if response.headers.get('mcp-session-id'):
+                self.headers['Mcp-Session-Id'] = response.headers['mcp-session-id']
+            await self._post("notifications/initialized", {}, notification=True)
+            self._initialized = True
+
+    async def call(self, tool: str, arguments: Dict[str, Any]) -> str:
+        """
+        Call a tool, retrying transport errors, timeouts and 429/5xx
+        responses up to retryAttempts times with jittered exponential backoff.
+
+        Raises:
+            McpToolError: If the server rejects the call or the tool fails
+            httpx.HTTPError: Once retries are exhausted
+        """
+        attempt = 0
+        while True:
+            try:
+                await self._initialize()
+                response = await self._post("tools/call", {"name": tool, "arguments": arguments})
+                return _tool_output(_rpc_result(response))
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                if (status is not None and status not in RETRYABLE_STATUS) or attempt >= self.retry_attempts:
+                    raise
+                delay = random.uniform(0, min(MAX_BACKOFF, INITIAL_BACKOFF * 2 ** attempt))
+                logger.warning(f"Retrying {self.id}.{tool} in {delay:.2f}s after: {str(e)}")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+class ToolExecutor:
+    """Tools of all enabled MCP servers, executed concurrently per model turn"""
+
+    def __init__(self, servers: List[McpServer], http: httpx.AsyncClient,
+                 cache: Optional[ToolResultCache] = None):
+        self.servers = servers
+        self.http = http
+        self.cache = cache or ToolResultCache()
+        self.routes = {tool['name']: server for server in servers for tool in server.tools}
+        self.ttls = {tool['name']: tool_cache_ttl(tool) for server in servers for tool in server.tools}
+        self.definitions = [
+            {
+                "type": "function",
+                "function": {
+                    "name": tool['name'],
+                    "description": tool.get('description', ''),
+                    "parameters": tool.get('parameters', {"type": "object", "properties": {}})
+                }
+            }
+            for server in servers for tool in server.tools
+        ]
+
+    async def _run(self, name: str, raw_arguments: str) -> str:
+        server = self.routes.get(name)
+        if server is None:
+            return f"Error: unknown tool {name}"
+        with tracing.start_span("tool.call", {"edmund.tool.name": name, "edmund.tool.server": server.id}) as span:
+            # Cleared when the call reaches the server (not cached or coalesced)
+            span.set_attribute("edmund.cache.hit", True)
+
+            async def call() -> str:
+                span.set_attribute("edmund.cache.hit", False)
+                return await server.call(name, arguments)
+
+            try:
+                arguments = json.loads(raw_arguments or '{}')
+            except json.JSONDecodeError as e:
+                tracing.mark_error(span, e)
+                return f"Error: invalid arguments for {name}: {str(e)}"
+            try:
+                return await self.cache.get_or_call(name, arguments, self.ttls[name], call)
+            except (McpToolError, httpx.HTTPError) as e:
+                tracing.mark_error(span, e)
+                logger.warning(f"Tool {name} failed: {str(e)}")
+                return f"Error: {name} failed: {str(e)}"
+
+    async def execute(self, tool_calls: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Run the tool calls of one assistant message concurrently.
+
+        Failures are reported to the model in the tool message instead of
+        failing the request, so it can answer without that result.
+
+        Args:
+            tool_calls: The assistant message's tool_calls
+
+        Returns:
+            One {"role": "tool", ...} message per call, in call order
+        """
+        outputs = await asyncio.gather(*[
+            self._run(call.function.name, call.function.arguments) for call in tool_calls
+        ])
+        return [
+            {"role": "tool", "tool_call_id": call.id, "content": output}
+            for call, output in zip(tool_calls, outputs)
+        ]
+
+    async def close(self):
+        await self.http.aclose()
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Connection pool shared by all MCP servers; HTTP/2 when the h2 package is installed"""
+    http2 = importlib.util.find_spec('h2') is not None
+    if not http2:
+        logger.info("h2 not installed; MCP calls use HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    )
+
+
+def create_tool_executor(mcp_config: Dict[str, Any],
+                         http: Optional[httpx.AsyncClient] = None) -> Optional[ToolExecutor]:
+    """
+    Build the executor for the enabled servers in mcp-config.json.
+
+    Returns:
+        The executor, or None when MCP is disabled or no server is usable
+    """
+    if not mcp_config.get('mcpConfiguration', {}).get('enabled', False):
+        return None
+
+    enabled = []
+    for server_config in mcp_config.get('servers', []):
+        if not server_config.get('enabled', False):
+            continue
+        server_config = expand_env(server_config)
+        connection = server_config.get('connection', {})
+        if connection.get('type') != 'http':
+            logger.warning(f"MCP server {server_config.get('id')}: {connection.get('type')} connections are not supported")
+        elif not connection.get('url'):
+            logger.warning(f"MCP server {server_config.get('id')} has no URL configured, skipping")
+        else:
+            enabled.append(server_config)
+    if not enabled:
+        return None
+
+    http = http or create_http_client()
+    servers = [McpServer(server_config, http) for server_config in enabled]
+    logger.info(f"MCP tools enabled: {', '.join(s.id for s in servers)}")
+    return ToolExecutor(servers, http)
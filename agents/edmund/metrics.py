@@ -0,0 +1,306 @@
+"""
+In-process metrics for Edmund, exposed in the Prometheus text format.
+Covers the monitoring.metrics of agent-config.json: response_time
+(latency histograms), token_usage (token counters) and error_rate
+(request outcome counters), plus cache and concurrency gauges.
+
+Updates are plain dict and list operations with no locks or I/O, so
+recording a request costs a few microseconds; formatting only happens
+when /metrics is scraped.
+"""
+
+import math
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, sized for LLM calls (sub-second cache hits
+# up to minute-long completions)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for a named metric family with optional labels"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[Any, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in list(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down per label set"""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """Distribution of observations in fixed cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts..., sum, count]
+        self._series: Dict[Tuple[Any, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+# Metrics recorded by the scoring engine
+REQUESTS = Counter(
+    "edmund_requests_total", "Chat requests by agent, mode and outcome (ok, cached, error, cancelled)",
+    ("agent", "mode", "outcome")
+)
+REQUEST_LATENCY = Histogram(
+    "edmund_request_duration_seconds", "End-to-end time to answer a chat request",
+    ("agent", "mode")
+)
+FIRST_TOKEN_LATENCY = Histogram(
+    "edmund_time_to_first_token_seconds", "Time until the first streamed token is sent",
+    ("agent",)
+)
+UPSTREAM_LATENCY = Histogram(
+    "edmund_upstream_duration_seconds", "Time spent in Azure OpenAI completion calls",
+    ("model",)
+)
+TOKENS = Counter(
+    "edmund_tokens_total", "Model tokens used by agent, model and type (prompt, completion)",
+    ("agent", "model", "type")
+)
+RETRIES = Counter(
+    "edmund_upstream_retries_total", "Upstream calls retried by deployment and reason", ("deployment", "reason")
+)
+HEDGES = Counter("edmund_upstream_hedges_total", "Hedged upstream calls by deployment", ("deployment",))
+IN_FLIGHT = Gauge("edmund_requests_in_flight", "Chat requests currently being answered")
+UPSTREAM_IN_FLIGHT = Gauge("edmund_upstream_in_flight", "Completion calls currently open to Azure OpenAI")
+ADMISSION_WAIT = Histogram(
+    "edmund_admission_wait_seconds", "Time chat requests waited for admission by priority", ("priority",)
+)
+ADMISSION_REJECTED = Counter(
+    "edmund_admission_rejected_total", "Chat requests shed by priority and reason", ("priority", "reason")
+)
+
+METRICS: List[Metric] = [
+    REQUESTS, REQUEST_LATENCY, FIRST_TOKEN_LATENCY, UPSTREAM_LATENCY, TOKENS, RETRIES, HEDGES,
+    IN_FLIGHT, UPSTREAM_IN_FLIGHT, ADMISSION_WAIT, ADMISSION_REJECTED
+]
+
+# Callbacks returning metrics computed at scrape time (e.g. cache statistics)
+_collectors: List[Callable[[], Iterable[Metric]]] = []
+
+
+def register_collector(collector: Callable[[], Iterable[Metric]]):
+    """Add a callback whose metrics are included in every scrape"""
+    _collectors.append(collector)
+
+
+def record_usage(agent: str, model: str, usage: Any):
+    """Count the prompt and completion tokens of a completion"""
+    if usage is None:
+        return
+    TOKENS.inc(usage.prompt_tokens, agent=agent, model=model, type="prompt")
+    TOKENS.inc(usage.completion_tokens, agent=agent, model=model, type="completion")
+    measured = _model_time.get()
+    if measured is not None:
+        measured.tokens += usage.completion_tokens
+
+
+def stats_gauges(name: str, documentation: str, label: str,
+                 stats: Dict[str, Dict[str, Any]], fields: Iterable[str]) -> List[Metric]:
+    """
+    Turn stats() dictionaries into gauges, one family per field.
+
+    Args:
+        name: Metric name prefix, e.g. "edmund_cache"
+        documentation: Help text prefix
+        label: Label distinguishing the sources, e.g. "cache"
+        stats: Source name -> stats() dictionary
+        fields: Numeric stats fields to export
+    """
+    gauges = []
+    for field in fields:
+        gauge = Gauge(f"{name}_{field}", f"{documentation} ({field})", (label,))
+        for source, values in stats.items():
+            if field in values:
+                gauge.set(values[field], **{label: source})
+        gauges.append(gauge)
+    return gauges
+
+
+def render() -> str:
+    """Current value of every metric in the Prometheus text exposition format"""
+    families = list(METRICS)
+    for collector in _collectors:
+        families.extend(collector())
+    return '\n'.join(family.render() for family in families) + '\n'
+
+
+class track_request:
+    """
+    Context manager timing one chat request and counting its outcome.
+
+    Set .outcome = "cached" before leaving for cache hits; exceptions are
+    counted as "error" (or "cancelled" when the client went away).
+    """
+
+    __slots__ = ("agent", "mode", "outcome", "started")
+
+    def __init__(self, agent: str, mode: str):
+        self.agent = agent
+        self.mode = mode
+        self.outcome = "ok"
+
+    def __enter__(self):
+        IN_FLIGHT.inc()
+        self.started = time.perf_counter()
+        return self
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def __exit__(self, exc_type, exc, tb):
+        IN_FLIGHT.dec()
+        if exc_type is not None:
+            self.outcome = "error" if issubclass(exc_type, Exception) else "cancelled"
+        REQUEST_LATENCY.observe(self.elapsed(), agent=self.agent, mode=self.mode)
+        REQUESTS.inc(agent=self.agent, mode=self.mode, outcome=self.outcome)
+        return False
+
+
+class track_upstream:
+    """Context manager timing one Azure OpenAI completion call"""
+
+    __slots__ = ("model", "started")
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def __enter__(self):
+        UPSTREAM_IN_FLIGHT.inc()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        UPSTREAM_IN_FLIGHT.dec()
+        elapsed = time.perf_counter() - self.started
+        UPSTREAM_LATENCY.observe(elapsed, model=self.model)
+        measured = _model_time.get()
+        if measured is not None:
+            measured.seconds += elapsed
+        return False
+
+
+class model_time:
+    """
+    Context manager adding up the track_upstream() time and completion
+    tokens of the calls made inside it (tool calls in between excluded).
+    """
+
+    __slots__ = ("seconds", "tokens", "_token")
+
+    def __enter__(self):
+        self.seconds = 0.0
+        self.tokens = 0
+        self._token = _model_time.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _model_time.reset(self._token)
+        return False
+
+    @property
+    def per_token(self) -> Optional[float]:
+        """Model seconds per completion token (None without usage)"""
+        return self.seconds / self.tokens if self.tokens else None
+
+
+_model_time: ContextVar[Optional[model_time]] = ContextVar("edmund_model_time", default=None)
@@ -0,0 +1,195 @@
+"""
+Token-budgeted prompt assembly for Edmund's scoring engine.
+Packs the agent's system prompt and guidelines, the latest message,
+retrieved knowledge passages and earlier history into the model's context
+window by priority, leaving room for the configured completion length.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+from knowledge_index import estimate_tokens, format_context
+
+logger = logging.getLogger(__name__)
+
+# Context windows of the models the agents are configured with; a
+# "contextWindow" in the agent's model config overrides these
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-35-turbo": 16385
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Chat format overhead: tokens per message and for priming the reply
+MESSAGE_OVERHEAD = 4
+REPLY_PRIMING = 3
+
+KNOWLEDGE_HEADER = "Relevant T-Minus-15 knowledge:"
+
+# Memoized token counts keyed by (hash, length, model) of the text, so the
+# cache holds no text and its size does not depend on how long it is
+TOKEN_CACHE_SIZE = 8192
+_token_counts: "OrderedDict[Tuple[int, int, str], int]" = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> Any:
+    """The model's tiktoken encoding, or None when tiktoken is not installed"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Azure deployment names need not match OpenAI model names
+        return tiktoken.get_encoding('o200k_base')
+
+
+def count_tokens(text: str, model: str = 'gpt-4o') -> int:
+    """
+    Tokens in a string for the given model.
+
+    Uses tiktoken when available and the ~4 characters per token estimate
+    otherwise. Results are memoized (the last TOKEN_CACHE_SIZE texts), so
+    the system prompt, guidelines and repeated history turns are only
+    tokenized once.
+    """
+    key = (hash(text), len(text), model)
+    with _token_counts_lock:
+        count = _token_counts.get(key)
+        if count is not None:
+            _token_counts.move_to_end(key)
+            return count
+    encoding = _encoding(model)
+    if encoding is None:
+        count = estimate_tokens(text)
+    else:
+        count = len(encoding.encode(text, disallowed_special=()))
+    with _token_counts_lock:
+        _token_counts[key] = count
+        if len(_token_counts) > TOKEN_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = 'gpt-4o') -> str:
+    """Keep the beginning of a string that fits in max_tokens"""
+    if max_tokens <= 0:
+        return ''
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:(max_tokens - 1) * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def message_tokens(message: Dict[str, Any], model: str = 'gpt-4o') -> int:
+    """Tokens one chat message adds to the prompt"""
+    content = message.get('content')
+    if not isinstance(content, str):
+        content = json.dumps(content)
+    return count_tokens(content, model) + MESSAGE_OVERHEAD
+
+
+def compose_system_prompt(instructions: Dict[str, Any]) -> str:
+    """The agent's system prompt followed by its guidelines"""
+    system_prompt = instructions.get('systemPrompt', '')
+    guidelines = instructions.get('guidelines', [])
+    if guidelines:
+        system_prompt += "\n\nGuidelines:\n" + "\n".join(f"- {g}" for g in guidelines)
+    return system_prompt.strip()
+
+
+class PromptAssembler:
+    """
+    Builds prompts for one agent configuration.
+
+    The system prompt and its token count are computed once when the
+    assembler is created; per request only the dynamic parts are counted.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        model_config = config.get('model', {})
+        self.model = model_config.get('modelName', 'gpt-4o')
+        self.context_window = model_config.get('contextWindow') or \
+            MODEL_CONTEXT_WINDOWS.get(self.model, DEFAULT_CONTEXT_WINDOW)
+        self.max_completion_tokens = model_config.get('maxTokens', 4096)
+        self.system_prompt = compose_system_prompt(config.get('instructions', {}))
+        self.system_tokens = count_tokens(self.system_prompt, self.model) + MESSAGE_OVERHEAD \
+            if self.system_prompt else 0
+
+    @property
+    def prompt_budget(self) -> int:
+        """Prompt tokens available after reserving the completion"""
+        return self.context_window - self.max_completion_tokens - REPLY_PRIMING
+
+    def _count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def assemble(self, messages: List[Dict[str, Any]], passages: List[Dict[str, Any]],
+                 context_tokens: int, source_attribution: bool = True) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Pack a prompt into the context window.
+
+        In priority order: system prompt and guidelines, the latest message
+        (truncated only if it alone overflows), retrieved passages (up to
+        context_tokens, best first), then earlier history newest first,
+        with conversation summaries ahead of ordinary turns. History stops
+        at the first turn that does not fit, so the result is deterministic
+        and never has gaps.
+
+        Args:
+            messages: Client messages, latest last
+            passages: Retrieved passages, best first
+            context_tokens: Maximum tokens of retrieved knowledge
+            source_attribution: Prefix passages with their source
+
+        Returns:
+            (messages to send, prompt token count)
+        """
+        remaining = self.prompt_budget - self.system_tokens
+
+        latest = messages[-1]
+        latest_tokens = message_tokens(latest, self.model)
+        if latest_tokens > remaining and isinstance(latest.get('content'), str):
+            logger.warning(f"Latest message truncated to fit the {self.context_window}-token context")
+            latest = dict(latest, content=truncate_tokens(latest['content'], remaining - MESSAGE_OVERHEAD, self.model))
+            latest_tokens = message_tokens(latest, self.model)
+        remaining -= latest_tokens
+
+        system_prompt = self.system_prompt
+        if passages and remaining > 0:
+            context = format_context(passages, min(context_tokens, remaining), source_attribution, count=self._count)
+            if context:
+                knowledge = f"\n\n{KNOWLEDGE_HEADER}\n{context}"
+                system_prompt = (system_prompt + knowledge).strip()
+                remaining -= self._count(knowledge)
+
+        history = messages[:-1]
+        pinned = []
+        while history and history[0].get('role') == 'system':
+            pinned.append(history.pop(0))
+        kept = []
+        for message in pinned + history[::-1]:
+            cost = message_tokens(message, self.model)
+            if cost > remaining:
+                break
+            kept.append(message)
+            remaining -= cost
+        turns = kept[len(pinned):][::-1] if len(kept) > len(pinned) else []
+        kept_pinned = kept[:len(pinned)]
+
+        prompt = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        prompt += kept_pinned + turns + [latest]
+        return prompt, self.prompt_budget - remaining + REPLY_PRIMING
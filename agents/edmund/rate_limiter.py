@@ -0,0 +1,236 @@
+"""
+Request rate limiting for Edmund's API.
+Enforces the "rateLimiting" blocks of agent-config.json / mcp-config.json
+(requestsPerMinute, requestsPerHour) with one token bucket per client and
+window, so bursts up to the limit are allowed and sustained traffic is
+held to the configured rate.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_KEYS = 10000
+REDIS_KEY_PREFIX = "edmund:ratelimit:"
+
+# Window name in the rateLimiting config -> window length in seconds
+WINDOWS = {
+    "requestsPerMinute": 60,
+    "requestsPerHour": 3600
+}
+
+
+class RateLimitRule(NamedTuple):
+    """At most `limit` requests per `period` seconds"""
+    limit: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second"""
+        return self.limit / self.period
+
+
+def rate_limit_rules(rate_limiting: Dict[str, Any]) -> List[RateLimitRule]:
+    """
+    Read the rules from a "rateLimiting" config block.
+
+    Returns:
+        One rule per configured window; empty when the block is missing or
+        has "enabled": false
+    """
+    if not rate_limiting.get('enabled', True):
+        return []
+    return [
+        RateLimitRule(int(rate_limiting[name]), period)
+        for name, period in WINDOWS.items()
+        if rate_limiting.get(name)
+    ]
+
+
+class RateLimiter:
+    """
+    In-process token buckets keyed by client.
+
+    Each check is O(number of rules). Buckets for at most max_keys clients
+    are kept, least recently seen first out; an evicted client simply
+    starts again with full buckets, which is what an idle client would
+    have anyway.
+    """
+
+    backend = "memory"
+
+    def __init__(self, rules: List[RateLimitRule], max_keys: int = DEFAULT_MAX_KEYS,
+                 clock=time.monotonic):
+        self.rules = rules
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> (last refill time, [tokens per rule]), least recently seen first
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def check(self, key: str) -> Tuple[bool, float]:
+        """
+        Take one token from every bucket of a client.
+
+        Args:
+            key: Client identifier (API key hash or client address)
+
+        Returns:
+            (allowed, retry_after) where retry_after is the number of
+            seconds until the request would be allowed (0 when allowed)
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._buckets.pop(key, None)
+            if entry is None:
+                tokens = [float(rule.limit) for rule in self.rules]
+            else:
+                last, tokens = entry
+                tokens = [
+                    min(rule.limit, t + (now - last) * rule.rate)
+                    for rule, t in zip(self.rules, tokens)
+                ]
+
+            retry_after = max(
+                ((1 - t) / rule.rate for rule, t in zip(self.rules, tokens) if t < 1),
+                default=0.0
+            )
+            if retry_after == 0.0:
+                tokens = [t - 1 for t in tokens]
+                self.allowed += 1
+            else:
+                self.rejected += 1
+
+            self._buckets[key] = (now, tokens)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after == 0.0, retry_after
+
+    async def acheck(self, key: str) -> Tuple[bool, float]:
+        return self.check(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Allowed/rejected counters and tracked clients"""
+        return {
+            "backend": self.backend,
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected
+        }
+
+
+# Refills and takes a token from every bucket (one hash per rule) atomically,
+# using the Redis server clock so all replicas agree on elapsed time.
+# ARGV holds (limit, rate) pairs; returns the wait in seconds as a string.
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tokens = {}
+local wait = 0
+for i = 1, #KEYS do
+  local limit = tonumber(ARGV[2 * i - 1])
+  local rate = tonumber(ARGV[2 * i])
+  local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+  local t = tonumber(state[1]) or limit
+  local ts = tonumber(state[2]) or now
+  t = math.min(limit, t + (now - ts) * rate)
+  if t < 1 then wait = math.max(wait, (1 - t) / rate) end
+  tokens[i] = t
+end
+for i = 1, #KEYS do
+  local limit = tonumber(ARGV[2 * i - 1])
+  local rate = tonumber(ARGV[2 * i])
+  local t = tokens[i]
+  if wait == 0 then t = t - 1 end
+  redis.call('HSET', KEYS[i], 'tokens', tostring(t), 'ts', tostring(now))
+  redis.call('EXPIRE', KEYS[i], math.ceil(limit / rate) + 1)
+end
+return tostring(wait)
+"""
+
+
+class RedisRateLimiter:
+    """
+    Token buckets shared by all replicas through Redis.
+
+    Bucket hashes expire once they would have refilled completely, so idle
+    clients cost no memory. Redis errors are logged and the request is
+    allowed, so a Redis outage never takes the API down with it.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, rules: List[RateLimitRule]):
+        # Imported lazily so the in-process limiter has no redis dependency
+        import redis.asyncio
+
+        self.rules = rules
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._args = [value for rule in rules for value in (rule.limit, rule.rate)]
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    async def acheck(self, key: str) -> Tuple[bool, float]:
+        keys = [f"{REDIS_KEY_PREFIX}{key}:{int(rule.period)}" for rule in self.rules]
+        try:
+            retry_after = float(await self._script(keys=keys, args=self._args))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Rate limit check failed, allowing request: {str(e)}")
+            retry_after = 0.0
+        if retry_after > 0:
+            self.rejected += 1
+            return False, retry_after
+        self.allowed += 1
+        return True, 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "errors": self.errors
+        }
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After value: whole seconds, rounded up"""
+    return str(max(1, math.ceil(seconds)))
+
+
+def create_rate_limiter(*rate_limiting: Dict[str, Any]) -> Optional[Any]:
+    """
+    Build the limiter described by one or more "rateLimiting" config blocks.
+
+    Where several blocks limit the same window, the strictest limit applies.
+    RATE_LIMIT_REDIS_URL switches to the shared Redis backend.
+
+    Returns:
+        The limiter, or None when no limits are configured
+    """
+    strictest: Dict[float, RateLimitRule] = {}
+    for block in rate_limiting:
+        for rule in rate_limit_rules(block):
+            if rule.period not in strictest or rule.limit < strictest[rule.period].limit:
+                strictest[rule.period] = rule
+    rules = sorted(strictest.values(), key=lambda rule: rule.period)
+    if not rules:
+        return None
+    redis_url = os.getenv('RATE_LIMIT_REDIS_URL')
+    if redis_url:
+        return RedisRateLimiter(redis_url, rules)
+    return RateLimiter(rules, int(os.getenv('RATE_LIMIT_MAX_CLIENTS', DEFAULT_MAX_KEYS)))
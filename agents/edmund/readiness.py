@@ -0,0 +1,134 @@
+"""
+Readiness checks for Edmund's dependencies.
+Checks (model reachability, knowledge index, cache backend) run in a
+background task every READINESS_INTERVAL seconds and their results are
+cached, so a readiness probe only reads the last report: probes never
+wait on an upstream call and their frequency does not change how often
+Azure OpenAI or Redis are contacted.
+
+A failing critical check makes the service not ready; other failures
+only mark it degraded, since it still answers without them (e.g.
+without retrieval or caching).
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable, Iterable, Mapping, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 15.0
+DEFAULT_CHECK_TIMEOUT = 5.0
+
+# Reports older than this many intervals mean the refresh loop is stuck
+STALE_INTERVALS = 3
+
+
+class CheckResult(NamedTuple):
+    """Outcome of one dependency check"""
+    ok: bool
+    critical: bool
+    detail: str
+    latency_seconds: float
+
+
+class ReadinessMonitor:
+    """
+    Runs dependency checks in the background and serves the cached report.
+
+    Each check is an async callable returning a short detail string; it
+    fails by raising (or by taking longer than the timeout).
+    """
+
+    def __init__(self, checks: Mapping[str, Callable[[], Awaitable[str]]], critical: Iterable[str] = (),
+                 interval: float = DEFAULT_INTERVAL, timeout: float = DEFAULT_CHECK_TIMEOUT,
+                 clock=time.monotonic):
+        self.checks = dict(checks)
+        self.critical = set(critical)
+        self.interval = interval
+        self.timeout = timeout
+        self._clock = clock
+        self.results: Dict[str, CheckResult] = {}
+        self.refreshed_at: Optional[float] = None
+        # Set on shutdown so load balancers stop sending new requests
+        self.draining = False
+
+    async def _check(self, name: str, check: Callable[[], Awaitable[str]]) -> CheckResult:
+        started = self._clock()
+        try:
+            detail = await asyncio.wait_for(check(), self.timeout)
+            ok = True
+        except asyncio.TimeoutError:
+            ok, detail = False, f"timed out after {self.timeout}s"
+        except Exception as e:
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        return CheckResult(ok, name in self.critical, detail, self._clock() - started)
+
+    async def refresh(self) -> Dict[str, CheckResult]:
+        """Run every check concurrently and replace the cached results"""
+        names = list(self.checks)
+        outcomes = await asyncio.gather(*(self._check(name, self.checks[name]) for name in names))
+        results = dict(zip(names, outcomes))
+        for name, result in results.items():
+            previous = self.results.get(name)
+            if not result.ok and (previous is None or previous.ok):
+                logger.warning(f"Readiness check '{name}' failing: {result.detail}")
+            elif result.ok and previous is not None and not previous.ok:
+                logger.info(f"Readiness check '{name}' recovered")
+        self.results = results
+        self.refreshed_at = self._clock()
+        return results
+
+    async def run(self):
+        """Refresh every interval until cancelled"""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Readiness refresh failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def status(self) -> str:
+        """One of starting, draining, stale, not_ready, degraded or ready"""
+        if self.draining:
+            return "draining"
+        if self.refreshed_at is None:
+            return "starting"
+        if self._clock() - self.refreshed_at > self.interval * STALE_INTERVALS:
+            return "stale"
+        if any(r.critical and not r.ok for r in self.results.values()):
+            return "not_ready"
+        if any(not r.ok for r in self.results.values()):
+            return "degraded"
+        return "ready"
+
+    @property
+    def ready(self) -> bool:
+        """Whether the service should receive traffic (degraded still does)"""
+        return self.status() in ("ready", "degraded")
+
+    def report(self) -> Dict[str, Any]:
+        """The cached results; never runs a check"""
+        age = None if self.refreshed_at is None else self._clock() - self.refreshed_at
+        return {
+            "status": self.status(),
+            "ready": self.ready,
+            "age_seconds": age,
+            "checks": {
+                name: {
+                    "ok": result.ok,
+                    "critical": result.critical,
+                    "detail": result.detail,
+                    "latency_seconds": result.latency_seconds
+                }
+                for name, result in self.results.items()
+            }
+        }
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-check up (1/0) and latency, for metrics"""
+        return {
+            name: {"up": int(result.ok), "latency_seconds": result.latency_seconds}
+            for name, result in self.results.items()
+        }
@@ -0,0 +1,317 @@
+"""
+Resilience layer around Edmund's upstream model calls.
+Transient failures (429, 5xx, timeouts, connection errors) are retried
+with jittered exponential backoff that honors Retry-After, within a retry
+budget so retries cannot multiply load on a struggling endpoint. A circuit
+breaker per deployment stops calling a failing deployment and probes it
+again after a cool-down. Slow calls can optionally be hedged.
+Configured by the "resilience" block of agent-config.json.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+import openai
+
+from config_units import parse_duration
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_INITIAL_BACKOFF = "500ms"
+DEFAULT_MAX_BACKOFF = "20s"
+DEFAULT_RETRY_BUDGET = 0.2
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = "30s"
+
+# Retry budgets start with (and never hold more than) this many retries
+BUDGET_RESERVE = 10
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(openai.OpenAIError):
+    """Raised instead of calling a deployment whose circuit breaker is open"""
+
+    def __init__(self, deployment: str, retry_after: float):
+        super().__init__(f"Deployment {deployment} is unavailable (circuit open)")
+        self.deployment = deployment
+        self.retry_after = retry_after
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient upstream failures worth another attempt"""
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    return getattr(error, 'status_code', None) in RETRYABLE_STATUS
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The server's requested wait (retry-after-ms or retry-after), if any"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        # HTTP-date form; fall back to our own backoff
+        return None
+    return None
+
+
+class Budget:
+    """
+    Token bucket limiting extra attempts to a fraction of requests.
+
+    Every request deposits `ratio` tokens and every retry (or hedge) spends
+    one, so in steady state at most ratio * requests extra calls are made.
+    """
+
+    def __init__(self, ratio: float, reserve: int = BUDGET_RESERVE):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = float(reserve) if ratio > 0 else 0.0
+
+    def deposit(self):
+        self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probing.
+
+    closed: calls flow; failure_threshold consecutive failures open it.
+    open: calls are rejected until reset_timeout has passed.
+    half_open: up to half_open_requests probes are let through; a success
+    closes the circuit, a failure opens it again, and a probe that ends
+    without either (e.g. cancelled) gives its slot back.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_timeout: float = 30.0,
+                 half_open_requests: int = 1, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_requests = half_open_requests
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+
+    def allow(self) -> bool:
+        """Whether a call may be made now"""
+        with self._lock:
+            if self.state == "open":
+                if self._clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self.probes = 0
+            if self.state == "half_open":
+                if self.probes >= self.half_open_requests:
+                    return False
+                self.probes += 1
+            return True
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will let a probe through"""
+        return max(0.0, self.opened_at + self.reset_timeout - self._clock())
+
+    def release(self):
+        """Give back a half-open probe slot whose call ended without a verdict"""
+        with self._lock:
+            if self.state == "half_open" and self.probes > 0:
+                self.probes -= 1
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = self._clock()
+
+
+class Resilience:
+    """Retry, hedging and circuit breaking policy shared by all upstream calls"""
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, initial_backoff: float = 0.5,
+                 max_backoff: float = 20.0, retry_budget: float = DEFAULT_RETRY_BUDGET,
+                 hedge_delay: Optional[float] = None, hedge_budget: float = 0.0,
+                 breaker_options: Optional[Dict[str, Any]] = None):
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.retry_budget = Budget(retry_budget)
+        self.hedge_delay = hedge_delay
+        self.hedge_budget = Budget(hedge_budget)
+        self.breaker_options = breaker_options or {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'Resilience':
+        """Build the policy from agent-config.json's "resilience" block"""
+        breaker = config.get('circuitBreaker', {})
+        hedge_delay = config.get('hedgeDelay')
+        return cls(
+            max_retries=int(config.get('maxRetries', DEFAULT_MAX_RETRIES)),
+            initial_backoff=parse_duration(config.get('initialBackoff', DEFAULT_INITIAL_BACKOFF)),
+            max_backoff=parse_duration(config.get('maxBackoff', DEFAULT_MAX_BACKOFF)),
+            retry_budget=float(config.get('retryBudget', DEFAULT_RETRY_BUDGET)),
+            hedge_delay=parse_duration(hedge_delay) if hedge_delay else None,
+            hedge_budget=float(config.get('hedgeBudget', 0.0)),
+            breaker_options={
+                "failure_threshold": int(breaker.get('failureThreshold', DEFAULT_FAILURE_THRESHOLD)),
+                "reset_timeout": parse_duration(breaker.get('resetTimeout', DEFAULT_RESET_TIMEOUT)),
+                "half_open_requests": int(breaker.get('halfOpenRequests', 1))
+            }
+        )
+
+    def breaker(self, deployment: str) -> CircuitBreaker:
+        breaker = self.breakers.get(deployment)
+        if breaker is None:
+            breaker = self.breakers.setdefault(deployment, CircuitBreaker(**self.breaker_options))
+        return breaker
+
+    def _acquire(self, deployment: str) -> CircuitBreaker:
+        breaker = self.breaker(deployment)
+        if not breaker.allow():
+            raise CircuitOpenError(deployment, breaker.retry_after())
+        return breaker
+
+    def _retry_delay(self, deployment: str, breaker: CircuitBreaker, error: Exception,
+                     attempt: int) -> Optional[float]:
+        """Record a failed attempt; return how long to wait before retrying, or None to give up"""
+        if not is_retryable(error):
+            # The deployment answered; the request itself was bad
+            breaker.record_success()
+            return None
+        breaker.record_failure()
+        if attempt >= self.max_retries:
+            return None
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None and retry_after > self.max_backoff:
+            return None
+        if not self.retry_budget.withdraw():
+            logger.warning(f"Retry budget exhausted; not retrying {deployment}")
+            return None
+        backoff = random.uniform(0, min(self.max_backoff, self.initial_backoff * 2 ** attempt))
+        metrics.RETRIES.inc(deployment=deployment, reason=str(getattr(error, 'status_code', None) or type(error).__name__))
+        return max(backoff, retry_after or 0.0)
+
+    async def call(self, deployment: str, create: Callable[[], Awaitable[Any]], hedge: bool = False) -> Any:
+        """
+        Run an upstream call with retries and circuit breaking.
+
+        Args:
+            deployment: Deployment (model) name the breaker is kept for
+            create: Makes one attempt, e.g. lambda: client.chat.completions.create(...)
+            hedge: Allow a second, parallel attempt when the first is slower
+                than hedgeDelay (only for non-streaming calls)
+
+        Raises:
+            CircuitOpenError: If the deployment's circuit is open
+            openai.OpenAIError: The last error once retries are exhausted
+        """
+        self.retry_budget.deposit()
+        self.hedge_budget.deposit()
+        attempt = 0
+        while True:
+            breaker = self._acquire(deployment)
+            settled = False
+            try:
+                if hedge and self.hedge_delay is not None:
+                    result = await self._hedged(deployment, create)
+                else:
+                    result = await create()
+                settled = True
+            except Exception as e:
+                settled = True
+                delay = self._retry_delay(deployment, breaker, e, attempt)
+                if delay is None:
+                    raise
+                logger.warning(f"Retrying {deployment} in {delay:.2f}s after: {str(e)}")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            finally:
+                # Cancelled (client went away, or a losing hedge): free a half-open probe slot
+                if not settled:
+                    breaker.release()
+            breaker.record_success()
+            return result
+
+    def call_sync(self, deployment: str, create: Callable[[], Any]) -> Any:
+        """Blocking counterpart of call() for the synchronous client"""
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            breaker = self._acquire(deployment)
+            settled = False
+            try:
+                result = create()
+                settled = True
+            except Exception as e:
+                settled = True
+                delay = self._retry_delay(deployment, breaker, e, attempt)
+                if delay is None:
+                    raise
+                logger.warning(f"Retrying {deployment} in {delay:.2f}s after: {str(e)}")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            finally:
+                if not settled:
+                    breaker.release()
+            breaker.record_success()
+            return result
+
+    async def _hedged(self, deployment: str, create: Callable[[], Awaitable[Any]]) -> Any:
+        """Start a second attempt if the first has not answered within hedge_delay; first success wins"""
+        first = asyncio.ensure_future(create())
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done or not self.hedge_budget.withdraw():
+            return await first
+
+        metrics.HEDGES.inc(deployment=deployment)
+        pending = {first, asyncio.ensure_future(create())}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit state per deployment"""
+        return {
+            deployment: {"state": breaker.state, "failures": breaker.failures}
+            for deployment, breaker in self.breakers.items()
+        }
@@ -0,0 +1,234 @@
+"""
+Completion cache for Edmund's scoring engine.
+Identical prompts (same normalized messages, system prompt and model
+parameters) are answered from the cache instead of calling the model again.
+Configured by the "caching" block of knowledge-sources.json.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Mapping, Optional
+
+import fast_json
+from config_units import parse_duration, parse_size
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = "1h"
+DEFAULT_MAX_CACHE_SIZE = "100MB"
+REDIS_KEY_PREFIX = "edmund:response:"
+
+
+def _normalize_content(content: Any) -> Any:
+    """Collapse whitespace so trivially different prompts share an entry"""
+    if isinstance(content, str):
+        return " ".join(content.split())
+    return content
+
+
+def cache_key(messages: List[Dict[str, Any]], model_params: Mapping[str, Any]) -> str:
+    """
+    Key for a completion request.
+
+    Args:
+        messages: Final messages sent to the model, including the system
+            prompt and any retrieved context
+        model_params: Model name and sampling parameters
+
+    Returns:
+        Hex digest identifying the request
+    """
+    normalized = [
+        {"role": m.get('role'), "name": m.get('name'), "content": _normalize_content(m.get('content'))}
+        for m in messages
+    ]
+    payload = fast_json.dumps_bytes({"messages": normalized, "params": dict(model_params)}, sort_keys=True)
+    return hashlib.sha256(payload).hexdigest()
+
+
+class ResponseCache:
+    """
+    In-process LRU cache bounded by total entry size, with a TTL per entry.
+
+    Entries are stored serialized, so the byte bound reflects the real
+    memory held and cached results cannot be mutated by callers.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return fast_json.loads(payload)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store a result, evicting least recently used entries to stay within max_bytes"""
+        payload = fast_json.dumps_bytes(value)
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self.size_bytes + len(payload) > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+            self.size_bytes += len(payload)
+
+    def _remove(self, key: str):
+        _, payload = self._entries.pop(key)
+        self.size_bytes -= len(payload)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        self.set(key, value)
+
+    async def aping(self) -> str:
+        """In process, so always reachable (readiness check)"""
+        return f"{len(self._entries)} entries"
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+
+class RedisResponseCache:
+    """
+    Cache shared by all replicas through Redis.
+
+    Entries expire with Redis TTLs; LRU eviction and the memory bound are
+    delegated to the Redis server (maxmemory / allkeys-lru). Redis errors
+    are logged and treated as misses so a cache outage never fails a chat.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, ttl_seconds: float):
+        # Imported lazily so the in-memory cache has no redis dependency
+        import redis
+        import redis.asyncio
+
+        self.ttl_seconds = int(ttl_seconds)
+        self._client = redis.Redis.from_url(url)
+        self._async_client = redis.asyncio.Redis.from_url(url)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _record(self, payload: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        if payload is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return fast_json.loads(payload)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._record(self._client.get(REDIS_KEY_PREFIX + key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache read failed: {str(e)}")
+            return self._record(None)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        try:
+            self._client.set(REDIS_KEY_PREFIX + key, fast_json.dumps_bytes(value), ex=self.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._record(await self._async_client.get(REDIS_KEY_PREFIX + key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache read failed: {str(e)}")
+            return self._record(None)
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        try:
+            await self._async_client.set(REDIS_KEY_PREFIX + key, fast_json.dumps_bytes(value), ex=self.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+    async def aping(self) -> str:
+        """Round trip to the Redis server (readiness check); raises when it is unreachable"""
+        await self._async_client.ping()
+        return "redis reachable"
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_response_cache(caching_config: Dict[str, Any]) -> Optional[Any]:
+    """
+    Build the cache described by knowledge-sources.json's "caching" block.
+
+    RESPONSE_CACHE_REDIS_URL switches to the shared Redis backend.
+
+    Returns:
+        The cache, or None when caching is disabled
+    """
+    if not caching_config.get('enabled', False):
+        return None
+
+    policy = caching_config.get('evictionPolicy', 'lru')
+    if policy != 'lru':
+        logger.warning(f"Unsupported cache eviction policy '{policy}', using lru")
+
+    ttl_seconds = parse_duration(caching_config.get('ttl', DEFAULT_TTL))
+    redis_url = os.getenv('RESPONSE_CACHE_REDIS_URL')
+    if redis_url:
+        return RedisResponseCache(redis_url, ttl_seconds)
+    return ResponseCache(parse_size(caching_config.get('maxCacheSize', DEFAULT_MAX_CACHE_SIZE)), ttl_seconds)
@@ -6,47 +6,702 @@ This script handles incoming requests and interfaces with the agent configuratio
 
 import os
 import json
+import asyncio
 import logging
-from typing import Dict, Any, List
+from collections import deque
+from functools import partial
+from types import MappingProxyType, SimpleNamespace
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, Mapping, Optional, AsyncIterator
+import httpx
 import openai
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from knowledge_index import KnowledgeIndex, load_knowledge_sources
+from response_cache import cache_key, create_response_cache
+from agent_registry import _freeze, load_registry, DEFAULT_AGENTS_ROOT
+from agent_snapshot import (
+    AgentSnapshot, RetrievalSettings, compile_registry, compile_retrieval_settings, load_snapshot
+)
+from resilience import Resilience
+from upstream_pool import UpstreamPool, create_upstream_pool
+from startup_timing import timed
+import metrics
+import fast_json
+import structured_log
+import tracing
+from structured_log import log_event
+
+# Configure logging (queued, formatted on a background thread)
+structured_log.configure()
 logger = logging.getLogger(__name__)
 
 # Global variables for model and configuration
 client = None
+async_client = None
 agent_config = None
+knowledge_index: Optional[KnowledgeIndex] = None
+search_config: Dict[str, Any] = {}
+# searchConfiguration values read per request, resolved when it is loaded
+retrieval_settings: RetrievalSettings = compile_retrieval_settings({})
+
+# Every T-Minus-15 agent served by this process, keyed by lowercase name
+agent_registry: Dict[str, Any] = {}
+
+# Validated, precompiled views of agent_config and agent_registry that the
+# request path reads (see agent_snapshot.py); replaced whole on reload
+agent_snapshot: Optional[AgentSnapshot] = None
+agent_snapshots: Mapping[str, AgentSnapshot] = {}
+
+# Object with search(query, k) used for retrieval: the KnowledgeIndex itself,
+# or a HybridRetriever when a semantic index is available
+retriever: Any = None
+
+# Completion cache (ResponseCache or RedisResponseCache), None when disabled
+response_cache: Any = None
+
+# Near-duplicate question cache (SemanticCache), None when disabled
+semantic_cache: Any = None
+
+# Retries, hedging and per-deployment circuit breakers for upstream calls
+resilience: Optional[Resilience] = None
+
+# Deployments (across endpoints) async completions are balanced over, with
+# the model fallback chain; None sends everything to async_client
+upstream_pool: Optional[UpstreamPool] = None
+
+# Tools of the enabled MCP servers offered to this agent's model, None when MCP is off
+tool_executor: Any = None
+
+# Server-side conversation history keyed by session, None when memory is disabled
+conversation_store: Any = None
+
+# Conversation summaries run after the answer is sent; tasks are kept
+# referenced here until they finish
+_background_tasks: set = set()
+_compacting: set = set()
+
+# Bounds the number of in-flight upstream completions for the async path
+request_slots: Optional[asyncio.Semaphore] = None
+
+# Async client pool defaults (overridable through environment variables)
+DEFAULT_MAX_CONCURRENCY = 256
+DEFAULT_MAX_CONNECTIONS = 256
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 64
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_REQUEST_TIMEOUT = 60.0
+
+# Length of the running summary that replaces old conversation turns
+DEFAULT_SUMMARY_TOKENS = 512
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the conversation below for your own future reference. Keep decisions, "
+    "facts, names, code identifiers and open questions; drop pleasantries. "
+    "Merge it with the previous summary if there is one."
+)
+
+# Model turns that may request tools before the answer is returned as is
+MAX_TOOL_ROUNDS = 5
+
+# Bulk scoring: requests processed concurrently by run_batch
+DEFAULT_BATCH_CONCURRENCY = 16
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """
+    Create the pooled httpx client shared by all async Azure OpenAI clients.
+
+    All async requests go through one connection pool so connections are
+    kept alive and reused instead of re-negotiating TLS per request.
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv('AZURE_OPENAI_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS)),
+        max_keepalive_connections=int(os.getenv('AZURE_OPENAI_MAX_KEEPALIVE', DEFAULT_MAX_KEEPALIVE_CONNECTIONS)),
+        keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv('AZURE_OPENAI_TIMEOUT', DEFAULT_REQUEST_TIMEOUT)),
+        connect=DEFAULT_CONNECT_TIMEOUT
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def _create_async_client(endpoint: Optional[str] = None, api_key: Optional[str] = None,
+                         http_client: Optional[httpx.AsyncClient] = None) -> AsyncAzureOpenAI:
+    """Create an async Azure OpenAI client (defaults to AZURE_OPENAI_ENDPOINT)"""
+    return AsyncAzureOpenAI(
+        api_key=api_key or os.getenv('AZURE_OPENAI_API_KEY'),
+        api_version=os.getenv('AZURE_OPENAI_API_VERSION', '2024-12-01-preview'),
+        azure_endpoint=endpoint or os.getenv('AZURE_OPENAI_ENDPOINT'),
+        timeout=float(os.getenv('AZURE_OPENAI_TIMEOUT', DEFAULT_REQUEST_TIMEOUT)),
+        # Retries are handled by the resilience layer
+        max_retries=0,
+        http_client=http_client or _create_http_client()
+    )
+
+
+def _load_knowledge(sources_config: Dict[str, Any]):
+    """
+    Load the search configuration and the on-disk knowledge index.
+    
+    Retrieval is optional: a missing or unreadable index only disables
+    context injection, it never prevents the agent from starting.
+    """
+    global knowledge_index, search_config, retrieval_settings, retriever
+    
+    search_config = sources_config.get('searchConfiguration', {})
+    retrieval_settings = compile_retrieval_settings(search_config)
+    
+    index_path = os.getenv('KNOWLEDGE_INDEX_PATH', './knowledge-index.json')
+    if not search_config.get('fullTextSearchEnabled', True):
+        logger.info("Full-text search disabled in knowledge sources configuration")
+        return
+    if not os.path.exists(index_path):
+        logger.warning(f"Knowledge index not found at {index_path}; answering without retrieval")
+        return
+    
+    try:
+        knowledge_index = KnowledgeIndex.load(index_path)
+        retriever = knowledge_index
+        logger.info(f"Knowledge index loaded: {len(knowledge_index)} passages")
+    except Exception as e:
+        logger.error(f"Failed to load knowledge index: {str(e)}")
+        return
+    
+    # Upgrade to hybrid retrieval when a semantic index has been built
+    semantic_prefix = os.getenv('SEMANTIC_INDEX_PATH', './semantic-index')
+    if search_config.get('defaultSearchMode', 'hybrid') != 'hybrid' or \
+            not search_config.get('semanticSearchEnabled', True) or \
+            not os.path.exists(f"{semantic_prefix}.npy"):
+        return
+    
+    try:
+        # numpy is only needed once semantic search is actually enabled
+        from semantic_index import SemanticIndex, HybridRetriever, source_weights
+        retriever = HybridRetriever(
+            knowledge_index, SemanticIndex.load(semantic_prefix), source_weights(sources_config)
+        )
+        logger.info("Semantic index loaded; using hybrid retrieval")
+    except Exception as e:
+        logger.error(f"Failed to load semantic index, using full-text retrieval only: {str(e)}")
+
+
+def _create_semantic_cache(sources_config: Dict[str, Any]) -> Any:
+    """
+    Build the near-duplicate question cache from the "caching" block.
+    
+    Questions are embedded with the semantic index's embedder when one is
+    loaded (so paraphrases match as well as retrieval does), otherwise with
+    the offline hashing embedder. The match threshold reuses
+    searchConfiguration.relevanceThreshold.
+    """
+    caching = sources_config.get('caching', {})
+    options = caching.get('semanticCache', {})
+    if not caching.get('enabled', False) or not options.get('enabled', False):
+        return None
+    
+    try:
+        from semantic_cache import SemanticCache, DEFAULT_MAX_ENTRIES, HASHING_EMBEDDER_THRESHOLD
+        from semantic_index import HashingEmbedder
+        from config_units import parse_duration
+        
+        semantic_index = getattr(retriever, 'semantic_index', None)
+        embedder = semantic_index.embedder if semantic_index is not None else HashingEmbedder()
+        threshold = float(options.get('threshold', search_config.get('relevanceThreshold', 0.9)))
+        if getattr(embedder, 'name', None) == HashingEmbedder.name and threshold < HASHING_EMBEDDER_THRESHOLD:
+            logger.warning(f"Semantic cache has no embedding model; raising its threshold "
+                           f"from {threshold} to {HASHING_EMBEDDER_THRESHOLD}")
+            threshold = HASHING_EMBEDDER_THRESHOLD
+        cache = SemanticCache(
+            embedder,
+            threshold=threshold,
+            max_entries=int(options.get('maxEntries', DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=parse_duration(caching.get('ttl', '1h'))
+        )
+        logger.info(f"Semantic cache enabled (threshold {cache.threshold})")
+        return cache
+    except Exception as e:
+        logger.error(f"Failed to create semantic cache: {str(e)}")
+        return None
+
+
+def _standalone_question(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    The user's question when a request is a single standalone turn.
+    
+    Follow-up turns depend on the earlier conversation, so only requests
+    made of exactly one user message are eligible for semantic caching.
+    """
+    if len(messages) != 1 or messages[0].get('role') != 'user':
+        return None
+    content = messages[0].get('content')
+    return content.strip() if isinstance(content, str) and content.strip() else None
+
+
+def _semantic_cache_lookup(messages: List[Dict[str, Any]], snapshot: AgentSnapshot) -> Optional[Dict[str, Any]]:
+    """
+    Answer a standalone question from the semantic cache, if a close match
+    exists. Answers are only shared between requests with the same agent
+    prompt and parameters (AgentSnapshot.semantic_scope).
+    """
+    if semantic_cache is None:
+        return None
+    question = _standalone_question(messages)
+    if question is None:
+        return None
+    return semantic_cache.get(question, snapshot.semantic_scope)
+
+
+def _semantic_cache_store(messages: List[Dict[str, Any]], snapshot: AgentSnapshot, result: Dict[str, Any]):
+    """Remember the answer to a standalone question"""
+    if semantic_cache is None:
+        return
+    question = _standalone_question(messages)
+    if question is not None:
+        semantic_cache.set(question, snapshot.semantic_scope, result)
+
+
+async def _semantic_cache_alookup(messages: List[Dict[str, Any]],
+                                  snapshot: AgentSnapshot) -> Optional[Dict[str, Any]]:
+    """_semantic_cache_lookup with the embedding and scan on a worker thread"""
+    if semantic_cache is None:
+        return None
+    question = _standalone_question(messages)
+    if question is None:
+        return None
+    return await semantic_cache.aget(question, snapshot.semantic_scope)
+
+
+async def _semantic_cache_astore(messages: List[Dict[str, Any]], snapshot: AgentSnapshot,
+                                 result: Dict[str, Any]):
+    if semantic_cache is None:
+        return
+    question = _standalone_question(messages)
+    if question is not None:
+        await semantic_cache.aset(question, snapshot.semantic_scope, result)
+
 
 def init():
     """
     Initialize the model and configuration.
     This function is called when the deployment starts.
     """
-    global client, agent_config
+    global client, async_client, agent_config, agent_registry, agent_snapshot, agent_snapshots
+    global request_slots, response_cache, semantic_cache, conversation_store, resilience, upstream_pool, tool_executor
     
     try:
-        # Load agent configuration
-        config_path = os.getenv('AGENT_CONFIG_PATH', './agent-config.json')
-        with open(config_path, 'r') as f:
-            agent_config = json.load(f)
+        # Spans for each request stage when TRACE_SAMPLE_RATE is above 0
+        with timed("init.tracing"):
+            tracing.configure()
+        
+        # Load and validate the agent configuration (raises ConfigError)
+        with timed("init.config"):
+            agent_config, agent_snapshot = load_snapshot(os.getenv('AGENT_CONFIG_PATH', './agent-config.json'))
+        
+        # Load the other T-Minus-15 agents so one process can serve them all
+        with timed("init.registry"):
+            agent_registry = load_registry(
+                os.getenv('AGENTS_ROOT', DEFAULT_AGENTS_ROOT),
+                extra_configs={agent_snapshot.name: agent_config}
+            )
+            agent_snapshots = compile_registry(agent_registry)
         
         # Initialize Azure OpenAI client
-        client = AzureOpenAI(
-            api_key=os.getenv('AZURE_OPENAI_API_KEY'),
-            api_version=os.getenv('AZURE_OPENAI_API_VERSION', '2024-12-01-preview'),
-            azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT')
-        )
+        with timed("init.sync_client"):
+            client = AzureOpenAI(
+                api_key=os.getenv('AZURE_OPENAI_API_KEY'),
+                api_version=os.getenv('AZURE_OPENAI_API_VERSION', '2024-12-01-preview'),
+                azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
+                max_retries=0
+            )
+            resilience = Resilience.from_config(agent_config.get('resilience', {}))
+        
+        # Load the knowledge index used for retrieval-augmented prompts
+        with timed("init.knowledge"):
+            sources_config = load_knowledge_sources(
+                os.getenv('KNOWLEDGE_SOURCES_PATH', './knowledge-sources.json')
+            )
+            _load_knowledge(sources_config)
+        
+        # Initialize the completion cache from the "caching" block
+        with timed("init.caches"):
+            response_cache = create_response_cache(sources_config.get('caching', {}))
+            if response_cache is not None:
+                logger.info(f"Response cache enabled ({response_cache.backend})")
+            semantic_cache = _create_semantic_cache(sources_config)
+        
+        # Keep conversation history server-side when the agent has memory
+        with timed("init.conversations"):
+            from conversation_store import create_conversation_store
+            conversation_store = create_conversation_store(agent_config.get('features', {}))
+            if conversation_store is not None:
+                logger.info(f"Conversation memory enabled ({conversation_store.backend})")
+        
+        # Offer the MCP servers' tools to the model when integrations are on
+        with timed("init.tools"):
+            if agent_config.get('integration', {}).get('mcpEnabled', False):
+                from mcp_tools import create_tool_executor, load_mcp_config
+                tool_executor = create_tool_executor(
+                    load_mcp_config(os.getenv('MCP_CONFIG_PATH', './mcp-config.json'))
+                )
+        
+        # Initialize the shared async client used by run_async/process_async,
+        # and the pool of deployments completions are balanced over
+        with timed("init.async_clients"):
+            http_client = _create_http_client()
+            async_client = _create_async_client(http_client=http_client)
+            upstream_pool = create_upstream_pool(
+                agent_config,
+                lambda endpoint, api_key: _create_async_client(endpoint, api_key, http_client),
+                resilience,
+                agent_registry
+            )
+            request_slots = asyncio.Semaphore(
+                int(os.getenv('EDMUND_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+            )
         
         logger.info("Edmund Agent initialized successfully")
-        logger.info(f"Model: {agent_config.get('model', {}).get('modelName', 'gpt-4o')}")
+        logger.info(f"Model: {agent_snapshot.model}")
         
     except Exception as e:
         logger.error(f"Initialization failed: {str(e)}")
         raise
 
 
+def _retrieve_passages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Retrieve knowledge passages relevant to the latest user message"""
+    if retriever is None:
+        return []
+    
+    query = next(
+        (m.get('content') for m in reversed(messages) if m.get('role') == 'user'), None
+    )
+    if not isinstance(query, str) or not query:
+        return []
+    
+    top_k = retrieval_settings.top_k
+    with tracing.start_span("scoring.retrieval", {"edmund.retrieval.top_k": top_k}) as span:
+        passages = retriever.search(query, top_k)
+        span.set_attribute("edmund.retrieval.passages", len(passages))
+    return passages
+
+
+def get_agent(agent_name: Optional[str] = None) -> AgentSnapshot:
+    """
+    Look up the snapshot of the agent answering a request.
+    
+    Requests read the snapshot once and use it throughout, so a reload
+    mid-request never mixes two configurations.
+    
+    Args:
+        agent_name: Agent name (case-insensitive); None selects the agent
+            loaded from AGENT_CONFIG_PATH
+        
+    Raises:
+        KeyError: If no agent with that name is registered
+    """
+    if agent_name is None:
+        return agent_snapshot
+    return agent_snapshots[agent_name.lower()]
+
+
+def reload_agent_config(config: Dict[str, Any], snapshot: AgentSnapshot):
+    """
+    Swap in a new configuration for the agent loaded from AGENT_CONFIG_PATH
+    (called by agent_snapshot.ConfigWatcher after validation).
+    
+    Prompts, model parameters and cache scopes take effect on the next
+    request. Clients, the upstream pool, rate limits and resilience
+    settings are built at startup and need a restart.
+    """
+    global agent_config, agent_registry, agent_snapshot, agent_snapshots
+    key = snapshot.name.lower()
+    # Keep the persona profile load_registry attached to the old config
+    profile = agent_registry[key].get('profile') if key in agent_registry else None
+    entry = dict(config, profile=profile) if profile is not None else config
+    agent_registry = MappingProxyType(dict(agent_registry, **{key: _freeze(entry)}))
+    agent_snapshots = MappingProxyType(dict(agent_snapshots, **{key: snapshot}))
+    agent_config, agent_snapshot = config, snapshot
+    # Answers cached under the replaced prompt or parameters can no longer be hit
+    if semantic_cache is not None:
+        semantic_cache.retain_scopes(s.semantic_scope for s in agent_snapshots.values())
+
+
+async def _create_completion(model_params: Mapping[str, Any], hedge: bool = False,
+                             fallbacks: Optional[Iterable[str]] = None, **kwargs) -> tuple:
+    """
+    Call chat.completions.create through the resilience layer (retries with
+    backoff, circuit breaker, optional hedging), on the least loaded
+    deployment of the upstream pool when one is configured, falling back
+    to the agent's fallback models (AgentSnapshot.fallback_models).
+
+    Returns:
+        (completion or stream, deployment that served it, which differs
+        from model_params['model'] after a fallback)
+    """
+    attributes = {"gen_ai.request.model": model_params['model'], "edmund.hedge": hedge}
+    with tracing.start_span("model.completion", attributes) as span:
+        if upstream_pool is not None:
+            response, model = await upstream_pool.complete(model_params, hedge=hedge, fallbacks=fallbacks, **kwargs)
+        else:
+            create = partial(async_client.chat.completions.create, **kwargs, **model_params)
+            if resilience is None:
+                response = await create()
+            else:
+                response = await resilience.call(model_params['model'], create, hedge=hedge)
+            model = model_params['model']
+        span.set_attribute("gen_ai.response.model", model)
+        # Streams report usage in their last chunk (see stream_async)
+        if not kwargs.get('stream'):
+            tracing.set_usage(span, response.usage)
+    return response, model
+
+
+def _collect_cache_metrics() -> List[metrics.Metric]:
+    """Scrape-time gauges for the response and semantic caches"""
+    stats = {
+        name: cache.stats()
+        for name, cache in (("response", response_cache), ("semantic", semantic_cache))
+        if cache is not None
+    }
+    if tool_executor is not None:
+        stats["tool"] = tool_executor.cache.stats()
+    return metrics.stats_gauges(
+        "edmund_cache", "Completion cache statistics", "cache", stats,
+        ("hits", "misses", "evictions", "entries", "hit_ratio")
+    )
+
+
+def _collect_resilience_metrics() -> List[metrics.Metric]:
+    """Scrape-time circuit breaker state per deployment (1 = open, 0.5 = half open)"""
+    if resilience is None:
+        return []
+    states = {"closed": 0, "half_open": 0.5, "open": 1}
+    stats = {
+        deployment: {"open": states[values['state']], "consecutive_failures": values['failures']}
+        for deployment, values in resilience.stats().items()
+    }
+    return metrics.stats_gauges(
+        "edmund_circuit", "Upstream circuit breakers", "deployment", stats, ("open", "consecutive_failures")
+    )
+
+
+def _collect_upstream_metrics() -> List[metrics.Metric]:
+    """Scrape-time load of each deployment in the upstream pool"""
+    if upstream_pool is None:
+        return []
+    stats = {target['key']: target for target in upstream_pool.stats()}
+    return metrics.stats_gauges(
+        "edmund_upstream", "Upstream deployment load", "target", stats, ("outstanding", "latency_seconds")
+    )
+
+
+def _collect_log_metrics() -> List[metrics.Metric]:
+    """Scrape-time depth of the log queue and records dropped when it was full"""
+    return metrics.stats_gauges(
+        "edmund_log", "Log queue", "queue", {"default": structured_log.stats()}, ("queued", "dropped")
+    )
+
+
+metrics.register_collector(_collect_cache_metrics)
+metrics.register_collector(_collect_resilience_metrics)
+metrics.register_collector(_collect_upstream_metrics)
+metrics.register_collector(_collect_log_metrics)
+
+
+def _session_key(snapshot: AgentSnapshot, session_id: Optional[str]) -> Optional[str]:
+    """Sessions are kept per agent, so one session_id can talk to several agents"""
+    if conversation_store is None or not session_id:
+        return None
+    return f"{snapshot.name.lower()}:{session_id}"
+
+
+def open_session(session_id: Any, agent_name: Optional[str] = None,
+                 caller: Optional[str] = None) -> Optional[str]:
+    """
+    The session a chat continues or starts.
+    
+    Clients never choose session ids: a chat without one starts a session
+    under a new random id, and an id this server did not issue (or has
+    since evicted) is rejected.
+    
+    Args:
+        session_id: The id the client sent, if any
+        agent_name: Registered agent the chat is for (defaults to this agent)
+        caller: Identity the session is bound to (see process_async)
+        
+    Returns:
+        The session id to pass in the request data (None when memory is off)
+        
+    Raises:
+        SessionNotFoundError: If the client's session_id is unknown
+        SessionOwnerError: If the session was started by another caller
+    """
+    if conversation_store is None:
+        return None
+    # Imported lazily like the store itself (see init)
+    from conversation_store import SessionNotFoundError, new_session_id
+    
+    if session_id is None:
+        return new_session_id()
+    if not isinstance(session_id, str) or not session_id:
+        raise SessionNotFoundError(str(session_id))
+    conversation_store.check(_session_key(get_agent(agent_name), session_id), caller)
+    return session_id
+
+
+def _with_history(session: Optional[str], messages: List[Dict[str, Any]],
+                  caller: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Prepend the stored conversation to the new turn (raises SessionOwnerError for another caller's session)"""
+    if session is None:
+        return messages
+    return conversation_store.history(session, caller) + messages
+
+
+def _remember(session: Optional[str], messages: List[Dict[str, Any]], answer: Optional[str],
+              snapshot: AgentSnapshot, caller: Optional[str] = None):
+    """Store the new turn and its answer; summarize in the background when over budget"""
+    if session is None:
+        return
+    tokens = conversation_store.append(
+        session, messages + [{"role": "assistant", "content": answer or ''}], caller
+    )
+    if tokens > snapshot.max_tokens and session not in _compacting:
+        _compacting.add(session)
+        task = asyncio.get_running_loop().create_task(_compact_conversation(session, snapshot))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+async def _compact_conversation(session: str, snapshot: AgentSnapshot):
+    """Fold a session's oldest turns into its summary to keep it within model.maxTokens"""
+    try:
+        summary, folded = conversation_store.turns_to_fold(session, snapshot.max_tokens)
+        if not folded:
+            return
+        try:
+            summary = await _summarize_async(summary, folded, snapshot)
+        except Exception as e:
+            # Still drop the old turns so the session stays within budget
+            logger.warning(f"Conversation summary failed, dropping {len(folded)} old turns: {str(e)}")
+        conversation_store.apply_summary(session, summary, len(folded))
+    finally:
+        _compacting.discard(session)
+
+
+async def _summarize_async(summary: str, turns: List[Dict[str, Any]], snapshot: AgentSnapshot) -> str:
+    """Ask the agent's model for an updated running summary"""
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    prompt = f"Previous summary:\n{summary}\n\nConversation:\n{transcript}" if summary else transcript
+    model_params = dict(snapshot.model_params, temperature=0, max_tokens=DEFAULT_SUMMARY_TOKENS)
+    async with request_slots:
+        with metrics.track_upstream(model_params['model']):
+            response, model = await _create_completion(model_params, fallbacks=snapshot.fallback_models, messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {"role": "user", "content": prompt}
+            ])
+    metrics.record_usage(snapshot.name, model, response.usage)
+    return (response.choices[0].message.content or '').strip()
+
+
+def _build_messages(messages: List[Dict[str, Any]], snapshot: AgentSnapshot) -> List[Dict[str, Any]]:
+    """
+    Pack the agent's system prompt, retrieved knowledge and the client's
+    messages into the model's context window (see PromptAssembler.assemble)
+    """
+    with tracing.start_span("scoring.prompt") as span:
+        prompt, tokens = snapshot.assembler.assemble(
+            messages,
+            _retrieve_passages(messages),
+            retrieval_settings.context_window_size,
+            retrieval_settings.source_attribution
+        )
+        span.set_attributes({"edmund.prompt.messages": len(prompt), "edmund.prompt.tokens": tokens})
+    return prompt
+
+
+def _build_result(content: Optional[str], usage: Any, model_name: str,
+                  snapshot: AgentSnapshot) -> Dict[str, Any]:
+    """Build the scoring response from a completion's content and usage"""
+    return {
+        "response": content,
+        "agent": dict(snapshot.agent_info),
+        "model": {
+            "name": model_name,
+            "usage": {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens
+            } if usage is not None else None
+        }
+    }
+
+
+def _assistant_tool_message(message: Any) -> Dict[str, Any]:
+    """The assistant turn requesting tools, as it is sent back to the model"""
+    return {
+        "role": "assistant",
+        "content": message.content,
+        "tool_calls": [
+            {
+                "id": call.id,
+                "type": "function",
+                "function": {"name": call.function.name, "arguments": call.function.arguments}
+            }
+            for call in message.tool_calls
+        ]
+    }
+
+
+def _add_usage(total: Any, usage: Any) -> Any:
+    if total is None or usage is None:
+        return usage or total
+    return SimpleNamespace(
+        prompt_tokens=total.prompt_tokens + usage.prompt_tokens,
+        completion_tokens=total.completion_tokens + usage.completion_tokens,
+        total_tokens=total.total_tokens + usage.total_tokens
+    )
+
+
+async def _complete_with_tools(model_params: Mapping[str, Any], messages: List[Dict[str, Any]],
+                               snapshot: AgentSnapshot) -> tuple:
+    """
+    Complete a prompt, running the MCP tools the model asks for.
+
+    Each round's tool calls are executed concurrently and their results
+    appended to the conversation before asking the model again, for at
+    most MAX_TOOL_ROUNDS rounds. Only completions hold a request slot;
+    tools run without one.
+
+    Returns:
+        (final completion, deployment that served it, usage summed over rounds)
+    """
+    tools = None
+    if tool_executor is not None and snapshot.name == agent_snapshot.name:
+        tools = tool_executor.definitions
+    messages = list(messages)
+    usage = None
+    for _ in range(MAX_TOOL_ROUNDS if tools else 1):
+        async with request_slots:
+            with metrics.track_upstream(model_params['model']):
+                if tools:
+                    response, model = await _create_completion(
+                        model_params, hedge=True, fallbacks=snapshot.fallback_models, messages=messages, tools=tools
+                    )
+                else:
+                    response, model = await _create_completion(
+                        model_params, hedge=True, fallbacks=snapshot.fallback_models, messages=messages
+                    )
+        usage = _add_usage(usage, response.usage)
+        message = response.choices[0].message
+        if not getattr(message, 'tool_calls', None):
+            break
+        log_event(logger, logging.INFO, "tools.requested", sampled=True,
+                  tools=",".join(call.function.name for call in message.tool_calls))
+        messages.append(_assistant_tool_message(message))
+        messages.extend(await tool_executor.execute(message.tool_calls))
+    return response, model, usage
+
+
 def run(raw_data: str) -> str:
     """
     Process incoming requests and return responses.
@@ -59,85 +714,390 @@ def run(raw_data: str) -> str:
     """
     try:
         # Parse the input
-        data = json.loads(raw_data)
-        logger.info(f"Received request: {data}")
+        data = fast_json.loads(raw_data)
         
         # Extract messages from the request
         messages = data.get('messages', [])
+        log_event(logger, logging.INFO, "request.received", sampled=True,
+                  mode="sync", size_bytes=len(raw_data), message_count=len(messages))
         if not messages:
-            return json.dumps({
+            return fast_json.dumps({
                 "error": "No messages provided in the request"
             })
         
-        # Add system prompt from agent configuration
-        system_prompt = agent_config.get('instructions', {}).get('systemPrompt', '')
-        if system_prompt:
-            enhanced_messages = [
-                {"role": "system", "content": system_prompt}
-            ] + messages
-        else:
-            enhanced_messages = messages
-        
-        # Get model configuration
-        model_config = agent_config.get('model', {})
-        model_name = model_config.get('modelName', 'gpt-4o')
-        temperature = model_config.get('temperature', 0.1)
-        max_tokens = model_config.get('maxTokens', 4096)
-        
-        # Call Azure OpenAI
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=enhanced_messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            top_p=model_config.get('topP', 0.95),
-            frequency_penalty=model_config.get('frequencyPenalty', 0),
-            presence_penalty=model_config.get('presencePenalty', 0)
-        )
+        snapshot = agent_snapshot
+        agent = snapshot.name
+        with metrics.track_request(agent, "sync") as request, \
+                tracing.start_span("scoring.request", {"edmund.agent": agent, "edmund.mode": "sync"}) as span:
+            # Answer repeated prompts from the cache
+            model_params = snapshot.model_params
+            enhanced_messages = _build_messages(messages, snapshot)
+            with tracing.start_span("scoring.cache_lookup") as lookup:
+                key = cache_key(enhanced_messages, model_params) if response_cache is not None else None
+                cached = response_cache.get(key) if key is not None else None
+                if cached is None:
+                    cached = _semantic_cache_lookup(messages, snapshot)
+                lookup.set_attribute("edmund.cache.hit", cached is not None)
+            if cached is not None:
+                request.outcome = "cached"
+                span.set_attribute("edmund.cache.hit", True)
+                return fast_json.dumps(dict(cached, cached=True))
+            
+            # Call Azure OpenAI
+            with metrics.track_upstream(model_params['model']), \
+                    tracing.start_span("model.completion", {"gen_ai.request.model": model_params['model']}) as call:
+                create = partial(client.chat.completions.create, messages=enhanced_messages, **model_params)
+                response = resilience.call_sync(model_params['model'], create) if resilience else create()
+                tracing.set_usage(call, response.usage)
+            
+            span.set_attribute("edmund.cache.hit", False)
+            tracing.set_usage(span, response.usage)
+            metrics.record_usage(agent, model_params['model'], response.usage)
+            result = _build_result(
+                response.choices[0].message.content, response.usage, model_params['model'], snapshot
+            )
+            if key is not None:
+                response_cache.set(key, result)
+            _semantic_cache_store(messages, snapshot, result)
         
-        # Extract the response content
-        assistant_message = response.choices[0].message.content
+        log_event(logger, logging.INFO, "request.completed", sampled=True,
+                  mode="sync", agent=agent, model=model_params['model'], total_tokens=response.usage.total_tokens)
+        return fast_json.dumps(result)
         
-        # Prepare the response
-        result = {
-            "response": assistant_message,
-            "agent": {
-                "name": agent_config.get('agent', {}).get('name', 'Edmund'),
-                "displayName": agent_config.get('agent', {}).get('displayName', 'Edmund (the Engineer)'),
-                "version": agent_config.get('agent', {}).get('version', '1.0.0')
-            },
-            "model": {
-                "name": model_name,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
-            }
+    except json.JSONDecodeError as e:
+        log_event(logger, logging.ERROR, "request.failed", mode="sync", error="invalid_json", detail=str(e))
+        return fast_json.dumps({
+            "error": f"Invalid JSON format: {str(e)}"
+        })
+    
+    except openai.OpenAIError as e:
+        log_event(logger, logging.ERROR, "request.failed", mode="sync", error=type(e).__name__, detail=str(e))
+        return fast_json.dumps({
+            "error": f"AI model error: {str(e)}"
+        })
+    
+    except Exception as e:
+        log_event(logger, logging.ERROR, "request.failed", mode="sync", error=type(e).__name__, detail=str(e))
+        return fast_json.dumps({
+            "error": f"Internal server error: {str(e)}"
+        })
+
+
+async def process_async(data: Dict[str, Any], agent_name: Optional[str] = None,
+                        caller: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Process a parsed request on the shared async client.
+    
+    At most EDMUND_MAX_CONCURRENCY completions are in flight at once; further
+    requests wait for a free slot instead of opening more upstream connections.
+    
+    Args:
+        data: Parsed request containing a 'messages' list and, optionally, a
+            'session_id' whose stored history is prepended to the messages
+        agent_name: Registered agent to answer as (defaults to this agent)
+        caller: Identity the session is bound to (the digest of the caller's
+            API key; None for anonymous callers)
+        
+    Returns:
+        Dictionary containing the response, or an 'error' key
+        
+    Raises:
+        KeyError: If agent_name is not a registered agent
+        SessionOwnerError: If the session was started by another caller
+        openai.OpenAIError: If the upstream model call fails or times out
+    """
+    snapshot = get_agent(agent_name)
+    new_messages = data.get('messages', [])
+    if not new_messages:
+        return {
+            "error": "No messages provided in the request"
         }
+    
+    session = _session_key(snapshot, data.get('session_id'))
+    messages = _with_history(session, new_messages, caller)
+    agent = snapshot.name
+    with metrics.track_request(agent, "async") as request, \
+            tracing.start_span("scoring.request", {"edmund.agent": agent, "edmund.mode": "async"}) as span:
+        model_params = snapshot.model_params
+        enhanced_messages = _build_messages(messages, snapshot)
+        with tracing.start_span("scoring.cache_lookup") as lookup:
+            key = cache_key(enhanced_messages, model_params) if response_cache is not None else None
+            cached = await response_cache.aget(key) if key is not None else None
+            if cached is None:
+                cached = await _semantic_cache_alookup(messages, snapshot)
+            lookup.set_attribute("edmund.cache.hit", cached is not None)
+        span.set_attribute("edmund.cache.hit", cached is not None)
+        if cached is not None:
+            request.outcome = "cached"
+            _remember(session, new_messages, cached.get('response'), snapshot, caller)
+            return dict(cached, cached=True)
+        
+        response, model, usage = await _complete_with_tools(model_params, enhanced_messages, snapshot)
+        
+        tracing.set_usage(span, usage)
+        metrics.record_usage(agent, model, usage)
+        result = _build_result(response.choices[0].message.content, usage, model, snapshot)
+        if key is not None:
+            await response_cache.aset(key, result)
+        await _semantic_cache_astore(messages, snapshot, result)
+        _remember(session, new_messages, result['response'], snapshot, caller)
+    log_event(logger, logging.INFO, "request.completed", sampled=True,
+              mode="async", agent=agent, model=model, total_tokens=usage.total_tokens)
+    return result
+
+
+async def stream_async(data: Dict[str, Any], agent_name: Optional[str] = None,
+                       caller: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream a completion token by token on the shared async client.
+    
+    Yields {"type": "token", "content": ...} events as the model produces
+    them, followed by a single {"type": "done", ...} event carrying the same
+    agent/model/usage fields as process_async (without the full response).
+    
+    Args:
+        data: Parsed request containing a 'messages' list and an optional
+            'session_id' (see process_async)
+        agent_name: Registered agent to answer as (defaults to this agent)
+        caller: Identity the session is bound to (see process_async)
+        
+    Raises:
+        KeyError: If agent_name is not a registered agent
+        SessionOwnerError: If the session was started by another caller
+        ValueError: If the request contains no messages
+        openai.OpenAIError: If the upstream model call fails or times out
+    """
+    snapshot = get_agent(agent_name)
+    new_messages = data.get('messages', [])
+    if not new_messages:
+        raise ValueError("No messages provided in the request")
+    
+    session = _session_key(snapshot, data.get('session_id'))
+    messages = _with_history(session, new_messages, caller)
+    agent = snapshot.name
+    with metrics.track_request(agent, "stream") as request, \
+            tracing.start_span("scoring.request", {"edmund.agent": agent, "edmund.mode": "stream"}) as span:
+        model_params = snapshot.model_params
+        enhanced_messages = _build_messages(messages, snapshot)
+        with tracing.start_span("scoring.cache_lookup") as lookup:
+            key = cache_key(enhanced_messages, model_params) if response_cache is not None else None
+            cached = await response_cache.aget(key) if key is not None else None
+            if cached is None:
+                cached = await _semantic_cache_alookup(messages, snapshot)
+            lookup.set_attribute("edmund.cache.hit", cached is not None)
+        span.set_attribute("edmund.cache.hit", cached is not None)
+        if cached is not None:
+            # A cache hit is replayed as a single token frame
+            request.outcome = "cached"
+            metrics.FIRST_TOKEN_LATENCY.observe(request.elapsed(), agent=agent)
+            _remember(session, new_messages, cached.get('response'), snapshot, caller)
+            yield {"type": "token", "content": cached.pop('response')}
+            yield {"type": "done", **cached, "cached": True}
+            return
         
-        logger.info(f"Response generated successfully. Tokens used: {response.usage.total_tokens}")
-        return json.dumps(result)
+        usage = None
+        parts = []
+        async with request_slots:
+            with metrics.track_upstream(model_params['model']):
+                stream, model = await _create_completion(
+                    model_params,
+                    fallbacks=snapshot.fallback_models,
+                    messages=enhanced_messages,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                # Covers reading the tokens; model.completion ends once the stream opens
+                with tracing.start_span("model.stream", {"gen_ai.response.model": model}) as read_span:
+                    async for chunk in stream:
+                        # The final chunk carries usage and no choices
+                        if getattr(chunk, 'usage', None) is not None:
+                            usage = chunk.usage
+                        if chunk.choices:
+                            content = chunk.choices[0].delta.content
+                            if content:
+                                if not parts:
+                                    metrics.FIRST_TOKEN_LATENCY.observe(request.elapsed(), agent=agent)
+                                parts.append(content)
+                                yield {"type": "token", "content": content}
+                    tracing.set_usage(read_span, usage)
+        
+        tracing.set_usage(span, usage)
+        metrics.record_usage(agent, model, usage)
+        result = _build_result("".join(parts), usage, model, snapshot)
+        if key is not None:
+            await response_cache.aset(key, result)
+        await _semantic_cache_astore(messages, snapshot, result)
+        _remember(session, new_messages, result['response'], snapshot, caller)
+        del result['response']
+    log_event(logger, logging.INFO, "request.completed", sampled=True, mode="stream", agent=agent, model=model,
+              total_tokens=usage.total_tokens if usage is not None else None)
+    yield {"type": "done", **result}
+
+
+async def run_async(raw_data: str) -> str:
+    """
+    Async counterpart of run() that does not block the event loop.
+    
+    Args:
+        raw_data: JSON string containing the request data
+        
+    Returns:
+        JSON string containing the response
+    """
+    try:
+        data = fast_json.loads(raw_data)
+        return fast_json.dumps(await process_async(data))
         
     except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON in request: {str(e)}")
-        return json.dumps({
+        log_event(logger, logging.ERROR, "request.failed", mode="async", error="invalid_json", detail=str(e))
+        return fast_json.dumps({
             "error": f"Invalid JSON format: {str(e)}"
         })
     
     except openai.OpenAIError as e:
-        logger.error(f"OpenAI API error: {str(e)}")
-        return json.dumps({
+        log_event(logger, logging.ERROR, "request.failed", mode="async", error=type(e).__name__, detail=str(e))
+        return fast_json.dumps({
             "error": f"AI model error: {str(e)}"
         })
     
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
-        return json.dumps({
+        log_event(logger, logging.ERROR, "request.failed", mode="async", error=type(e).__name__, detail=str(e))
+        return fast_json.dumps({
             "error": f"Internal server error: {str(e)}"
         })
 
 
+async def _run_batch_item(raw_data: str, slots: asyncio.Semaphore) -> Dict[str, Any]:
+    """Score one batch line; failures become an 'error' result instead of raising"""
+    data: Any = {}
+    async with slots:
+        try:
+            data = fast_json.loads(raw_data)
+            result = await process_async(data, data.get('agent'))
+        except json.JSONDecodeError as e:
+            result = {"error": f"Invalid JSON format: {str(e)}"}
+        except KeyError:
+            result = {"error": f"Unknown agent: {data.get('agent')}"}
+        except openai.OpenAIError as e:
+            log_event(logger, logging.ERROR, "request.failed", mode="batch", error=type(e).__name__, detail=str(e))
+            result = {"error": f"AI model error: {str(e)}"}
+        except Exception as e:
+            log_event(logger, logging.ERROR, "request.failed", mode="batch", error=type(e).__name__, detail=str(e))
+            result = {"error": f"Internal server error: {str(e)}"}
+    if isinstance(data, dict) and 'id' in data:
+        result = {"id": data['id'], **result}
+    return result
+
+
+async def run_batch(raw_requests: Iterable[str],
+                    concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Score many requests concurrently, yielding results in input order.
+    
+    Each request is a JSON string as accepted by run(), optionally with an
+    'agent' to answer as and an 'id' that is copied to its result. At most
+    `concurrency` requests are scored at once (still within
+    EDMUND_MAX_CONCURRENCY) and at most twice that many are held in
+    memory, so arbitrarily large inputs can be streamed through.
+    
+    Args:
+        raw_requests: JSON request strings, e.g. lines of a JSONL file
+        concurrency: Maximum requests in flight
+        
+    Yields:
+        One result dictionary per request (with an 'error' key on failure)
+    """
+    slots = asyncio.Semaphore(concurrency)
+    window: deque = deque()
+    try:
+        for raw_data in raw_requests:
+            window.append(asyncio.ensure_future(_run_batch_item(raw_data, slots)))
+            if len(window) >= concurrency * 2:
+                yield await window.popleft()
+        while window:
+            yield await window.popleft()
+    finally:
+        for task in window:
+            task.cancel()
+
+
+async def shutdown_async():
+    """Close the shared async clients and their pooled connections"""
+    global async_client, upstream_pool
+    
+    # Let pending conversation summaries finish before the client goes away
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+    if async_client is not None:
+        await async_client.close()
+        async_client = None
+    if upstream_pool is not None:
+        await upstream_pool.close()
+        upstream_pool = None
+    if tool_executor is not None:
+        await tool_executor.close()
+
+
+async def _check_config() -> str:
+    """A validated agent configuration is loaded"""
+    if agent_snapshot is None:
+        raise RuntimeError("Agent configuration not loaded")
+    return f"{agent_snapshot.name} {agent_snapshot.version}"
+
+
+async def _check_model() -> str:
+    """
+    Azure OpenAI answers a model listing on at least one endpoint.
+
+    Listing models spends no tokens, and it runs once per readiness
+    interval however often the service is probed.
+    """
+    if upstream_pool is not None:
+        clients = list({id(t.client): t.client for t in upstream_pool.targets}.values())
+    else:
+        clients = [async_client] if async_client is not None else []
+    if not clients:
+        raise RuntimeError("Azure OpenAI client not initialized")
+    
+    outcomes = await asyncio.gather(*(c.models.list() for c in clients), return_exceptions=True)
+    failures = [o for o in outcomes if isinstance(o, BaseException)]
+    if len(failures) == len(clients):
+        raise failures[0]
+    return f"{len(clients) - len(failures)}/{len(clients)} endpoints reachable"
+
+
+async def _check_knowledge() -> str:
+    """The knowledge index is loaded (unless retrieval is disabled)"""
+    if not search_config.get('fullTextSearchEnabled', True):
+        return "retrieval disabled"
+    if knowledge_index is None:
+        raise RuntimeError("Knowledge index not loaded")
+    mode = "full-text" if retriever is knowledge_index else "hybrid"
+    return f"{len(knowledge_index)} passages ({mode})"
+
+
+async def _check_cache() -> str:
+    """The response cache backend answers (Redis ping)"""
+    if response_cache is None:
+        return "disabled"
+    return f"{response_cache.backend}: {await response_cache.aping()}"
+
+
+# Checks that take the service out of rotation when they fail; without
+# the knowledge index or the cache requests are still answered
+READINESS_CRITICAL = ("config", "model")
+
+
+def readiness_checks() -> Dict[str, Callable[[], Awaitable[str]]]:
+    """Dependency checks for readiness.ReadinessMonitor"""
+    return {
+        "config": _check_config,
+        "model": _check_model,
+        "knowledge": _check_knowledge,
+        "cache": _check_cache
+    }
+
+
 def health_check() -> Dict[str, Any]:
     """
     Health check endpoint for the deployment.
@@ -147,7 +1107,7 @@ def health_check() -> Dict[str, Any]:
     """
     try:
         # Test that we can load the configuration
-        if agent_config is None:
+        if agent_snapshot is None:
             return {
                 "status": "unhealthy",
                 "message": "Agent configuration not loaded"
@@ -164,10 +1124,10 @@ def health_check() -> Dict[str, Any]:
         return {
             "status": "healthy",
             "agent": {
-                "name": agent_config.get('agent', {}).get('name', 'Edmund'),
-                "version": agent_config.get('agent', {}).get('version', '1.0.0')
+                "name": agent_snapshot.name,
+                "version": agent_snapshot.version
             },
-            "model": agent_config.get('model', {}).get('modelName', 'gpt-4o')
+            "model": agent_snapshot.model
         }
         
     except Exception as e:
@@ -0,0 +1,151 @@
+"""
+Semantic (near-duplicate) prompt cache for Edmund's scoring engine.
+Single-turn questions are embedded and compared with previously answered
+questions; a close enough match is answered with the stored result instead
+of calling the model, so paraphrased FAQ traffic costs no tokens.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional
+
+import numpy as np
+
+from semantic_index import Embedder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_THRESHOLD = 0.9
+# The hashing embedder only sees shared words, not meaning: with it only
+# near-verbatim repeats (case, punctuation, word order) may be answered
+HASHING_EMBEDDER_THRESHOLD = 0.97
+
+
+class SemanticCache:
+    """
+    Fixed-capacity store of (question vector, answer) pairs.
+
+    Vectors live in one preallocated float32 matrix, so memory is bounded
+    by max_entries * dimension and a lookup is a single matrix-vector
+    product. When full, the least recently used slot is overwritten.
+    Entries are partitioned by scope (system prompt + model parameters) so
+    an answer is only reused under the configuration that produced it.
+    """
+
+    def __init__(self, embedder: Embedder, threshold: float = DEFAULT_THRESHOLD,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: Optional[float] = None):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._vectors: Optional[np.ndarray] = None
+        self._scopes = np.full(max_entries, -1, dtype=np.int64)
+        self._scope_ids: Dict[str, int] = {}
+        # slot -> (expires_at, question, result), ordered least to most recently used
+        self._slots: "OrderedDict[int, tuple]" = OrderedDict()
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _embed(self, question: str) -> np.ndarray:
+        return np.asarray(self.embedder([question])[0], dtype=np.float32)
+
+    def get(self, question: str, scope: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the stored answer to the most similar question in the same scope.
+
+        Returns:
+            A copy of the stored result with 'similarity' added, or None
+            when no question reaches the similarity threshold
+        """
+        vector = self._embed(question)
+        with self._lock:
+            scope_id = self._scope_ids.get(scope)
+            if scope_id is None or not self._slots or self._vectors is None:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors @ vector
+            similarities[self._scopes != scope_id] = -np.inf
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            expires_at, _, result = self._slots[slot]
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._release(slot)
+                self.misses += 1
+                return None
+
+            self._slots.move_to_end(slot)
+            self.hits += 1
+        return dict(result, similarity=similarity)
+
+    def set(self, question: str, scope: str, result: Dict[str, Any]):
+        """Remember the answer to a question, recycling the LRU slot when full"""
+        vector = self._embed(question)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            scope_id = self._scope_ids.get(scope)
+            if scope_id is None:
+                scope_id = self._scope_ids[scope] = max(self._scope_ids.values(), default=-1) + 1
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot, _ = self._slots.popitem(last=False)
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._scopes[slot] = scope_id
+            self._slots[slot] = (expires_at, question, dict(result))
+            self._slots.move_to_end(slot)
+
+    async def aget(self, question: str, scope: str) -> Optional[Dict[str, Any]]:
+        """get() on a worker thread: embedding and the similarity scan stay off the event loop"""
+        return await asyncio.to_thread(self.get, question, scope)
+
+    async def aset(self, question: str, scope: str, result: Dict[str, Any]):
+        await asyncio.to_thread(self.set, question, scope, result)
+
+    def retain_scopes(self, scopes: Iterable[str]):
+        """Drop the entries and ids of every scope not listed (e.g. after a config reload)"""
+        keep = set(scopes)
+        with self._lock:
+            stale = {scope_id for scope, scope_id in self._scope_ids.items() if scope not in keep}
+            if not stale:
+                return
+            for slot in [slot for slot in self._slots if int(self._scopes[slot]) in stale]:
+                self._release(slot)
+            self._scope_ids = {scope: scope_id for scope, scope_id in self._scope_ids.items() if scope in keep}
+
+    def _release(self, slot: int):
+        del self._slots[slot]
+        self._scopes[slot] = -1
+        self._vectors[slot] = 0.0
+        self._free.append(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate and occupancy counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._slots),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Semantic (vector) index for Edmund's knowledge passages.
+Embeds the passages of a knowledge index with a pluggable embedding function
+and stores the vectors in a .npy file that is memory-mapped at load time, so
+every uvicorn worker on a host shares one copy of the pages.
+
+Usage:
+    python semantic_index.py build --index knowledge-index.json --output semantic-index
+    python semantic_index.py search "explain T-Minus-15 step nine"
+
+Incremental refreshes go through `knowledge_index.py update`, which re-embeds
+only passages whose content hash is new.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import logging
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import numpy as np
+
+from knowledge_index import (
+    KnowledgeIndex, DEFAULT_SOURCE_ID, tokenize, load_knowledge_sources, atomic_write
+)
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_INDEX_VERSION = 1
+DEFAULT_DIMENSION = 512
+# float32 vectors are scored straight from the memory map; float16 halves
+# the file but is upcast SCORE_BLOCK_ROWS rows at a time on every query
+DEFAULT_DTYPE = "float32"
+SUPPORTED_DTYPES = ("float16", "float32")
+SCORE_BLOCK_ROWS = 4096
+
+# Share of the hybrid score that comes from vector similarity
+DEFAULT_SEMANTIC_RATIO = 0.5
+
+# Candidates considered per retriever before hybrid re-ranking, as a multiple of k
+CANDIDATE_MULTIPLIER = 4
+
+# An embedder maps a batch of texts to an (n, dimension) float32 array of unit vectors
+Embedder = Callable[[List[str]], np.ndarray]
+
+
+class HashingEmbedder:
+    """
+    Deterministic, dependency-free embedder based on signed feature hashing.
+
+    Unigrams and bigrams are hashed into a fixed number of dimensions with
+    CRC32 (stable across processes, unlike hash()). It has no notion of
+    synonyms, but shared vocabulary is enough for offline tests and as a
+    fallback when no embedding deployment is configured.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimension: int = DEFAULT_DIMENSION):
+        self.dimension = dimension
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms = tokenize(text)
+            features = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+            for feature in features:
+                digest = zlib.crc32(feature.encode('utf-8'))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dimension] += sign
+        return normalize(vectors)
+
+
+class AzureOpenAIEmbedder:
+    """Embedder backed by an Azure OpenAI embedding deployment"""
+
+    name = "azure-openai"
+
+    def __init__(self, client: Any, deployment: str, dimension: int, batch_size: int = 64):
+        self.client = client
+        self.deployment = deployment
+        self.dimension = dimension
+        self.batch_size = batch_size
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(
+                model=self.deployment, input=texts[start:start + self.batch_size]
+            )
+            vectors.extend(item.embedding for item in response.data)
+        return normalize(np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dimension))
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so dot products are cosine similarities"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def create_embedder(name: str, dimension: int) -> Embedder:
+    """
+    Create the embedder recorded in a semantic index's metadata.
+
+    Query vectors must come from the same embedder as the stored vectors,
+    so the index metadata, not the caller, decides which one is used.
+    """
+    if name == HashingEmbedder.name:
+        return HashingEmbedder(dimension)
+    if name == AzureOpenAIEmbedder.name:
+        from openai import AzureOpenAI
+        client = AzureOpenAI(
+            api_key=os.getenv('AZURE_OPENAI_API_KEY'),
+            api_version=os.getenv('AZURE_OPENAI_API_VERSION', '2024-12-01-preview'),
+            azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT')
+        )
+        deployment = os.getenv('AZURE_OPENAI_EMBEDDING_DEPLOYMENT', 'text-embedding-3-small')
+        return AzureOpenAIEmbedder(client, deployment, dimension)
+    raise ValueError(f"Unknown embedder: {name}")
+
+
+class SemanticIndex:
+    """Unit vectors aligned one-to-one with a KnowledgeIndex's passages"""
+
+    def __init__(self, vectors: np.ndarray, embedder: Embedder,
+                 chunk_hashes: Optional[List[str]] = None):
+        self.vectors = vectors
+        self.embedder = embedder
+        # Content hash of the passage behind each row, for incremental updates
+        self.chunk_hashes = chunk_hashes
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @classmethod
+    def build(cls, texts: List[str], embedder: Embedder, dtype: str = DEFAULT_DTYPE,
+              chunk_hashes: Optional[List[str]] = None) -> 'SemanticIndex':
+        """Embed passages and keep the vectors in the storage dtype"""
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        return cls(embedder(texts).astype(dtype), embedder, chunk_hashes)
+
+    def score_batch(self, queries: List[str]) -> np.ndarray:
+        """Cosine similarity of every passage to every query, shape (len(queries), len(self))"""
+        query_vectors = self.embedder(queries)
+        if self.vectors.dtype == np.float32:
+            return query_vectors @ self.vectors.T
+        # Never upcast the whole index: only one block of rows is copied at a time
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = query_vectors @ block.T
+        return scores
+
+    def search_batch(self, queries: List[str], k: int = 5) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k passages for each query in one matrix multiplication.
+
+        Returns:
+            One list of (passage id, similarity) per query, best first
+        """
+        scores = self.score_batch(queries)
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return [[] for _ in queries]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([(int(i), float(scores[row, i])) for i in ordered])
+        return results
+
+    def save(self, prefix: str):
+        """Atomically write <prefix>.npy (vectors) and <prefix>.json (metadata)"""
+        atomic_write(f"{prefix}.npy", lambda f: np.save(f, self.vectors), mode='wb')
+        atomic_write(f"{prefix}.json", lambda f: json.dump({
+            "version": SEMANTIC_INDEX_VERSION,
+            "embedder": getattr(self.embedder, 'name', 'custom'),
+            "dimension": int(self.vectors.shape[1]),
+            "dtype": str(self.vectors.dtype),
+            "count": len(self),
+            "chunk_hashes": self.chunk_hashes
+        }, f))
+
+    @classmethod
+    def load(cls, prefix: str, embedder: Optional[Embedder] = None) -> 'SemanticIndex':
+        """
+        Memory-map an index written by save().
+
+        The vectors are never copied into the process heap; the OS page
+        cache holds a single copy shared by every worker.
+        """
+        with open(f"{prefix}.json", 'r') as f:
+            metadata = json.load(f)
+        if metadata.get('version') != SEMANTIC_INDEX_VERSION:
+            raise ValueError(f"Unsupported semantic index version: {metadata.get('version')}")
+
+        vectors = np.load(f"{prefix}.npy", mmap_mode='r')
+        if embedder is None:
+            embedder = create_embedder(metadata['embedder'], metadata['dimension'])
+        return cls(vectors, embedder, metadata.get('chunk_hashes'))
+
+
+def passage_texts(chunks: List[Dict[str, Any]]) -> List[str]:
+    """Text embedded for each passage"""
+    return [f"{c['title']}\n{c['text']}" for c in chunks]
+
+
+def update_semantic_index(knowledge_index: KnowledgeIndex, prefix: str) -> Tuple[SemanticIndex, int]:
+    """
+    Bring a saved semantic index in line with an updated knowledge index.
+
+    Rows are matched by passage content hash, so only new or edited
+    passages are sent to the embedder; everything else is copied from the
+    existing vectors. The embedder and dtype of the existing index are kept.
+
+    Returns:
+        Tuple of (updated index, number of passages embedded)
+    """
+    previous = SemanticIndex.load(prefix)
+    hashes = [c.get('hash') for c in knowledge_index.chunks]
+    if previous.chunk_hashes == hashes:
+        return previous, 0
+
+    rows = {h: row for row, h in enumerate(previous.chunk_hashes or []) if h is not None}
+    vectors = np.empty((len(hashes), previous.vectors.shape[1]), dtype=previous.vectors.dtype)
+    missing = []
+    for position, chunk_hash in enumerate(hashes):
+        if chunk_hash in rows:
+            vectors[position] = previous.vectors[rows[chunk_hash]]
+        else:
+            missing.append(position)
+
+    if missing:
+        texts = passage_texts([knowledge_index.chunks[i] for i in missing])
+        vectors[missing] = previous.embedder(texts).astype(vectors.dtype)
+
+    updated = SemanticIndex(vectors, previous.embedder, hashes)
+    updated.save(prefix)
+    return updated, len(missing)
+
+
+class HybridRetriever:
+    """
+    Combines BM25 and vector similarity into one ranking.
+
+    BM25 scores are scaled to [0, 1] per query, blended with the cosine
+    similarity using semantic_ratio, and multiplied by the passage's
+    knowledge source weight from knowledge-sources.json.
+    """
+
+    def __init__(self, knowledge_index: KnowledgeIndex, semantic_index: SemanticIndex,
+                 source_weights: Optional[Dict[str, float]] = None,
+                 semantic_ratio: float = DEFAULT_SEMANTIC_RATIO):
+        if len(knowledge_index) != len(semantic_index):
+            raise ValueError(
+                f"Semantic index has {len(semantic_index)} vectors for {len(knowledge_index)} passages; rebuild it"
+            )
+        if semantic_index.chunk_hashes is not None and \
+                semantic_index.chunk_hashes != [c.get('hash') for c in knowledge_index.chunks]:
+            raise ValueError("Semantic index was built from different passages; run knowledge_index.py update")
+        self.knowledge_index = knowledge_index
+        self.semantic_index = semantic_index
+        self.source_weights = source_weights or {}
+        self.semantic_ratio = semantic_ratio
+
+    def search_batch(self, queries: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k hybrid results for each query.
+
+        Returns:
+            One list of passages per query with 'score', 'bm25_score' and
+            'semantic_score' added, best first
+        """
+        semantic_scores = self.semantic_index.score_batch(queries)
+        chunks = self.knowledge_index.chunks
+        results = []
+
+        for row, query in enumerate(queries):
+            bm25 = self.knowledge_index.score(query)
+            bm25_max = max(bm25.values(), default=0.0) or 1.0
+
+            # Re-rank the union of both retrievers' candidates
+            candidates = set(sorted(bm25, key=bm25.get, reverse=True)[:k * CANDIDATE_MULTIPLIER])
+            similarity = semantic_scores[row]
+            width = min(k * CANDIDATE_MULTIPLIER, similarity.shape[0])
+            if width:
+                candidates.update(int(i) for i in np.argpartition(-similarity, width - 1)[:width])
+
+            ranked = []
+            for doc_id in candidates:
+                semantic = max(float(similarity[doc_id]), 0.0)
+                lexical = bm25.get(doc_id, 0.0) / bm25_max
+                weight = self.source_weights.get(chunks[doc_id].get('source_id', DEFAULT_SOURCE_ID), 1.0)
+                score = weight * (self.semantic_ratio * semantic + (1 - self.semantic_ratio) * lexical)
+                ranked.append((score, doc_id, lexical, semantic))
+
+            ranked.sort(reverse=True)
+            results.append([
+                dict(chunks[doc_id], score=score, bm25_score=lexical, semantic_score=semantic)
+                for score, doc_id, lexical, semantic in ranked[:k]
+            ])
+        return results
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Top-k hybrid results for a single query"""
+        return self.search_batch([query], k)[0]
+
+
+def source_weights(sources_config: Dict[str, Any]) -> Dict[str, float]:
+    """Per-source 'weight' values from knowledge-sources.json"""
+    return {
+        source['id']: float(source.get('weight', 1.0))
+        for source in sources_config.get('knowledgeSources', [])
+        if 'id' in source
+    }
+
+
+def main():
+    """Command line entry point"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build or query Edmund's semantic index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Embed the passages of a knowledge index')
+    build_parser.add_argument('--index', default=os.path.join(here, 'knowledge-index.json'))
+    build_parser.add_argument('--output', default=os.path.join(here, 'semantic-index'))
+    build_parser.add_argument('--embedder', default=HashingEmbedder.name,
+                              choices=[HashingEmbedder.name, AzureOpenAIEmbedder.name])
+    build_parser.add_argument('--dimension', type=int, default=DEFAULT_DIMENSION)
+    build_parser.add_argument('--dtype', default=DEFAULT_DTYPE, choices=SUPPORTED_DTYPES)
+
+    search_parser = subparsers.add_parser('search', help='Run a hybrid query')
+    search_parser.add_argument('query')
+    search_parser.add_argument('--index', default=os.path.join(here, 'knowledge-index.json'))
+    search_parser.add_argument('--semantic-index', default=os.path.join(here, 'semantic-index'))
+    search_parser.add_argument('--sources', default=os.path.join(here, 'knowledge-sources.json'))
+    search_parser.add_argument('-k', type=int, default=5)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    knowledge_index = KnowledgeIndex.load(args.index)
+
+    if args.command == 'build':
+        embedder = create_embedder(args.embedder, args.dimension)
+        texts = passage_texts(knowledge_index.chunks)
+        hashes = [c.get('hash') for c in knowledge_index.chunks]
+        SemanticIndex.build(texts, embedder, args.dtype, hashes).save(args.output)
+        print(f"✅ Wrote {len(texts)} {args.dtype} vectors to {args.output}.npy")
+    else:
+        retriever = HybridRetriever(
+            knowledge_index,
+            SemanticIndex.load(args.semantic_index),
+            source_weights(load_knowledge_sources(args.sources))
+        )
+        started = time.perf_counter()
+        results = retriever.search(args.query, args.k)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for result in results:
+            print(f"{result['score']:.3f} (bm25 {result['bm25_score']:.2f}, semantic {result['semantic_score']:.2f})"
+                  f"  {result['source']} - {result['title']}")
+        print(f"⏱️ {len(results)} results in {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Startup timing for Edmund's API.
+Records how long each import and initialization step takes so cold starts
+can be diagnosed from a running container (GET /startup on main.py).
+Import this module first; its load time is the reference point.
+"""
+
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+STARTED = time.perf_counter()
+
+# (phase, seconds) in the order the phases finished
+_phases: List[Tuple[str, float]] = []
+_ready_at = None
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Record the duration of a block under `phase`, e.g. import.openai or init.knowledge"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((phase, time.perf_counter() - started))
+
+
+def mark_ready():
+    """Record that startup finished and log the slowest phases"""
+    global _ready_at
+    _ready_at = time.perf_counter()
+    slowest = sorted(_phases, key=lambda phase: phase[1], reverse=True)[:3]
+    logger.info(
+        f"Started in {_ready_at - STARTED:.2f}s (slowest: "
+        f"{', '.join(f'{name} {seconds:.2f}s' for name, seconds in slowest)})"
+    )
+
+
+def report() -> Dict[str, Any]:
+    """Durations per phase, with totals for imports and initialization"""
+    phases = {name: seconds for name, seconds in _phases}
+    return {
+        "ready": _ready_at is not None,
+        "total_seconds": _ready_at - STARTED if _ready_at is not None else None,
+        "imports_seconds": sum(s for name, s in _phases if name.startswith("import.")),
+        "init_seconds": sum(s for name, s in _phases if name.startswith("init.")),
+        "phases": phases
+    }
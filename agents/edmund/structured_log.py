@@ -0,0 +1,201 @@
+"""
+Structured, non-blocking logging for Edmund's scoring engine.
+Log records are put on a bounded queue and formatted and written by a
+background thread, so a request only pays for building a small record.
+Request events carry metadata (sizes, counts, tokens, outcome), never
+message content; they are sampled (LOG_SAMPLE_RATE) and every string
+field is capped (LOG_MAX_FIELD_CHARS), so their cost does not grow with
+the transcript. Errors are always logged.
+
+Records are rendered by structlog when it is installed, with a stdlib
+fallback. LOG_FORMAT selects "json" (one object per line) or "text".
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_MAX_FIELD_CHARS = 256
+DEFAULT_QUEUE_SIZE = 10000
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+_handler: Optional["DroppingQueueHandler"] = None
+_sample_rate = float(os.getenv('LOG_SAMPLE_RATE', DEFAULT_SAMPLE_RATE))
+_max_field_chars = int(os.getenv('LOG_MAX_FIELD_CHARS', DEFAULT_MAX_FIELD_CHARS))
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that defers all formatting to the listener thread and
+    drops records instead of blocking when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stdlib handler formats the message here, on the caller's thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the `extra` fields as keys (stdlib fallback)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            **_fields(record)
+        }
+        if record.exc_info:
+            event["exception"] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The usual one-line format followed by key=value fields (stdlib fallback)"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += ' ' + ' '.join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+def _add_record_fields(logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """structlog processor adding a stdlib record's `extra` fields"""
+    record = event_dict.get('_record')
+    if record is not None:
+        event_dict.update(_fields(record))
+    return event_dict
+
+
+def _create_formatter(log_format: str) -> logging.Formatter:
+    try:
+        # structlog renders records when installed; the stdlib formatters are
+        # equivalent fallbacks
+        import structlog
+    except ImportError:
+        return JsonFormatter() if log_format == 'json' else TextFormatter()
+
+    renderer = structlog.processors.JSONRenderer(default=str) if log_format == 'json' \
+        else structlog.dev.ConsoleRenderer(colors=False)
+    return structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=[
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.add_logger_name,
+            structlog.processors.TimeStamper(fmt="iso"),
+            _add_record_fields
+        ],
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.format_exc_info,
+            renderer
+        ]
+    )
+
+
+def configure(level: int = logging.INFO, log_format: Optional[str] = None,
+              queue_size: Optional[int] = None) -> QueueListener:
+    """
+    Route the root logger through a bounded queue drained by a background thread.
+
+    Safe to call more than once; later calls return the running listener.
+
+    Args:
+        level: Root log level
+        log_format: "json" or "text" (default LOG_FORMAT, then "text")
+        queue_size: Records held before new ones are dropped (default LOG_QUEUE_SIZE)
+
+    Returns:
+        The listener writing records to stderr
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return _listener
+
+    log_format = (log_format or os.getenv('LOG_FORMAT', 'text')).lower()
+    queue_size = queue_size or int(os.getenv('LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(_create_formatter(log_format))
+
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def _cap(value: Any) -> Any:
+    """Truncate strings to LOG_MAX_FIELD_CHARS; other values are logged as is"""
+    if isinstance(value, str) and len(value) > _max_field_chars:
+        return value[:_max_field_chars] + f"...[{len(value) - _max_field_chars} more]"
+    return value
+
+
+def log_event(logger: logging.Logger, level: int, event: str, sampled: bool = False, **fields: Any):
+    """
+    Log a structured event, e.g. log_event(logger, logging.INFO, "request.completed", tokens=42).
+
+    Fields must be metadata (sizes, counts, names), not request content;
+    strings are capped at LOG_MAX_FIELD_CHARS.
+
+    Args:
+        logger: Logger to emit on
+        level: Log level
+        event: Dotted event name
+        sampled: Emit only a LOG_SAMPLE_RATE fraction of these events
+        **fields: Structured fields attached to the record
+    """
+    if sampled and random.random() >= _sample_rate:
+        return
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, event, extra={k: _cap(v) for k, v in fields.items()})
+
+
+def set_sample_rate(rate: float):
+    """Change the fraction of sampled events that are logged (0 to 1)"""
+    global _sample_rate
+    _sample_rate = rate
+
+
+def stats() -> Dict[str, Any]:
+    """Queue depth and records dropped because the queue was full"""
+    if _handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _handler.queue.qsize(), "dropped": _handler.dropped}
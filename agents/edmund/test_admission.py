@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests for adaptive admission control and priority queueing of chats
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import metrics
+from admission import AdmissionController, AdmissionRejected, create_admission_controller
+from test_scoring import fake_async_client  # noqa: F401 (pytest fixture)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def controller(**kwargs):
+    options = dict(initial_limit=1, min_limit=1, max_limit=64, queue_size=8)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def test_interactive_requests_are_admitted_before_queued_bulk():
+    async def scenario():
+        admission = controller()
+        held = await admission.acquire("interactive")
+        order = []
+
+        async def ask(priority):
+            ticket = await admission.acquire(priority)
+            order.append(priority)
+            ticket.release()
+
+        waiting = [asyncio.create_task(ask(p)) for p in ("bulk", "batch", "interactive")]
+        await asyncio.sleep(0)
+        assert admission.stats()["queued"] == 3
+        held.release()
+        await asyncio.gather(*waiting)
+        return order, admission.in_flight
+
+    order, in_flight = asyncio.run(scenario())
+    assert order == ["interactive", "batch", "bulk"]
+    assert in_flight == 0
+
+
+def test_sheds_early_when_expected_wait_is_too_long():
+    async def scenario():
+        clock = Clock()
+        admission = controller(clock=clock, max_wait={"interactive": 1.0})
+        ticket = await admission.acquire()
+        clock.now = 3.0
+        ticket.release()
+        held = await admission.acquire()
+        with pytest.raises(AdmissionRejected) as shed:
+            await admission.acquire()
+        held.release()
+        return shed.value
+
+    shed = asyncio.run(scenario())
+    assert shed.reason == "queue_wait" and shed.retry_after == 3.0
+
+
+def test_full_queue_evicts_lower_priority_then_rejects():
+    async def scenario():
+        admission = controller(queue_size=1)
+        held = await admission.acquire()
+        bulk = asyncio.create_task(admission.acquire("bulk"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(admission.acquire("interactive"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as evicted:
+            await bulk
+        with pytest.raises(AdmissionRejected) as full:
+            await admission.acquire("interactive")
+        held.release()
+        (await interactive).release()
+        return evicted.value.reason, full.value.reason, admission.in_flight
+
+    assert asyncio.run(scenario()) == ("evicted", "queue_full", 0)
+
+
+def test_queued_request_times_out():
+    async def scenario():
+        admission = controller(max_wait={"batch": 0.01})
+        held = await admission.acquire()
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await admission.acquire("batch")
+        held.release()
+        return timed_out.value.reason, admission.stats()
+
+    reason, stats = asyncio.run(scenario())
+    assert reason == "timeout"
+    assert stats["queued"] == 0 and stats["in_flight"] == 0
+
+
+def test_limit_grows_at_baseline_latency_and_shrinks_when_it_rises():
+    admission = controller(initial_limit=20)
+    admission.in_flight = 20
+    for _ in range(20):
+        admission._observe(0.2)
+    grown = admission.limit
+    for _ in range(20):
+        admission._observe(0.8)
+
+    assert grown > 20
+    assert admission.limit < grown / 1.5
+
+
+def test_priority_is_capped_by_caller_identity():
+    admission = controller()
+
+    assert admission.priority(None, identified=True) == "interactive"
+    assert admission.priority("interactive", identified=False) == "batch"
+    assert admission.priority("bulk", identified=False) == "bulk"
+    assert admission.priority("batch", identified=True) == "batch"
+    with pytest.raises(ValueError):
+        admission.priority("urgent", identified=True)
+
+
+def test_anonymous_callers_are_only_capped_when_api_keys_are_configured(monkeypatch):
+    monkeypatch.delenv("ADMISSION_ANONYMOUS_PRIORITY", raising=False)
+
+    assert create_admission_controller().priority(None, identified=False) == "interactive"
+    assert create_admission_controller(api_keys=True).priority(None, identified=False) == "batch"
+
+
+def test_model_time_per_token_excludes_time_between_calls():
+    async def request():
+        with metrics.model_time() as measured:
+            for tokens in (10, 30):
+                with metrics.track_upstream("gpt-4o"):
+                    await asyncio.sleep(0.02)
+                metrics.record_usage("edmund", "gpt-4o", SimpleNamespace(prompt_tokens=5, completion_tokens=tokens))
+                # A tool call between rounds
+                await asyncio.sleep(0.1)
+        return measured
+
+    measured = asyncio.run(request())
+    assert measured.tokens == 40
+    assert 0.04 <= measured.seconds < 0.1
+    assert measured.per_token == measured.seconds / 40
+
+
+def test_chat_is_shed_with_503_and_slots_are_released(fake_async_client, monkeypatch):  # noqa: F811
+    admission = controller(max_wait={"interactive": 0.01}, anonymous_priority="interactive")
+    monkeypatch.setattr(main, "admission_controller", admission)
+    api = TestClient(main.app)
+
+    assert api.post("/chat", json={"message": "Hi Edmund"}).status_code == 200
+    assert api.post("/chat", json={"message": "Hi Edmund", "stream": True}).status_code == 200
+    assert admission.in_flight == 0 and admission.admitted == 2
+    assert api.post("/chat", json={"message": "Hi"}, headers={"X-Request-Priority": "urgent"}).status_code == 400
+    assert api.post("/chat", json={"message": "Hi", "priority": 5}).status_code == 400
+
+    held = asyncio.run(admission.acquire())
+    response = api.post("/chat", json={"message": "Hi Edmund"})
+    held.release()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
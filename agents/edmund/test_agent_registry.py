@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi-agent registry and per-agent routing
+Loads the real agents/ folder, no Azure credentials required
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import scoring
+from agent_registry import load_registry
+from test_scoring import fake_async_client  # noqa: F401 (pytest fixture)
+
+
+def test_registry_loads_all_six_agents():
+    registry = load_registry()
+
+    assert set(registry) == {"edmund", "teddy", "pepper", "poppy", "danny", "ollie"}
+    assert registry["teddy"]["profile"]["name"] == "Teddy (the Tester)"
+    with pytest.raises(TypeError):
+        registry["teddy"]["agent"]["name"] = "Someone else"
+
+
+def test_extra_configs_do_not_override_folders(tmp_path):
+    registry = load_registry(str(tmp_path), extra_configs={"Edmund": {"agent": {"name": "Edmund"}}})
+
+    assert list(registry) == ["edmund"]
+
+
+def test_process_async_answers_as_requested_agent(fake_async_client):  # noqa: F811
+    data = {"messages": [{"role": "user", "content": "How do I write a test plan?"}]}
+    result = asyncio.run(scoring.process_async(data, "Teddy"))
+
+    teddy = scoring.agent_registry["teddy"]
+    sent = fake_async_client.calls[0]
+    assert sent["messages"][0]["content"].startswith(teddy["instructions"]["systemPrompt"])
+    assert result["agent"]["name"] == "Teddy"
+
+    with pytest.raises(KeyError):
+        asyncio.run(scoring.process_async(data, "nobody"))
+
+
+def test_agent_endpoints(fake_async_client):  # noqa: F811
+    api = TestClient(main.app)
+
+    names = [agent["name"] for agent in api.get("/agents").json()["agents"]]
+    assert "Pepper" in names and "Edmund" in names
+
+    response = api.post("/agents/pepper/chat", json={"message": "Hi"})
+    assert response.status_code == 200
+    assert response.json()["agent"] == scoring.agent_registry["pepper"]["agent"]["displayName"]
+
+    assert api.post("/agents/nobody/chat", json={"message": "Hi"}).status_code == 404
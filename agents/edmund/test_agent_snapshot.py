@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for agent config validation, snapshots and hot reload
+"""
+
+import os
+import json
+import asyncio
+
+import pytest
+
+import scoring
+from agent_snapshot import (
+    ConfigError, ConfigWatcher, RetrievalSettings, compile_retrieval_settings, compile_snapshot, load_snapshot,
+    validate_config
+)
+from test_scoring import fake_async_client, AGENT_CONFIG  # noqa: F401 (pytest fixture)
+
+
+def write_config(path, config):
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    # Guarantee a new signature even on coarse filesystem timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_every_agent_config_matches_the_schema():
+    agents_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    for name in sorted(os.listdir(agents_root)):
+        path = os.path.join(agents_root, name, 'agent-config.json')
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                assert validate_config(json.load(f)) == [], name
+
+
+def test_invalid_config_reports_paths():
+    config = dict(AGENT_CONFIG, model={"modelName": "gpt-4o", "temperature": 3})
+    del config["instructions"]
+
+    errors = validate_config(config)
+
+    assert "<root>: 'instructions' is a required property" in errors
+    assert any(error.startswith("model.temperature:") for error in errors)
+
+
+def test_snapshot_is_precomputed_and_frozen():
+    snapshot = compile_snapshot(AGENT_CONFIG)
+
+    assert snapshot.model_params["max_tokens"] == 256
+    assert snapshot.agent_info == {"name": "Edmund", "displayName": "Edmund (the Engineer)", "version": "1.0.0"}
+    assert snapshot.assembler.system_prompt.startswith("You are Edmund.")
+    with pytest.raises(TypeError):
+        snapshot.model_params["temperature"] = 1
+
+
+def test_retrieval_settings_are_resolved_once(monkeypatch):
+    monkeypatch.setenv("KNOWLEDGE_TOP_K", "3")
+    settings = compile_retrieval_settings({"maxResults": 10, "contextWindowSize": 2000})
+    monkeypatch.setenv("KNOWLEDGE_TOP_K", "1")
+
+    assert settings == RetrievalSettings(top_k=3, context_window_size=2000, source_attribution=True)
+
+
+def test_watcher_swaps_valid_configs_and_keeps_the_last_good_one(tmp_path, fake_async_client, monkeypatch):  # noqa: F811
+    path = str(tmp_path / "agent-config.json")
+    write_config(path, AGENT_CONFIG)
+    watcher = ConfigWatcher(path, scoring.reload_agent_config)
+    assert not watcher.check()
+
+    updated = dict(AGENT_CONFIG, instructions={"systemPrompt": "You are Edmund v2."})
+    write_config(path, updated)
+    assert watcher.check()
+    asyncio.run(scoring.process_async({"messages": [{"role": "user", "content": "Hi"}]}))
+    assert fake_async_client.calls[-1]["messages"][0]["content"] == "You are Edmund v2."
+    assert scoring.agent_registry["edmund"]["instructions"]["systemPrompt"] == "You are Edmund v2."
+
+    write_config(path, dict(updated, model={"modelName": ""}))
+    assert not watcher.check()
+    assert scoring.get_agent().assembler.system_prompt == "You are Edmund v2."
+    with pytest.raises(ConfigError):
+        load_snapshot(path)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk JSONL scoring
+"""
+
+import asyncio
+import json
+
+import batch_scoring
+import scoring
+from test_scoring import fake_async_client  # noqa: F401 (pytest fixture)
+
+
+def write_requests(path, count):
+    with open(path, 'w') as f:
+        for i in range(count):
+            f.write(json.dumps({"id": i, "messages": [{"role": "user", "content": f"Question {i}"}]}) + "\n")
+        f.write("\n{not json\n")
+
+
+def read_results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_run_batch_keeps_input_order_and_bounds_concurrency(fake_async_client):  # noqa: F811
+    raw = [json.dumps({"id": i, "messages": [{"role": "user", "content": "Hi"}]}) for i in range(10)]
+    raw.append(json.dumps({"id": "x", "agent": "nobody", "messages": [{"role": "user", "content": "Hi"}]}))
+
+    async def collect():
+        return [result async for result in scoring.run_batch(raw, concurrency=2)]
+
+    results = asyncio.run(collect())
+
+    assert [r["id"] for r in results] == list(range(10)) + ["x"]
+    assert results[-1]["error"] == "Unknown agent: nobody"
+    assert fake_async_client.peak_in_flight == 2
+
+
+def test_score_file_reports_throughput(fake_async_client, tmp_path):  # noqa: F811
+    requests, results = tmp_path / "requests.jsonl", tmp_path / "results.jsonl"
+    write_requests(requests, 5)
+
+    stats = asyncio.run(batch_scoring.score_file(str(requests), str(results), checkpoint_every=2))
+
+    assert stats["requests"] == 6
+    assert stats["errors"] == 1
+    assert stats["tokens"] == 75
+    assert stats["requests_per_second"] > 0
+    assert [r.get("id") for r in read_results(results)] == [0, 1, 2, 3, 4, None]
+    assert not (tmp_path / "results.jsonl.checkpoint").exists()
+
+
+def test_score_file_resumes_from_checkpoint(fake_async_client, tmp_path):  # noqa: F811
+    requests, results = tmp_path / "requests.jsonl", tmp_path / "results.jsonl"
+    write_requests(requests, 5)
+    done = "".join(json.dumps({"id": i, "response": "earlier"}) + "\n" for i in range(2))
+    results.write_text(done + '{"id": 2, "resp')
+    batch_scoring.save_checkpoint(str(results) + ".checkpoint", {
+        "input": str(requests), "completed": 2, "offset": len(done.encode())
+    })
+
+    stats = asyncio.run(batch_scoring.score_file(str(requests), str(results)))
+
+    assert stats["resumed_from"] == 2
+    assert len(fake_async_client.calls) == 3
+    assert [r.get("id") for r in read_results(results)] == [0, 1, 2, 3, 4, None]
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark's load drivers and statistics
+Drives the FastAPI app in-process with the fake model client from test_scoring
+"""
+
+import asyncio
+
+import httpx
+
+import main
+from benchmark import percentile, summarize, run_concurrency, run_rate, serialization_benchmark
+from test_scoring import fake_async_client  # noqa: F401 (pytest fixture)
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_summarize_excludes_errors_from_latency():
+    samples = [
+        {"ok": True, "latency": 0.1, "first_token": 0.05, "tokens": 10},
+        {"ok": True, "latency": 0.3, "first_token": 0.07, "tokens": 10},
+        {"ok": False, "latency": 5.0, "first_token": None, "tokens": 0}
+    ]
+
+    summary = summarize(samples, elapsed=2.0)
+
+    assert summary["errors"] == 1
+    assert summary["requests_per_second"] == 1.0
+    assert summary["tokens_per_second"] == 10.0
+    assert summary["latency_seconds"]["p99"] == 0.3
+    assert summary["first_token_seconds"]["p50"] == 0.05
+
+
+def test_load_levels_against_the_app(fake_async_client):  # noqa: F811
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://edmund") as client:
+            closed = await run_concurrency(client, concurrency=2, duration=0.1)
+            opened = await run_rate(client, rps=20, duration=0.1, stream=False)
+        return closed, opened
+
+    closed, opened = asyncio.run(scenario())
+
+    assert closed["requests"] > 0 and closed["errors"] == 0
+    assert closed["first_token_seconds"]["p50"] is not None
+    assert opened["requests"] == 2 and opened["errors"] == 0
+    assert opened["tokens_per_second"] > 0
+
+
+def test_serialization_benchmark_reports_both_backends():
+    results = serialization_benchmark([4, 40], repeat=5)
+
+    assert [level["turns"] for level in results] == [4, 40]
+    assert results[1]["request_bytes"] > results[0]["request_bytes"]
+    assert all(level["stdlib_seconds"] > 0 and level["fast_seconds"] > 0 for level in results)
@@ -10,6 +10,8 @@ import os
 import sys
 from typing import Dict, List, Any, Tuple
 
+from agent_snapshot import validate_config
+
 class EdmundConfigTester:
     def __init__(self):
         self.base_path = os.path.dirname(__file__)
@@ -79,10 +81,18 @@ class EdmundConfigTester:
         if not valid:
             return False
             
-        # Test required fields
+        # Same schema check the service runs at startup and on reload
+        schema_errors = validate_config(config)
+        for error in schema_errors:
+            self.log_error(f"Schema violation: {error}")
+        if schema_errors:
+            valid = False
+        else:
+            self.log_success("Matches agent-config.schema.json")
+        
+        # Sections only needed for the Azure AI Foundry deployment
         required_fields = [
-            'agent', 'model', 'instructions', 'knowledgeSources', 
-            'tools', 'features', 'security', 'deployment'
+            'knowledgeSources', 'tools', 'features', 'security', 'deployment'
         ]
         
         for field in required_fields:
@@ -97,8 +107,6 @@ class EdmundConfigTester:
             agent = config['agent']
             if agent.get('name') != 'Edmund':
                 self.log_warning(f"Agent name is '{agent.get('name')}', expected 'Edmund'")
-            if 'displayName' not in agent:
-                self.log_error("Missing agent.displayName")
                 
         # Test model configuration
         if 'model' in config:
@@ -263,8 +271,13 @@ class EdmundConfigTester:
             return False
             
         try:
-            with open(filepath, 'r') as f:
-                content = f.read()
+            # Serving dependencies plus the indexing and development sets
+            content = ""
+            for filename in ('requirements.txt', 'requirements-indexing.txt', 'requirements-dev.txt'):
+                path = os.path.join(self.base_path, filename)
+                if os.path.exists(path):
+                    with open(path, 'r') as f:
+                        content += f.read()
                 
             # Check for essential dependencies
             essential_deps = [
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for server-side conversation memory
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import scoring
+from conversation_store import ConversationStore, SqliteConversationStore, SessionOwnerError, SUMMARY_PREFIX
+from agent_snapshot import compile_snapshot
+from test_scoring import fake_async_client, AGENT_CONFIG  # noqa: F401 (pytest fixture)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SqliteConversationStore(str(tmp_path / "conversations.db"), max_sessions=2)
+    return ConversationStore(max_sessions=2)
+
+
+def test_history_roundtrip_and_lru_eviction(store):
+    store.append("a", [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}])
+    store.append("b", [{"role": "user", "content": "Hey"}])
+    store.history("a")
+    store.append("c", [{"role": "user", "content": "Yo"}])
+
+    assert store.history("a") == [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+    assert store.history("b") == []
+    assert len(store) == 2
+
+
+def test_oldest_turns_fold_into_summary(store):
+    for i in range(6):
+        store.append("a", [{"role": "user", "content": f"question {i} " + "word " * 40}])
+
+    summary, folded = store.turns_to_fold("a", token_budget=200)
+    assert summary == ''
+    assert folded[0]["content"].startswith("question 0")
+    store.apply_summary("a", "asked six questions", len(folded))
+
+    history = store.history("a")
+    assert history[0] == {"role": "system", "content": SUMMARY_PREFIX + "asked six questions"}
+    assert history[-1]["content"].startswith("question 5")
+    assert store.turns_to_fold("a", token_budget=200) == ('', [])
+
+
+def test_session_is_bound_to_its_owner(store):
+    store.append("a", [{"role": "user", "content": "My secret plan"}], owner="team-a")
+
+    for owner in ("team-b", None):
+        with pytest.raises(SessionOwnerError):
+            store.history("a", owner)
+        with pytest.raises(SessionOwnerError):
+            store.append("a", [{"role": "user", "content": "Overwrite"}], owner=owner)
+    assert store.history("a", "team-a") == [{"role": "user", "content": "My secret plan"}]
+
+
+def test_session_sends_only_new_turn(fake_async_client, monkeypatch):  # noqa: F811
+    monkeypatch.setattr(scoring, "conversation_store", ConversationStore())
+    monkeypatch.setattr(scoring, "agent_snapshot", compile_snapshot(
+        dict(AGENT_CONFIG, model={"modelName": "gpt-4o", "maxTokens": 60})
+    ))
+
+    async def converse():
+        for question in ("First question " + "word " * 30, "Second question " + "word " * 30):
+            await scoring.process_async({"messages": [{"role": "user", "content": question}], "session_id": "s1"})
+        await asyncio.gather(*scoring._background_tasks)
+
+    asyncio.run(converse())
+
+    second = fake_async_client.calls[1]["messages"]
+    assert [m["role"] for m in second] == ["system", "user", "assistant", "user"]
+    summary_call = fake_async_client.calls[2]["messages"]
+    assert summary_call[0]["content"] == scoring.SUMMARY_INSTRUCTIONS
+
+    history = scoring.conversation_store.history("edmund:s1")
+    assert history[0]["content"] == SUMMARY_PREFIX + "Hello from Edmund"
+    assert history[-1] == {"role": "assistant", "content": "Hello from Edmund"}
+
+
+def test_chat_issues_session_ids_and_binds_them_to_the_caller(fake_async_client, monkeypatch):  # noqa: F811
+    monkeypatch.setattr(scoring, "conversation_store", ConversationStore())
+    monkeypatch.setattr(main, "api_key_digests", frozenset({main._digest("team-a"), main._digest("team-b")}))
+    api = TestClient(main.app)
+    team_a = {"X-API-Key": "team-a"}
+
+    assert api.post("/chat", json={"session_id": "sprint-42", "message": "Hi"}).status_code == 404
+    first = api.post("/chat", json={"message": "Hi Edmund"}, headers=team_a).json()
+    body = {"session_id": first["session_id"], "message": "Hi again"}
+    assert len(body["session_id"]) >= 24
+
+    assert api.post("/chat", json=body, headers=team_a).status_code == 200
+    assert api.post("/chat", json=body, headers={"X-API-Key": "team-b"}).status_code == 403
+    assert api.post("/chat", json=body).status_code == 403
+    assert api.post("/chat", json=dict(body, stream=True)).status_code == 403
+    anonymous = api.post("/chat", json={"message": "Hi", "stream": True})
+    assert "session_id" in anonymous.text and anonymous.text.count(first["session_id"]) == 0
+    history = scoring.conversation_store.history("edmund:" + first["session_id"], main._digest("team-a"))
+    assert len(history) == 4
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Tests for the fast JSON encoding path
+"""
+
+import json
+from types import MappingProxyType
+
+import pytest
+
+import fast_json
+
+
+def test_matches_stdlib_output_and_encodes_frozen_configs():
+    value = {"b": [1, "é", None, {"x": MappingProxyType({"y": 2.5})}], "a": True}
+
+    encoded = fast_json.dumps(value, sort_keys=True)
+
+    assert encoded == json.dumps(json.loads(encoded), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    assert fast_json.loads(fast_json.dumps_bytes(value)) == json.loads(encoded)
+
+
+def test_errors_are_stdlib_exceptions():
+    with pytest.raises(json.JSONDecodeError):
+        fast_json.loads("{not json")
+    with pytest.raises(TypeError):
+        fast_json.dumps({"value": object()})
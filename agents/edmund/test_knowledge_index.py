@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Edmund's offline knowledge index
+Builds a small corpus in a temporary directory laid out like the book repository
+"""
+
+import os
+import argparse
+import subprocess
+
+import knowledge_index
+from knowledge_index import (
+    KnowledgeIndex, MAX_CHUNK_WORDS, build_index, chunk_text, format_context, git_changed_files,
+    mark_last_indexed, update_command, update_index
+)
+
+
+def write(root, relative_path, content):
+    path = os.path.join(root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def test_chunk_text_splits_on_headings_and_windows_long_sections():
+    long_section = " ".join(f"word{i}" for i in range(MAX_CHUNK_WORDS * 2))
+    text = f"== WIP Limits\n\nCap work in progress.\n\n=== Details\n\n{long_section}\n"
+
+    chunks = chunk_text(text, "appendices/wip-limits.adoc")
+
+    assert chunks[0] == {"source": "appendices/wip-limits.adoc", "title": "WIP Limits", "text": "Cap work in progress."}
+    assert [c["title"] for c in chunks[1:]] == ["Details"] * (len(chunks) - 1)
+    assert all(len(c["text"].split()) <= MAX_CHUNK_WORDS for c in chunks)
+    assert len(chunks) >= 3
+
+
+def test_build_index_respects_patterns_and_file_types(tmp_path):
+    root = str(tmp_path)
+    write(root, "chapters/lets-get-agile.adoc", "== Sprints\n\nSprints last two weeks.\n")
+    write(root, "appendices/wip-limits.adoc", "== WIP Limits\n\nLimit work in progress.\n")
+    write(root, "agents/teddy.yml", "name: Teddy (the Tester)\nrole: Quality gates\n")
+    write(root, "chapters/draft.txt", "Sprints draft notes.\n")
+    sources_config = {"knowledgeSources": [
+        {"id": "tminus15-methodology", "indexing": {"includeFileTypes": [".adoc", ".yml"]}}
+    ]}
+
+    index = build_index(root, sources_config=sources_config)
+
+    assert sorted({c["source"] for c in index.chunks}) == [
+        "agents/teddy.yml", "appendices/wip-limits.adoc", "chapters/lets-get-agile.adoc"
+    ]
+    assert index.search("how long are sprints", 1)[0]["source"] == "chapters/lets-get-agile.adoc"
+    assert index.search("quality gates tester", 1)[0]["source"] == "agents/teddy.yml"
+    assert index.search("kubernetes", 5) == []
+
+
+def test_index_round_trips_through_disk(tmp_path):
+    index = KnowledgeIndex([
+        {"source": "a.adoc", "title": "Burndown", "text": "A burndown chart tracks remaining work."},
+        {"source": "b.adoc", "title": "Backlog", "text": "The product backlog orders the work."}
+    ])
+    path = str(tmp_path / "knowledge-index.json")
+    index.save(path)
+
+    loaded = KnowledgeIndex.load(path)
+
+    assert loaded.search("burndown chart", 2) == index.search("burndown chart", 2)
+
+
+def test_format_context_stops_at_token_budget():
+    passages = [
+        {"source": "a.adoc", "title": "A", "text": "x" * 400},
+        {"source": "b.adoc", "title": "B", "text": "y" * 400}
+    ]
+
+    context = format_context(passages, max_tokens=150)
+
+    assert "[a.adoc - A]" in context
+    assert "b.adoc" not in context
+
+
+def test_update_index_rechunks_only_changed_files(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    write(root, "chapters/lets-get-agile.adoc", "== Sprints\n\nSprints last two weeks.\n")
+    write(root, "appendices/wip-limits.adoc", "== WIP Limits\n\nLimit work in progress.\n")
+    write(root, "appendices/meetings.adoc", "== Standup\n\nDaily standup.\n")
+    previous = build_index(root)
+
+    write(root, "chapters/lets-get-agile.adoc", "== Sprints\n\nSprints last three weeks.\n")
+    os.remove(os.path.join(root, "appendices/meetings.adoc"))
+    chunked = []
+    original = knowledge_index.file_chunks
+    monkeypatch.setattr(knowledge_index, "file_chunks", lambda data, path: chunked.append(path) or original(data, path))
+
+    updated, changed = update_index(root, previous)
+
+    assert changed == ["appendices/meetings.adoc", "chapters/lets-get-agile.adoc"]
+    assert chunked == ["chapters/lets-get-agile.adoc"]
+    assert updated.search("three weeks", 1)[0]["source"] == "chapters/lets-get-agile.adoc"
+    assert updated.search("standup", 1) == []
+    assert [c["hash"] for c in updated.chunks] == [c["hash"] for c in build_index(root).chunks]
+
+
+def test_update_index_with_git_hints_skips_unlisted_files(tmp_path):
+    root = str(tmp_path)
+    write(root, "chapters/a.adoc", "== A\n\nAlpha.\n")
+    write(root, "chapters/b.adoc", "== B\n\nBravo.\n")
+    previous = build_index(root)
+    write(root, "chapters/b.adoc", "== B\n\nBeta.\n")
+
+    unchanged, changed = update_index(root, previous, changed_paths=["chapters/a.adoc"])
+    assert changed == [] and unchanged is previous
+
+    updated, changed = update_index(root, previous, changed_paths=["chapters/b.adoc"])
+    assert changed == ["chapters/b.adoc"]
+    assert updated.search("beta", 1)[0]["source"] == "chapters/b.adoc"
+
+
+def git(root, *args):
+    subprocess.run(['git', '-C', root, '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                   check=True, capture_output=True)
+
+
+def test_reverted_uncommitted_edit_is_reindexed(tmp_path):
+    root = str(tmp_path)
+    write(root, "chapters/a.adoc", "== A\n\nAlpha.\n")
+    write(root, "chapters/b.adoc", "== B\n\nBravo.\n")
+    git(root, "init", "-q")
+    git(root, "add", ".")
+    git(root, "commit", "-q", "-m", "book")
+
+    write(root, "chapters/a.adoc", "== A\n\nGamma.\n")
+    previous = build_index(root)
+    assert previous.uncommitted == ["chapters/a.adoc"]
+
+    write(root, "chapters/a.adoc", "== A\n\nAlpha.\n")
+    assert git_changed_files(root, previous.commit) == []
+    updated, changed = update_index(root, previous, changed_paths=[])
+
+    assert changed == ["chapters/a.adoc"]
+    assert updated.search("alpha", 1)[0]["source"] == "chapters/a.adoc"
+    assert updated.search("gamma", 1) == []
+    assert updated.uncommitted == []
+
+
+def test_update_without_changes_leaves_sources_untouched(tmp_path):
+    root = str(tmp_path / "book")
+    write(root, "chapters/a.adoc", "== A\n\nAlpha.\n")
+    output = str(tmp_path / "knowledge-index.json")
+    sources = str(tmp_path / "knowledge-sources.json")
+    with open(sources, "w") as f:
+        f.write('{"knowledgeSources": [{"id": "tminus15-methodology", "lastIndexed": null}]}')
+    args = argparse.Namespace(root=root, output=output, sources=sources, since=None,
+                              semantic_index=str(tmp_path / "semantic-index"))
+
+    update_command(args)
+    with open(sources) as f:
+        assert '"lastIndexed": "' in f.read()
+    written = [os.stat(path).st_mtime_ns for path in (sources, output)]
+    update_command(args)
+
+    assert [os.stat(path).st_mtime_ns for path in (sources, output)] == written
+
+
+def test_mark_last_indexed_rewrites_only_that_source(tmp_path):
+    path = str(tmp_path / "knowledge-sources.json")
+    original = (
+        '{\n  "knowledgeSources": [\n'
+        '    {"id": "azure-ai-foundry-docs", "lastIndexed": null},\n'
+        '    {"id": "tminus15-methodology", "tags": ["a", "b"], "lastIndexed": null}\n'
+        '  ]\n}'
+    )
+    with open(path, "w") as f:
+        f.write(original)
+
+    mark_last_indexed(path, timestamp="2026-01-02T03:04:05Z")
+
+    with open(path) as f:
+        updated = f.read()
+    assert updated == original.replace(
+        '"tags": ["a", "b"], "lastIndexed": null', '"tags": ["a", "b"], "lastIndexed": "2026-01-02T03:04:05Z"'
+    )
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+API tests for Edmund's FastAPI application
+Uses the fake model client from test_scoring, no Azure credentials required
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from test_scoring import fake_async_client  # noqa: F401 (pytest fixture)
+
+
+@pytest.fixture
+def api(fake_async_client):  # noqa: F811
+    return TestClient(main.app)
+
+
+def test_chat_returns_completion_with_usage(api):
+    response = api.post("/chat", json={"message": "Hi Edmund"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["response"] == "Hello from Edmund"
+    assert body["agent"] == "Edmund (the Engineer)"
+    assert body["usage"]["total_tokens"] == 15
+    assert body["timestamp"].endswith("Z")
+
+
+def test_chat_requires_message(api):
+    assert api.post("/chat", json={}).status_code == 400
+
+
+def test_chat_streams_server_sent_events(api):
+    response = api.post("/chat", json={"message": "Hi Edmund", "stream": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    events = [(f.split("\n")[0][len("event: "):], json.loads(f.split("\n")[1][len("data: "):])) for f in frames]
+    assert "".join(data["content"] for name, data in events if name == "token") == "Hello from Edmund"
+    name, done = events[-1]
+    assert name == "done"
+    assert done["usage"]["completion_tokens"] == 3
+
+
+def test_startup_report_lists_import_phases(api):
+    body = api.get("/startup").json()
+
+    assert {"import.fastapi", "import.openai", "import.scoring"} <= set(body["phases"])
+    assert body["imports_seconds"] > 0
+
+
+def test_static_endpoints_serve_precomputed_bodies(api):
+    assert api.get("/").content == main.ROOT_BODY
+    assert api.get("/capabilities").json()["primary_role"] == "DevOps and Engineering Excellence"
+    # Middleware headers must not accumulate on a shared body
+    first = api.get("/config", headers={"Origin": "http://a"})
+    second = api.get("/config", headers={"Origin": "http://b"})
+    assert second.headers["access-control-allow-origin"] == "http://b"
+    assert first.content == second.content == main.CONFIG_BODY
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Tests for MCP tool execution against an in-process MCP server
+"""
+
+import json
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+import scoring
+from mcp_tools import ToolResultCache, create_tool_executor, expand_env, tool_cache_ttl
+from test_resilience import FakeClock
+from test_scoring import fake_async_client, make_completion  # noqa: F401 (pytest fixture)
+
+
+class FakeMcpServer:
+    def __init__(self):
+        self.app = FastAPI()
+        self.delay = 0.0
+        self.failures = []
+        self.replies = []
+        self.calls = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.app.post("/mcp")(self.handle)
+
+    async def handle(self, request: Request):
+        body = await request.json()
+        if body['method'] != 'tools/call':
+            return JSONResponse({"jsonrpc": "2.0", "id": body.get('id'), "result": {}},
+                                headers={"mcp-session-id": "session-1"})
+        self.calls.append((body['params'], request.headers.get('mcp-session-id')))
+        if self.failures:
+            return JSONResponse({}, status_code=self.failures.pop(0))
+        if self.replies:
+            return self.replies.pop(0)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        text = f"{body['params']['name']}: {json.dumps(body['params']['arguments'], sort_keys=True)}"
+        return {"jsonrpc": "2.0", "id": body['id'], "result": {"content": [{"type": "text", "text": text}]}}
+
+
+def mcp_config(**configuration):
+    return {
+        "mcpConfiguration": {"enabled": True},
+        "servers": [
+            {
+                "id": "github-connector",
+                "enabled": True,
+                "connection": {"type": "http", "url": "http://mcp/mcp",
+                               "authentication": {"type": "token", "token": "${MCP_TEST_TOKEN}"}},
+                "configuration": dict({"retryAttempts": 2, "timeoutSeconds": 5}, **configuration),
+                "tools": [{"name": "get_file_content", "description": "Read a file", "parameters": {}}]
+            },
+            {
+                "id": "kubernetes-connector",
+                "enabled": True,
+                "connection": {"type": "kubernetes"},
+                "tools": [{"name": "get_pods"}]
+            }
+        ]
+    }
+
+
+@pytest.fixture
+def mcp_server():
+    return FakeMcpServer()
+
+
+@pytest.fixture
+def executor(mcp_server, monkeypatch):
+    monkeypatch.setenv("MCP_TEST_TOKEN", "secret")
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=mcp_server.app))
+    return create_tool_executor(mcp_config(), http)
+
+
+def tool_call(call_id, path):
+    return SimpleNamespace(
+        id=call_id, function=SimpleNamespace(name="get_file_content", arguments=json.dumps({"path": path}))
+    )
+
+
+def test_only_enabled_http_servers_are_used(executor):
+    assert list(executor.routes) == ["get_file_content"]
+    assert executor.definitions[0]["function"]["name"] == "get_file_content"
+    assert create_tool_executor(dict(mcp_config(), mcpConfiguration={"enabled": False})) is None
+
+
+def test_expand_env(monkeypatch):
+    monkeypatch.setenv("MCP_TEST_URL", "http://mcp")
+    assert expand_env({"url": "${MCP_TEST_URL}/v1", "missing": ["${MCP_TEST_UNSET}"]}) == \
+        {"url": "http://mcp/v1", "missing": [""]}
+
+
+def test_tool_calls_run_concurrently(executor, mcp_server):
+    mcp_server.delay = 0.05
+
+    results = asyncio.run(executor.execute([tool_call(f"call_{i}", f"file{i}.md") for i in range(3)]))
+
+    assert [r["tool_call_id"] for r in results] == ["call_0", "call_1", "call_2"]
+    assert results[2]["content"] == 'get_file_content: {"path": "file2.md"}'
+    assert mcp_server.peak_in_flight == 3
+    assert all(session == "session-1" for _, session in mcp_server.calls)
+
+
+def test_transient_failures_are_retried_then_reported(executor, mcp_server):
+    mcp_server.failures = [503]
+    assert "file.md" in asyncio.run(executor.execute([tool_call("a", "file.md")]))[0]["content"]
+
+    mcp_server.failures = [503, 503, 503]
+    result = asyncio.run(executor.execute([tool_call("b", "other.md")]))[0]
+    assert result["content"].startswith("Error: get_file_content failed")
+
+
+@pytest.mark.parametrize("reply", [
+    Response("upstream proxy error", media_type="text/plain"),
+    Response('["not", "an", "object"]', media_type="application/json"),
+    Response('"just a string"', media_type="application/json"),
+    Response('{"jsonrpc": "2.0", "id": 1, "result": ["content"]}', media_type="application/json")
+])
+def test_malformed_server_responses_are_reported_as_tool_errors(executor, mcp_server, reply):
+    mcp_server.replies = [reply]
+
+    result = asyncio.run(executor.execute([tool_call("a", "file.md")]))[0]
+
+    assert result["content"].startswith("Error: get_file_content failed: malformed")
+
+
+def test_identical_calls_are_coalesced_and_cached(executor, mcp_server):
+    mcp_server.delay = 0.02
+    calls = [tool_call(f"call_{i}", "README.md") for i in range(3)]
+
+    results = asyncio.run(executor.execute(calls))
+    asyncio.run(executor.execute([tool_call("again", "README.md")]))
+
+    assert len({r["content"] for r in results}) == 1
+    assert len(mcp_server.calls) == 1
+    assert executor.cache.stats()["coalesced"] == 2
+    assert executor.cache.stats()["hits"] == 1
+
+
+def test_cache_expires_and_skips_mutating_tools():
+    clock = FakeClock()
+    cache = ToolResultCache(clock=clock)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return f"result {len(calls)}"
+
+    async def scenario():
+        ttl = tool_cache_ttl({"name": "get_pods", "cacheTtl": "30s"})
+        first = await cache.get_or_call("get_pods", {"b": 1, "a": 2}, ttl, call)
+        same = await cache.get_or_call("get_pods", {"a": 2, "b": 1}, ttl, call)
+        clock.now = 31
+        expired = await cache.get_or_call("get_pods", {"a": 2, "b": 1}, ttl, call)
+        ttl = tool_cache_ttl({"name": "scale_deployment"})
+        await cache.get_or_call("scale_deployment", {}, ttl, call)
+        await cache.get_or_call("scale_deployment", {}, ttl, call)
+        return first, same, expired
+
+    assert asyncio.run(scenario()) == ("result 1", "result 1", "result 2")
+    assert len(calls) == 4
+
+
+def test_waiter_takes_over_when_the_first_caller_is_cancelled():
+    cache = ToolResultCache()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return f"result {len(calls)}"
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_call("get_pods", {}, 30, call))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_call("get_pods", {}, 30, call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(scenario()) == "result 2"
+    assert len(calls) == 2
+
+
+def test_process_async_feeds_tool_results_back(fake_async_client, executor, monkeypatch):  # noqa: F811
+    requests_tools = make_completion()
+    requests_tools.choices[0].message = SimpleNamespace(
+        content=None, tool_calls=[tool_call("call_1", "README.md"), tool_call("call_2", "docs.md")]
+    )
+    responses = [requests_tools, make_completion("Both files read")]
+    create = fake_async_client.create
+
+    async def create_with_tools(**kwargs):
+        await create(**kwargs)
+        return responses.pop(0)
+
+    monkeypatch.setattr(fake_async_client, "create", create_with_tools)
+    monkeypatch.setattr(scoring, "tool_executor", executor)
+
+    result = asyncio.run(scoring.process_async({"messages": [{"role": "user", "content": "Read the docs"}]}))
+
+    assert result["response"] == "Both files read"
+    assert result["model"]["usage"]["total_tokens"] == 30
+    second = fake_async_client.calls[1]["messages"]
+    assert second[-3]["tool_calls"][0]["id"] == "call_1"
+    assert [m["role"] for m in second[-2:]] == ["tool", "tool"]
+    assert fake_async_client.calls[0]["tools"][0]["function"]["name"] == "get_file_content"
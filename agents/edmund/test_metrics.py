@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for Edmund's Prometheus metrics
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+import metrics
+import scoring
+from response_cache import ResponseCache
+from test_scoring import fake_async_client  # noqa: F401 (pytest fixture)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test", ("agent",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, agent="Edmund")
+
+    lines = histogram.render().splitlines()
+    assert 'test_seconds_bucket{agent="Edmund",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{agent="Edmund",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{agent="Edmund",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{agent="Edmund"} 3' in lines
+
+
+def test_requests_record_tokens_latency_and_outcomes(fake_async_client, monkeypatch):  # noqa: F811
+    monkeypatch.setattr(scoring, "response_cache", ResponseCache(1024 * 1024, 60))
+    tokens_before = metrics.TOKENS.value(agent="Edmund", model="gpt-4o", type="prompt")
+    cached_before = metrics.REQUESTS.value(agent="Edmund", mode="async", outcome="cached")
+    first_token_before = metrics.FIRST_TOKEN_LATENCY.count(agent="Edmund")
+
+    data = {"messages": [{"role": "user", "content": "Hi"}]}
+    asyncio.run(scoring.process_async(data))
+    asyncio.run(scoring.process_async(data))
+
+    async def stream():
+        return [event async for event in scoring.stream_async({"messages": [{"role": "user", "content": "Yo"}]})]
+    asyncio.run(stream())
+
+    assert metrics.TOKENS.value(agent="Edmund", model="gpt-4o", type="prompt") == tokens_before + 20
+    assert metrics.REQUESTS.value(agent="Edmund", mode="async", outcome="cached") == cached_before + 1
+    assert metrics.FIRST_TOKEN_LATENCY.count(agent="Edmund") == first_token_before + 1
+    assert metrics.IN_FLIGHT.value() == 0
+
+    body = TestClient(main.app).get("/metrics").text
+    assert 'edmund_cache_hits{cache="response"} 1' in body
+    assert "edmund_upstream_duration_seconds_bucket" in body
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for token-budgeted prompt assembly
+"""
+
+from collections import OrderedDict
+
+import prompt_assembler
+from prompt_assembler import PromptAssembler, count_tokens, KNOWLEDGE_HEADER
+
+CONFIG = {
+    "agent": {"name": "Edmund"},
+    "model": {"modelName": "gpt-4o", "maxTokens": 500, "contextWindow": 1000},
+    "instructions": {"systemPrompt": "You are Edmund.", "guidelines": ["Be concise"]}
+}
+
+
+def turn(role, words):
+    return {"role": role, "content": " ".join(f"{role}{i}" for i in range(words))}
+
+
+def test_system_prompt_includes_guidelines_and_is_counted_once():
+    assembler = PromptAssembler(CONFIG)
+
+    assert assembler.system_prompt == "You are Edmund.\n\nGuidelines:\n- Be concise"
+    assert assembler.system_tokens == count_tokens(assembler.system_prompt, "gpt-4o") + 4
+    assert assembler.prompt_budget == 1000 - 500 - 3
+
+
+def test_token_cache_is_bounded_and_keeps_no_text(monkeypatch):
+    monkeypatch.setattr(prompt_assembler, "TOKEN_CACHE_SIZE", 2)
+    monkeypatch.setattr(prompt_assembler, "_token_counts", OrderedDict())
+    transcripts = [f"turn {i} " * 10000 for i in range(3)]
+
+    counts = [count_tokens(text) for text in transcripts]
+
+    assert count_tokens(transcripts[2]) == counts[2]
+    assert len(prompt_assembler._token_counts) == 2
+    assert all(isinstance(part, (int, str)) and len(str(part)) < 100
+               for key in prompt_assembler._token_counts for part in key)
+
+
+def test_history_is_dropped_oldest_first_to_fit():
+    history = [turn("user", 40), turn("assistant", 40)] * 5
+    latest = {"role": "user", "content": "What now?"}
+
+    prompt, tokens = PromptAssembler(CONFIG).assemble(history + [latest], [], 100)
+
+    assert tokens <= 500
+    assert prompt[0]["role"] == "system"
+    assert prompt[-1] == latest
+    assert prompt[1:-1] == history[-len(prompt[1:-1]):]
+    assert 0 < len(prompt[1:-1]) < len(history)
+
+
+def test_passages_take_priority_over_history_and_summary_over_turns():
+    summary = {"role": "system", "content": "Summary of the earlier conversation:\nTalked about WIP."}
+    history = [summary] + [turn("user", 60), turn("assistant", 60)] * 3
+    passages = [{"source": "chapters/01.adoc", "title": "WIP", "text": "limit work " * 40}]
+
+    prompt, _ = PromptAssembler(CONFIG).assemble(history + [{"role": "user", "content": "Hi"}], passages, 200)
+
+    assert KNOWLEDGE_HEADER in prompt[0]["content"]
+    assert prompt[1] == summary
+
+
+def test_oversized_latest_message_is_truncated_deterministically():
+    latest = {"role": "user", "content": "word " * 5000}
+
+    first, tokens = PromptAssembler(CONFIG).assemble([latest], [], 100)
+    second, _ = PromptAssembler(CONFIG).assemble([latest], [], 100)
+
+    assert tokens <= 500
+    assert first == second
+    assert latest["content"].startswith(first[-1]["content"])
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-client token-bucket rate limiter
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from rate_limiter import RateLimiter, RateLimitRule, rate_limit_rules, create_rate_limiter
+from test_scoring import fake_async_client  # noqa: F401 (pytest fixture)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rules_from_config():
+    assert rate_limit_rules({"requestsPerMinute": 60, "requestsPerHour": 1000}) == [
+        RateLimitRule(60, 60), RateLimitRule(1000, 3600)
+    ]
+    assert rate_limit_rules({"enabled": False, "requestsPerMinute": 100}) == []
+    assert create_rate_limiter({}) is None
+    assert create_rate_limiter(
+        {"requestsPerMinute": 60, "requestsPerHour": 1000},
+        {"enabled": True, "requestsPerMinute": 100, "requestsPerHour": 500}
+    ).rules == [RateLimitRule(60, 60), RateLimitRule(500, 3600)]
+
+
+def test_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    limiter = RateLimiter([RateLimitRule(3, 60)], clock=clock)
+
+    assert [limiter.check("a")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.check("a")
+    assert not allowed
+    assert retry_after == pytest.approx(20.0)
+    assert limiter.check("b")[0]
+
+    clock.now = 20.0
+    assert limiter.check("a")[0]
+    assert not limiter.check("a")[0]
+
+
+def test_longest_window_decides_retry_after():
+    clock = FakeClock()
+    limiter = RateLimiter([RateLimitRule(10, 60), RateLimitRule(2, 3600)], clock=clock)
+
+    limiter.check("a")
+    limiter.check("a")
+    allowed, retry_after = limiter.check("a")
+    assert not allowed
+    assert retry_after == pytest.approx(1800.0)
+
+
+def test_idle_clients_are_bounded():
+    limiter = RateLimiter([RateLimitRule(1, 60)], max_keys=2, clock=FakeClock())
+
+    for key in ("a", "b", "c"):
+        limiter.check(key)
+
+    assert len(limiter) == 2
+    assert limiter.check("a")[0]
+
+
+def test_chat_returns_429_with_retry_after(fake_async_client, monkeypatch):  # noqa: F811
+    monkeypatch.setattr(main, "rate_limiter", RateLimiter([RateLimitRule(1, 60)]))
+    monkeypatch.setattr(main, "api_key_digests", frozenset({main._digest("team-a"), main._digest("team-b")}))
+    api = TestClient(main.app)
+    headers = {"X-API-Key": "team-a"}
+
+    assert api.post("/chat", json={"message": "Hi"}, headers=headers).status_code == 200
+    limited = api.post("/chat", json={"message": "Hi"}, headers=headers)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert api.post("/chat", json={"message": "Hi"}, headers={"X-API-Key": "team-b"}).status_code == 200
+    assert api.get("/health").status_code == 200
+
+
+def test_unknown_api_keys_share_the_address_bucket(fake_async_client, monkeypatch):  # noqa: F811
+    monkeypatch.setattr(main, "rate_limiter", RateLimiter([RateLimitRule(1, 60)]))
+    api = TestClient(main.app)
+
+    assert api.post("/chat", json={"message": "Hi"}, headers={"X-API-Key": "made-up-1"}).status_code == 200
+    assert api.post("/chat", json={"message": "Hi"}, headers={"X-API-Key": "made-up-2"}).status_code == 429
+
+
+@pytest.mark.parametrize("peer, forwarded, expected", [
+    ("203.0.113.9", "198.51.100.1", "203.0.113.9"),
+    ("10.0.0.5", "1.2.3.4, 198.51.100.7", "198.51.100.7"),
+    ("10.0.0.5", "1.2.3.4, 198.51.100.7, 10.0.0.8", "198.51.100.7"),
+    ("10.0.0.5", "", "10.0.0.5")
+])
+def test_client_address_ignores_spoofed_forwarded_entries(peer, forwarded, expected):
+    request = type("Request", (), {
+        "client": type("Address", (), {"host": peer})(),
+        "headers": {"x-forwarded-for": forwarded}
+    })()
+
+    assert main._client_address(request) == expected
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for cached readiness checks, liveness/readiness endpoints and draining on shutdown
+"""
+
+import json
+import time
+import signal
+import asyncio
+
+import httpx
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+import main
+import scoring
+from readiness import ReadinessMonitor
+from test_resilience import fake_azure  # noqa: F401 (pytest fixture)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def monitor_with(checks, critical=("model",), clock=None):
+    return ReadinessMonitor(checks, critical=critical, interval=10, timeout=0.05, clock=clock or Clock())
+
+
+async def passing():
+    return "fine"
+
+
+async def failing():
+    raise ConnectionError("refused")
+
+
+async def hanging():
+    await asyncio.sleep(1)
+
+
+def test_report_is_cached_between_refreshes():
+    calls = []
+
+    async def model():
+        calls.append(1)
+        return "reachable"
+
+    clock = Clock()
+    monitor = monitor_with({"model": model}, clock=clock)
+    assert monitor.status() == "starting" and not monitor.ready
+
+    asyncio.run(monitor.refresh())
+    for _ in range(5):
+        report = monitor.report()
+
+    assert calls == [1]
+    assert report["status"] == "ready" and report["checks"]["model"]["detail"] == "reachable"
+    clock.now = 31
+    assert monitor.status() == "stale" and not monitor.ready
+
+
+def test_critical_failures_make_it_not_ready_others_degraded():
+    monitor = monitor_with({"model": passing, "cache": failing, "knowledge": hanging})
+    asyncio.run(monitor.refresh())
+
+    assert monitor.status() == "degraded" and monitor.ready
+    assert monitor.results["cache"].detail == "ConnectionError: refused"
+    assert monitor.results["knowledge"].detail.startswith("timed out")
+
+    monitor.checks["model"] = failing
+    asyncio.run(monitor.refresh())
+    assert monitor.status() == "not_ready" and not monitor.ready
+
+    monitor.draining = True
+    assert monitor.status() == "draining"
+
+
+def test_scoring_checks_against_fake_azure(fake_azure, monkeypatch):  # noqa: F811
+    monkeypatch.setattr(scoring, "search_config", {"fullTextSearchEnabled": False})
+    monitor = ReadinessMonitor(scoring.readiness_checks(), critical=scoring.READINESS_CRITICAL)
+    asyncio.run(monitor.refresh())
+
+    report = monitor.report()
+    assert report["status"] == "ready"
+    assert report["checks"]["model"]["detail"] == "1/1 endpoints reachable"
+    assert report["checks"]["knowledge"]["detail"] == "retrieval disabled"
+    assert report["checks"]["cache"]["detail"] == "disabled"
+
+
+def test_ready_endpoint_serves_report_and_503_when_draining(monkeypatch):
+    monitor = monitor_with({"model": passing})
+    asyncio.run(monitor.refresh())
+    monkeypatch.setattr(main, "readiness_monitor", monitor)
+    api = TestClient(main.app)
+
+    assert api.get("/health/live").json()["status"] == "healthy"
+    assert api.get("/health/ready").status_code == 200
+    monitor.draining = True
+    response = api.get("/health/ready")
+    assert response.status_code == 503 and response.json()["status"] == "draining"
+    assert api.get("/health").status_code == 200
+
+
+def test_readiness_fails_before_server_stops_accepting(monkeypatch):
+    monitor = monitor_with({"model": passing}, clock=time.monotonic)
+    asyncio.run(monitor.refresh())
+    monkeypatch.setattr(main, "readiness_monitor", monitor)
+
+    async def shutdown():
+        server = main.DrainingServer(
+            uvicorn.Config(main.app, port=0, lifespan="off", log_level="warning"), drain_delay=0.5
+        )
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        server.handle_exit(signal.SIGTERM, None)
+        stopping = time.monotonic()
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            ready = await client.get("/health/ready")
+            live = await client.get("/health/live")
+        await serving
+        return ready, live, time.monotonic() - stopping
+
+    ready, live, stopped_after = asyncio.run(shutdown())
+    assert ready.status_code == 503 and ready.json()["status"] == "draining"
+    assert live.status_code == 200
+    assert stopped_after >= 0.5
+
+
+@pytest.mark.parametrize("deployment, expected", [
+    ({"gracefulShutdown": True, "shutdownTimeout": "45s"}, 45.0),
+    ({"gracefulShutdown": False, "shutdownTimeout": "45s"}, 0.0)
+])
+def test_shutdown_timeout_follows_mcp_config(tmp_path, monkeypatch, deployment, expected):
+    path = tmp_path / "mcp-config.json"
+    path.write_text(json.dumps({"deployment": deployment}))
+    monkeypatch.setenv("MCP_CONFIG_PATH", str(path))
+    monkeypatch.delenv("SHUTDOWN_TIMEOUT", raising=False)
+    monkeypatch.delenv("DRAIN_DELAY", raising=False)
+
+    assert main._shutdown_timeout() == expected
+    assert main._drain_delay() == (5.0 if expected else 0.0)
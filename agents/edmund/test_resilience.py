@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests for retries, circuit breaking and hedging around upstream calls
+Runs the real OpenAI client against fake_openai_server in-process
+"""
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+from openai import AsyncAzureOpenAI
+from fastapi.testclient import TestClient
+
+import main
+import metrics
+import scoring
+import fake_openai_server
+from resilience import Resilience, CircuitBreaker, CircuitOpenError, Budget
+from agent_snapshot import compile_snapshot
+from test_scoring import AGENT_CONFIG
+
+
+@pytest.fixture
+def fake_azure(monkeypatch):
+    fake_openai_server.state.reset()
+    client = AsyncAzureOpenAI(
+        api_key="fake",
+        api_version="2024-12-01-preview",
+        azure_endpoint="http://fake-openai",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_openai_server.app))
+    )
+    monkeypatch.setattr(scoring, "agent_config", AGENT_CONFIG)
+    monkeypatch.setattr(scoring, "agent_snapshot", compile_snapshot(AGENT_CONFIG))
+    monkeypatch.setattr(scoring, "async_client", client)
+    monkeypatch.setattr(scoring, "request_slots", asyncio.Semaphore(8))
+    monkeypatch.setattr(scoring, "retriever", None)
+    monkeypatch.setattr(scoring, "response_cache", None)
+    monkeypatch.setattr(scoring, "semantic_cache", None)
+    monkeypatch.setattr(scoring, "conversation_store", None)
+    monkeypatch.setattr(scoring, "upstream_pool", None)
+    monkeypatch.setattr(scoring, "tool_executor", None)
+    monkeypatch.setattr(scoring, "resilience", Resilience(initial_backoff=0.001, max_backoff=1.0))
+    return fake_openai_server.state
+
+
+def ask(content="Hi Edmund"):
+    return asyncio.run(scoring.process_async({"messages": [{"role": "user", "content": content}]}))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_then_probes_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_cancelled_half_open_probe_frees_its_slot():
+    clock = FakeClock()
+    resilience = Resilience(max_retries=0, breaker_options={"failure_threshold": 1, "reset_timeout": 10, "clock": clock})
+    breaker = resilience.breaker("gpt-4o")
+    breaker.record_failure()
+    clock.now = 10
+
+    async def probe():
+        call = asyncio.create_task(resilience.call("gpt-4o", lambda: asyncio.sleep(60)))
+        await asyncio.sleep(0)
+        assert breaker.state == "half_open" and not breaker.allow()
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        return await resilience.call("gpt-4o", lambda: asyncio.sleep(0, "ok"))
+
+    assert asyncio.run(probe()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_budget_limits_extra_attempts():
+    budget = Budget(0.5, reserve=1)
+
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not Budget(0.0).withdraw()
+
+
+def test_transient_failures_are_retried(fake_azure):
+    fake_azure.deployment("gpt-4o").configure({"failures": [429, 503], "retry_after": 0})
+    retries_before = metrics.RETRIES.value(deployment="gpt-4o", reason="429")
+
+    result = ask()
+
+    assert result["response"].startswith("[gpt-4o] Answer to: Hi Edmund")
+    assert result["model"]["usage"]["completion_tokens"] > 0
+    assert fake_azure.deployment("gpt-4o").calls == 3
+    assert metrics.RETRIES.value(deployment="gpt-4o", reason="429") == retries_before + 1
+
+
+def test_client_errors_and_long_retry_after_are_not_retried(fake_azure):
+    fake_azure.deployment("gpt-4o").configure({"failures": [400]})
+    with pytest.raises(openai.BadRequestError):
+        ask()
+
+    fake_azure.deployment("gpt-4o").configure({"failures": [429], "retry_after": 60})
+    with pytest.raises(openai.RateLimitError):
+        ask()
+    assert fake_azure.deployment("gpt-4o").calls == 2
+
+
+def test_open_circuit_fails_fast_with_503(fake_azure, monkeypatch):
+    monkeypatch.setattr(scoring, "resilience", Resilience(
+        max_retries=0, breaker_options={"failure_threshold": 2, "reset_timeout": 30}
+    ))
+    fake_azure.deployment("gpt-4o").configure({"failures": [500, 500, 500]})
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            ask()
+
+    with pytest.raises(CircuitOpenError):
+        ask()
+    assert fake_azure.deployment("gpt-4o").calls == 2
+
+    response = TestClient(main.app).post("/chat", json={"message": "Hi"})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def test_slow_call_is_hedged(fake_azure, monkeypatch):
+    monkeypatch.setattr(scoring, "resilience", Resilience(hedge_delay=0.01, hedge_budget=1.0))
+    fake_azure.deployment("gpt-4o").configure({"latency": "50ms"})
+
+    assert ask()["response"].startswith("[gpt-4o]")
+    assert fake_azure.deployment("gpt-4o").calls == 2
+
+
+def test_streaming_through_fake_server(fake_azure):
+    async def collect():
+        data = {"messages": [{"role": "user", "content": "Stream please"}]}
+        return [event async for event in scoring.stream_async(data)]
+
+    events = asyncio.run(collect())
+
+    text = "".join(e["content"] for e in events if e["type"] == "token")
+    assert text == "[gpt-4o] Answer to: Stream please"
+    assert events[-1]["model"]["usage"]["completion_tokens"] == 5
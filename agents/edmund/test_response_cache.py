@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Edmund's completion cache
+"""
+
+import json
+
+import pytest
+
+import response_cache
+from config_units import parse_duration, parse_size
+from response_cache import ResponseCache, cache_key, create_response_cache
+
+
+PARAMS = {"model": "gpt-4o", "temperature": 0.1}
+
+
+def entry(size: int) -> dict:
+    """A cached result whose serialized form is exactly size bytes"""
+    overhead = len(json.dumps({"response": ""}))
+    return {"response": "x" * (size - overhead)}
+
+
+def test_parse_config_units():
+    assert parse_duration("1h") == 3600
+    assert parse_duration("30s") == 30
+    assert parse_duration("500ms") == 0.5
+    assert parse_size("100MB") == 100 * 1024 * 1024
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+
+
+def test_cache_key_normalizes_whitespace_but_not_parameters():
+    messages = [{"role": "user", "content": "What is  step 9?"}]
+
+    assert cache_key(messages, PARAMS) == cache_key([{"role": "user", "content": " What is step 9? "}], PARAMS)
+    assert cache_key(messages, PARAMS) != cache_key(messages, dict(PARAMS, temperature=0.7))
+    assert cache_key(messages, PARAMS) != cache_key([{"role": "system", "content": "Hi"}] + messages, PARAMS)
+
+
+def test_lru_eviction_respects_byte_budget():
+    cache = ResponseCache(max_bytes=300, ttl_seconds=60)
+    cache.set("a", entry(100))
+    cache.set("b", entry(100))
+    cache.set("c", entry(100))
+    cache.get("a")  # a becomes most recently used
+
+    cache.set("d", entry(100))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size_bytes <= 300
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(max_bytes=1024, ttl_seconds=60)
+    cache.set("a", {"response": "hi"})
+
+    now[0] += 61
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_cached_values_are_isolated_from_callers():
+    cache = ResponseCache(max_bytes=1024, ttl_seconds=60)
+    cache.set("a", {"response": "hi"})
+
+    cache.get("a")["response"] = "changed"
+
+    assert cache.get("a") == {"response": "hi"}
+
+
+def test_create_response_cache_from_caching_block(monkeypatch):
+    monkeypatch.delenv("RESPONSE_CACHE_REDIS_URL", raising=False)
+
+    cache = create_response_cache({"enabled": True, "ttl": "1h", "maxCacheSize": "100MB", "evictionPolicy": "lru"})
+
+    assert cache.max_bytes == 100 * 1024 * 1024 and cache.ttl_seconds == 3600
+    assert create_response_cache({"enabled": False}) is None
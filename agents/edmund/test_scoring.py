@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Edmund's scoring engine
+Runs against an in-process fake client, no Azure credentials required
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import scoring
+from knowledge_index import KnowledgeIndex
+from response_cache import ResponseCache
+from agent_registry import load_registry
+from agent_snapshot import RetrievalSettings, compile_registry, compile_snapshot
+
+
+AGENT_CONFIG = {
+    "agent": {"name": "Edmund", "displayName": "Edmund (the Engineer)", "version": "1.0.0"},
+    "model": {"modelName": "gpt-4o", "temperature": 0.1, "maxTokens": 256},
+    "instructions": {"systemPrompt": "You are Edmund."}
+}
+
+
+def make_completion(content: str = "Hello from Edmund"):
+    """Build an object shaped like an OpenAI chat completion"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+    )
+
+
+async def make_stream(tokens):
+    """Yield chunks shaped like an OpenAI streaming response"""
+    for token in tokens:
+        yield SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=token))], usage=None
+        )
+    yield SimpleNamespace(
+        choices=[],
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=len(tokens), total_tokens=10 + len(tokens))
+    )
+
+
+class FakeCompletions:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            return make_stream(["Hello", " from", " Edmund"])
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return make_completion()
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def fake_async_client(monkeypatch):
+    completions = FakeCompletions(delay=0.01)
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    registry = load_registry(extra_configs={"Edmund": AGENT_CONFIG})
+    monkeypatch.setattr(scoring, "agent_config", AGENT_CONFIG)
+    monkeypatch.setattr(scoring, "agent_snapshot", compile_snapshot(AGENT_CONFIG))
+    monkeypatch.setattr(scoring, "agent_registry", registry)
+    monkeypatch.setattr(scoring, "agent_snapshots", compile_registry(registry))
+    monkeypatch.setattr(scoring, "async_client", fake)
+    monkeypatch.setattr(scoring, "request_slots", asyncio.Semaphore(4))
+    monkeypatch.setattr(scoring, "retriever", None)
+    monkeypatch.setattr(scoring, "response_cache", None)
+    monkeypatch.setattr(scoring, "semantic_cache", None)
+    monkeypatch.setattr(scoring, "conversation_store", None)
+    monkeypatch.setattr(scoring, "upstream_pool", None)
+    monkeypatch.setattr(scoring, "tool_executor", None)
+    monkeypatch.setattr(scoring, "resilience", None)
+    return completions
+
+
+def test_run_async_prepends_system_prompt(fake_async_client):
+    raw = json.dumps({"messages": [{"role": "user", "content": "Hi"}]})
+    result = json.loads(asyncio.run(scoring.run_async(raw)))
+
+    assert result["response"] == "Hello from Edmund"
+    assert result["model"]["usage"]["total_tokens"] == 15
+    sent = fake_async_client.calls[0]
+    assert sent["messages"][0] == {"role": "system", "content": "You are Edmund."}
+    assert sent["model"] == "gpt-4o"
+    assert sent["max_tokens"] == 256
+
+
+def test_run_async_rejects_invalid_requests(fake_async_client):
+    assert "Invalid JSON" in json.loads(asyncio.run(scoring.run_async("{not json")))["error"]
+    assert "No messages" in json.loads(asyncio.run(scoring.run_async("{}")))["error"]
+    assert fake_async_client.calls == []
+
+
+def test_process_async_bounds_concurrency(fake_async_client):
+    async def burst():
+        data = {"messages": [{"role": "user", "content": "Hi"}]}
+        return await asyncio.gather(*(scoring.process_async(data) for _ in range(20)))
+
+    results = asyncio.run(burst())
+
+    assert len(results) == 20
+    assert fake_async_client.peak_in_flight == 4
+
+
+def test_stream_async_yields_tokens_then_usage(fake_async_client):
+    async def collect():
+        data = {"messages": [{"role": "user", "content": "Hi"}]}
+        return [event async for event in scoring.stream_async(data)]
+
+    events = asyncio.run(collect())
+
+    assert [e["content"] for e in events if e["type"] == "token"] == ["Hello", " from", " Edmund"]
+    assert events[-1]["type"] == "done"
+    assert events[-1]["model"]["usage"]["completion_tokens"] == 3
+    assert fake_async_client.calls[0]["stream_options"] == {"include_usage": True}
+
+
+def test_retrieved_passages_are_injected_into_system_prompt(fake_async_client, monkeypatch):
+    index = KnowledgeIndex([
+        {"source": "appendices/wip-limits.adoc", "title": "WIP Limits", "text": "WIP limits cap work in progress."},
+        {"source": "chapters/buckle-up.adoc", "title": "Buckle up", "text": "Welcome aboard the rocket."}
+    ])
+    monkeypatch.setattr(scoring, "retriever", index)
+    monkeypatch.setattr(scoring, "retrieval_settings", RetrievalSettings(5, 4000, True))
+
+    raw = json.dumps({"messages": [{"role": "user", "content": "What are WIP limits?"}]})
+    asyncio.run(scoring.run_async(raw))
+
+    system_prompt = fake_async_client.calls[0]["messages"][0]["content"]
+    assert system_prompt.startswith("You are Edmund.")
+    assert "[appendices/wip-limits.adoc - WIP Limits]" in system_prompt
+    assert "rocket" not in system_prompt
+
+
+def test_identical_prompts_are_served_from_cache(fake_async_client, monkeypatch):
+    cache = ResponseCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    monkeypatch.setattr(scoring, "response_cache", cache)
+
+    first = asyncio.run(scoring.process_async({"messages": [{"role": "user", "content": "What is step 9?"}]}))
+    second = asyncio.run(scoring.process_async({"messages": [{"role": "user", "content": "  What is   step 9? "}]}))
+
+    async def stream():
+        data = {"messages": [{"role": "user", "content": "What is step 9?"}]}
+        return [event async for event in scoring.stream_async(data)]
+    events = asyncio.run(stream())
+
+    assert len(fake_async_client.calls) == 1
+    assert "cached" not in first
+    assert second["cached"] is True and second["response"] == first["response"]
+    assert events[0] == {"type": "token", "content": first["response"]}
+    assert events[-1]["cached"] is True
+    assert cache.stats()["hits"] == 2
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Edmund's near-duplicate prompt cache
+Uses the deterministic hashing embedder, no embedding deployment required
+"""
+
+import asyncio
+
+import semantic_cache
+import scoring
+from semantic_cache import SemanticCache
+from semantic_index import HashingEmbedder
+from test_scoring import fake_async_client  # noqa: F401 (pytest fixture)
+
+
+def make_cache(**kwargs) -> SemanticCache:
+    return SemanticCache(HashingEmbedder(256), **dict({"threshold": 0.7, "max_entries": 3}, **kwargs))
+
+
+def test_paraphrase_hits_and_unrelated_question_misses():
+    cache = make_cache()
+    cache.set("What are the WIP limits for the engineer stage?", "edmund", {"response": "Five stories."})
+
+    hit = cache.get("what are WIP limits for the engineer stage", "edmund")
+
+    assert hit["response"] == "Five stories."
+    assert hit["similarity"] >= 0.7
+    assert cache.get("How do I deploy to Kubernetes?", "edmund") is None
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_answers_are_not_shared_across_scopes():
+    cache = make_cache()
+    cache.set("What is step 9?", "edmund", {"response": "Pipelines."})
+
+    assert cache.get("What is step 9?", "teddy") is None
+    assert cache.get("What is step 9?", "edmund") is not None
+
+
+def test_least_recently_used_entry_is_evicted_when_full():
+    cache = make_cache()
+    for question in ["alpha question", "bravo question", "charlie question"]:
+        cache.set(question, "edmund", {"response": question})
+    cache.get("alpha question", "edmund")
+
+    cache.set("delta question", "edmund", {"response": "delta question"})
+
+    assert len(cache) == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("bravo question", "edmund") is None
+    assert cache.get("alpha question", "edmund")["response"] == "alpha question"
+
+
+def test_expired_entries_miss(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    cache = make_cache(ttl_seconds=60)
+    cache.set("What is step 9?", "edmund", {"response": "Pipelines."})
+
+    now[0] += 61
+
+    assert cache.get("What is step 9?", "edmund") is None
+    assert len(cache) == 0
+
+
+def test_scoring_answers_standalone_paraphrases_from_semantic_cache(fake_async_client, monkeypatch):  # noqa: F811
+    monkeypatch.setattr(scoring, "semantic_cache", make_cache())
+
+    first = asyncio.run(scoring.process_async({"messages": [{"role": "user", "content": "What are the WIP limits for the engineer stage?"}]}))
+    second = asyncio.run(scoring.process_async({"messages": [{"role": "user", "content": "what are WIP limits for the engineer stage"}]}))
+    follow_up = asyncio.run(scoring.process_async({"messages": [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello"},
+        {"role": "user", "content": "what are WIP limits for the engineer stage"}
+    ]}))
+
+    assert second["cached"] is True and second["response"] == first["response"]
+    assert "cached" not in follow_up
+    assert len(fake_async_client.calls) == 2
+
+
+def test_scopes_dropped_on_reload_free_their_entries():
+    cache = make_cache()
+    cache.set("What is step 9?", "old-prompt", {"response": "Pipelines."})
+    cache.set("What is step 10?", "edmund", {"response": "Releases."})
+
+    cache.retain_scopes(["edmund", "new-prompt"])
+
+    assert len(cache) == 1 and list(cache._scope_ids) == ["edmund"]
+    assert asyncio.run(cache.aget("What is step 10?", "edmund"))["response"] == "Releases."
+
+
+def test_hashing_embedder_gets_a_strict_threshold(monkeypatch):
+    monkeypatch.setattr(scoring, "retriever", None)
+    monkeypatch.setattr(scoring, "search_config", {"relevanceThreshold": 0.7})
+
+    cache = scoring._create_semantic_cache({"caching": {"enabled": True, "semanticCache": {"enabled": True}}})
+
+    assert cache.threshold == semantic_cache.HASHING_EMBEDDER_THRESHOLD
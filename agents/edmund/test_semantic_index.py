@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Edmund's memory-mapped semantic index and hybrid retrieval
+Uses the deterministic hashing embedder, no embedding deployment required
+"""
+
+import numpy as np
+import pytest
+
+import semantic_index
+from knowledge_index import KnowledgeIndex
+from semantic_index import (
+    HashingEmbedder, HybridRetriever, SemanticIndex, source_weights, update_semantic_index
+)
+
+
+CHUNKS = [
+    {"source": "appendices/wip-limits.adoc", "title": "WIP Limits", "text": "Limit work in progress to finish faster.", "source_id": "tminus15-methodology"},
+    {"source": "chapters/lets-get-agile.adoc", "title": "Sprints", "text": "Sprints are two week iterations.", "source_id": "tminus15-methodology"},
+    {"source": "docs/kanban.md", "title": "Kanban", "text": "Kanban boards visualise work in progress.", "source_id": "devops-best-practices"}
+]
+
+
+def texts():
+    return [f"{c['title']}\n{c['text']}" for c in CHUNKS]
+
+
+def test_hashing_embedder_is_deterministic_unit_length():
+    embedder = HashingEmbedder(dimension=64)
+
+    first, second = embedder(["work in progress"]), embedder(["work in progress"])
+
+    assert first.dtype == np.float32 and first.shape == (1, 64)
+    assert np.array_equal(first, second)
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "float32"])
+def test_saved_index_is_memory_mapped(tmp_path, dtype):
+    prefix = str(tmp_path / "semantic-index")
+    SemanticIndex.build(texts(), HashingEmbedder(64), dtype).save(prefix)
+
+    loaded = SemanticIndex.load(prefix)
+
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.vectors.dtype == np.dtype(dtype)
+    assert loaded.search_batch(["sprints two week iterations"], 1)[0][0][0] == 1
+
+
+def test_float16_index_is_scored_in_blocks(monkeypatch):
+    monkeypatch.setattr(semantic_index, "SCORE_BLOCK_ROWS", 2)
+    half = SemanticIndex.build(texts(), HashingEmbedder(64), "float16")
+    full = SemanticIndex(half.vectors.astype(np.float32), half.embedder)
+
+    scores = half.score_batch(["work in progress", "sprints"])
+
+    assert scores.dtype == np.float32 and scores.shape == (2, 3)
+    assert np.allclose(scores, full.score_batch(["work in progress", "sprints"]))
+
+
+def test_search_batch_returns_ranked_results_per_query():
+    index = SemanticIndex.build(texts(), HashingEmbedder(256), "float32")
+
+    results = index.search_batch(["two week sprints", "limit work in progress"], k=2)
+
+    assert [r[0][0] for r in results] == [1, 0]
+    assert all(len(r) == 2 and r[0][1] >= r[1][1] for r in results)
+
+
+def test_hybrid_retriever_applies_source_weights():
+    sources_config = {"knowledgeSources": [
+        {"id": "tminus15-methodology", "weight": 1.0},
+        {"id": "devops-best-practices", "weight": 0.5}
+    ]}
+    retriever = HybridRetriever(
+        KnowledgeIndex([dict(c) for c in CHUNKS]),
+        SemanticIndex.build(texts(), HashingEmbedder(256), "float32"),
+        source_weights(sources_config)
+    )
+
+    results = retriever.search("work in progress", k=3)
+
+    assert results[0]["source"] == "appendices/wip-limits.adoc"
+    kanban = next(r for r in results if r["source"] == "docs/kanban.md")
+    assert kanban["score"] <= 0.5
+
+
+def test_hybrid_retriever_rejects_misaligned_indexes():
+    with pytest.raises(ValueError):
+        HybridRetriever(
+            KnowledgeIndex([dict(CHUNKS[0])]),
+            SemanticIndex.build(texts(), HashingEmbedder(64), "float32")
+        )
+
+
+def test_update_semantic_index_embeds_only_new_passages(tmp_path):
+    chunks = [dict(c, hash=f"h{i}") for i, c in enumerate(CHUNKS)]
+    prefix = str(tmp_path / "semantic-index")
+    SemanticIndex.build(texts(), HashingEmbedder(64), "float16", [c["hash"] for c in chunks]).save(prefix)
+
+    edited = dict(chunks[1], text="Sprints are three week iterations.", hash="h1-edited")
+    updated_index = KnowledgeIndex([dict(chunks[0]), edited, dict(chunks[2])])
+    updated, embedded = update_semantic_index(updated_index, prefix)
+
+    assert embedded == 1
+    reloaded = SemanticIndex.load(prefix)
+    assert reloaded.chunk_hashes == ["h0", "h1-edited", "h2"]
+    assert np.array_equal(reloaded.vectors[0], SemanticIndex.build(texts(), HashingEmbedder(64), "float16").vectors[0])
+    HybridRetriever(updated_index, reloaded)
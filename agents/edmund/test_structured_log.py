@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for queued, sampled structured logging
+"""
+
+import json
+import queue
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+import scoring
+import structured_log
+from structured_log import DroppingQueueHandler, JsonFormatter, log_event
+from test_scoring import fake_async_client, make_completion  # noqa: F401 (pytest fixture)
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def records(monkeypatch):
+    handler = RecordingHandler()
+    logger = logging.getLogger("test_structured_log")
+    logger.addHandler(handler)
+    scoring.logger.addHandler(handler)
+    monkeypatch.setattr(structured_log, "_sample_rate", 1.0)
+    yield handler.records
+    logger.removeHandler(handler)
+    scoring.logger.removeHandler(handler)
+
+
+def test_fields_are_capped_and_sampled_events_can_be_skipped(records, monkeypatch):
+    logger = logging.getLogger("test_structured_log")
+    log_event(logger, logging.INFO, "request.failed", detail="x" * 10000)
+    monkeypatch.setattr(structured_log, "_sample_rate", 0.0)
+    log_event(logger, logging.INFO, "request.completed", sampled=True, total_tokens=10)
+    log_event(logger, logging.ERROR, "request.failed", error="Timeout")
+
+    assert [r.getMessage() for r in records] == ["request.failed", "request.failed"]
+    assert records[0].detail.startswith("x" * structured_log.DEFAULT_MAX_FIELD_CHARS + "...[")
+    assert len(records[0].detail) < 300
+
+
+def test_queue_handler_defers_formatting_and_drops_when_full():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger("test_structured_log.queue")
+    first = logger.makeRecord(logger.name, logging.INFO, __file__, 0, "%s tokens", (42,), None)
+    handler.handle(first)
+    handler.handle(logger.makeRecord(logger.name, logging.INFO, __file__, 0, "dropped", (), None))
+
+    queued = handler.queue.get_nowait()
+    assert queued is first and queued.args == (42,)
+    assert handler.dropped == 1
+
+
+def test_json_formatter_includes_fields():
+    logger = logging.getLogger("test_structured_log.json")
+    record = logger.makeRecord(logger.name, logging.INFO, __file__, 0, "request.completed", (), None,
+                               extra={"agent": "Edmund", "total_tokens": 15})
+
+    line = json.loads(JsonFormatter().format(record))
+
+    assert line["event"] == "request.completed"
+    assert line["agent"] == "Edmund" and line["total_tokens"] == 15
+
+
+def test_run_logs_metadata_but_not_content(records, fake_async_client, monkeypatch):  # noqa: F811
+    secret = "my password is hunter2 " * 1000
+
+    def create(**kwargs):
+        return make_completion()
+
+    completions = SimpleNamespace(create=create)
+    monkeypatch.setattr(scoring, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    result = json.loads(scoring.run(json.dumps({"messages": [{"role": "user", "content": secret}]})))
+
+    assert result["response"] == "Hello from Edmund"
+    events = {r.getMessage(): r for r in records}
+    assert events["request.received"].message_count == 1
+    assert events["request.completed"].total_tokens == 15
+    assert not any("hunter2" in str(vars(r)) for r in records)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for request tracing with the in-memory span exporter
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import tracing
+from test_scoring import fake_async_client  # noqa: F401 (pytest fixture)
+from test_mcp_tools import executor, mcp_server, tool_call  # noqa: F401 (pytest fixtures)
+
+pytest.importorskip("opentelemetry.sdk")
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    monkeypatch.setattr(tracing, "_tracer", None)
+    exporter = tracing.configure("memory", sample_rate=1.0)
+    return exporter
+
+
+def by_name(exporter):
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+def test_tracing_is_a_noop_when_sampling_is_off(monkeypatch):
+    monkeypatch.setattr(tracing, "_tracer", None)
+    assert tracing.configure("memory", sample_rate=0) is None
+    with tracing.start_span("scoring.request") as span:
+        assert span is tracing.NOOP_SPAN and not span.is_recording()
+    assert tracing.extract({"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"}) is None
+
+
+def test_chat_spans_each_stage_with_tokens(spans, fake_async_client):  # noqa: F811
+    response = TestClient(main.app).post(
+        "/chat", json={"message": "Hi Edmund"},
+        headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"}
+    )
+
+    assert response.status_code == 200
+    recorded = by_name(spans)
+    assert {"chat", "scoring.request", "scoring.prompt", "scoring.cache_lookup", "model.completion"} <= set(recorded)
+    assert all(format(span.context.trace_id, "032x") == TRACE_ID for span in recorded.values())
+    assert recorded["scoring.request"].parent.span_id == recorded["chat"].context.span_id
+    assert recorded["model.completion"].parent.span_id == recorded["scoring.request"].context.span_id
+    assert recorded["scoring.request"].attributes["edmund.cache.hit"] is False
+    assert recorded["model.completion"].attributes["gen_ai.usage.output_tokens"] == 5
+
+
+def test_stream_span_covers_reading_tokens(spans, fake_async_client):  # noqa: F811
+    response = TestClient(main.app).post("/chat", json={"message": "Hi Edmund", "stream": True})
+
+    assert response.status_code == 200
+    recorded = by_name(spans)
+    assert recorded["model.stream"].attributes["gen_ai.usage.output_tokens"] == 3
+    assert recorded["scoring.request"].attributes["edmund.mode"] == "stream"
+    assert recorded["scoring.request"].parent.span_id == recorded["chat"].context.span_id
+
+
+def test_tool_calls_record_cache_hits(spans, executor):  # noqa: F811
+    asyncio.run(executor.execute([tool_call("a", "README.md")]))
+    asyncio.run(executor.execute([tool_call("b", "README.md")]))
+
+    calls = [span for span in spans.get_finished_spans() if span.name == "tool.call"]
+    assert [span.attributes["edmund.cache.hit"] for span in calls] == [False, True]
+    assert calls[0].attributes["edmund.tool.server"] == "github-connector"
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for balancing across deployments and the model fallback chain
+Runs the real OpenAI client against fake_openai_server in-process
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from openai import AsyncAzureOpenAI
+
+import scoring
+import fake_openai_server
+from agent_snapshot import compile_snapshot
+from resilience import Resilience, CircuitOpenError
+from upstream_pool import Target, UpstreamPool, create_upstream_pool
+from test_scoring import AGENT_CONFIG
+from test_resilience import fake_azure, ask, FakeClock  # noqa: F401 (pytest fixture)
+
+FALLBACK_CONFIG = {"model": {"modelName": "gpt-4o", "fallbackModels": ["gpt-4o-mini"]}}
+
+
+def make_client(endpoint, api_key):
+    return AsyncAzureOpenAI(
+        api_key=api_key or "fake",
+        api_version="2024-12-01-preview",
+        azure_endpoint=endpoint,
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_openai_server.app))
+    )
+
+
+@pytest.fixture
+def pool(fake_azure, monkeypatch):  # noqa: F811
+    pool = create_upstream_pool(
+        dict(FALLBACK_CONFIG, upstreams=[
+            {"name": "east", "endpoint": "http://east", "deployments": {"gpt-4o": {}, "gpt-4o-mini": {}}},
+            {"name": "west", "endpoint": "http://west", "deployments": {"gpt-4o": {"maxConcurrency": 1}}}
+        ]),
+        make_client,
+        Resilience(max_retries=0, breaker_options={"failure_threshold": 1, "reset_timeout": 60})
+    )
+    monkeypatch.setattr(scoring, "upstream_pool", pool)
+    monkeypatch.setattr(scoring, "agent_snapshot", compile_snapshot(dict(AGENT_CONFIG, **FALLBACK_CONFIG)))
+    return pool
+
+
+def test_config_builds_targets_and_fallback_chain(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "http://default")
+    pool = create_upstream_pool(FALLBACK_CONFIG, make_client)
+
+    assert [t.key for t in pool.targets] == ["default/gpt-4o", "default/gpt-4o-mini"]
+    assert pool.chain("gpt-4o") == ["gpt-4o", "gpt-4o-mini"]
+
+
+def test_ranking_prefers_least_loaded_and_skips_saturated():
+    clock = FakeClock()
+    busy = Target("east", None, "gpt-4o")
+    idle = Target("west", None, "gpt-4o", tokens_per_minute=600, clock=clock)
+    mini = Target("east", None, "gpt-4o-mini")
+    pool = UpstreamPool([mini, busy, idle], fallback_models={"gpt-4o": ["gpt-4o-mini"]})
+    busy.outstanding = 2
+
+    assert pool.ranked("gpt-4o") == [idle, busy, mini]
+
+    idle.charge(type("Usage", (), {"total_tokens": 600})())
+    assert pool.ranked("gpt-4o") == [busy, mini]
+    clock.now = 30
+    assert pool.ranked("gpt-4o") == [idle, busy, mini]
+
+
+def test_spills_over_to_fallback_model_when_primary_fails(pool):
+    fake_openai_server.state.deployment("gpt-4o").configure({"failures": [429, 429]})
+
+    result = ask("What is a circuit breaker?")
+
+    assert result["response"].startswith("[gpt-4o-mini]")
+    assert result["model"]["name"] == "gpt-4o-mini"
+    assert fake_openai_server.state.deployment("gpt-4o").calls == 2
+
+
+def test_requests_are_spread_across_endpoints(pool):
+    fake_openai_server.state.deployment("gpt-4o").configure({"latency": "20ms"})
+
+    async def burst():
+        return await asyncio.gather(*[
+            scoring.process_async({"messages": [{"role": "user", "content": f"Question {i}"}]})
+            for i in range(4)
+        ])
+
+    results = asyncio.run(burst())
+
+    calls = {t.key: t.calls for t in pool.targets}
+    assert calls["east/gpt-4o"] > 0 and calls["west/gpt-4o"] > 0
+    assert all(r["model"]["name"] in ("gpt-4o", "gpt-4o-mini") for r in results)
+
+
+def test_unavailable_when_every_circuit_is_open(pool):
+    for target in pool.targets:
+        pool.resilience.breaker(target.key).record_failure()
+
+    with pytest.raises(CircuitOpenError) as raised:
+        ask()
+    assert raised.value.retry_after >= 1.0
+
+
+def test_models_missing_from_upstreams_use_first_endpoint():
+    pool = create_upstream_pool(
+        dict(FALLBACK_CONFIG, upstreams=[{"name": "east", "endpoint": "http://east", "deployments": {"gpt-4o": {}}}]),
+        make_client
+    )
+
+    assert [t.key for t in pool.targets] == ["east/gpt-4o", "east/gpt-4o-mini"]
+
+
+def test_agents_sharing_a_model_keep_their_own_fallbacks(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "http://default")
+    danny = {"model": {"modelName": "gpt-4o"}}
+    pool = create_upstream_pool(FALLBACK_CONFIG, make_client, registry={"danny": danny, "edmund": FALLBACK_CONFIG})
+
+    assert pool.chain("gpt-4o") == ["gpt-4o", "gpt-4o-mini"]
+    assert pool.chain("gpt-4o", fallbacks=()) == ["gpt-4o"]
+    assert [t.deployment for t in pool.ranked("gpt-4o", fallbacks=())] == ["gpt-4o"]
+
+
+def test_open_stream_counts_as_outstanding_until_closed(pool):
+    async def stream():
+        response, _ = await pool.complete(
+            {"model": "gpt-4o"}, messages=[{"role": "user", "content": "Hi"}], stream=True
+        )
+        open_counts = sum(t.outstanding for t in pool.targets)
+        async for _ in response:
+            pass
+        return open_counts, sum(t.outstanding for t in pool.targets)
+
+    assert asyncio.run(stream()) == (1, 0)
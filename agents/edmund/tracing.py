@@ -0,0 +1,157 @@
+"""
+OpenTelemetry tracing for Edmund's scoring engine.
+Spans cover each stage of a chat (cache lookup, retrieval, prompt assembly,
+model completion, tool calls) so a slow request shows where the time went.
+
+Tracing is off unless TRACE_SAMPLE_RATE is above 0. While it is off,
+start_span() returns a shared no-op span: no OpenTelemetry objects are
+created and the only cost is a function call. TRACE_EXPORTER selects
+where sampled spans go: "azure" (Application Insights, via
+APPLICATIONINSIGHTS_CONNECTION_STRING), "otlp", "console", or "memory"
+(kept in process, for tests).
+"""
+
+import os
+import logging
+from typing import Dict, Any, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORTER = "azure"
+TRACER_NAME = "edmund"
+
+# Set by configure(); None while tracing is off
+_tracer: Any = None
+
+
+class _NoopSpan:
+    """Stands in for a span (and its context manager) while tracing is off"""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def is_recording(self) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Mapping[str, Any]):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _create_exporter(name: str) -> Any:
+    """The span exporter named by TRACE_EXPORTER (optional packages imported on demand)"""
+    if name == "memory":
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        return InMemorySpanExporter()
+    if name == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        return ConsoleSpanExporter()
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if name == "azure":
+        from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter
+        return AzureMonitorTraceExporter(
+            connection_string=os.getenv('APPLICATIONINSIGHTS_CONNECTION_STRING')
+        )
+    raise ValueError(f"Unknown trace exporter: {name}")
+
+
+def configure(exporter: Optional[str] = None, sample_rate: Optional[float] = None) -> Any:
+    """
+    Start tracing if sampling is enabled.
+
+    Args:
+        exporter: Exporter name (default TRACE_EXPORTER, then "azure")
+        sample_rate: Fraction of new traces recorded (default TRACE_SAMPLE_RATE,
+            then 0); requests continuing a sampled trace are always recorded
+
+    Returns:
+        The span exporter (e.g. an InMemorySpanExporter to read spans back),
+        or None when tracing is off or could not be set up
+    """
+    global _tracer
+    sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', 0) if sample_rate is None else sample_rate)
+    if sample_rate <= 0:
+        _tracer = None
+        return None
+
+    exporter = (exporter or os.getenv('TRACE_EXPORTER', DEFAULT_EXPORTER)).lower()
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        span_exporter = _create_exporter(exporter)
+    except Exception as e:
+        # Missing packages or credentials must not stop the service
+        logger.error(f"Tracing disabled: {str(e)}")
+        _tracer = None
+        return None
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": os.getenv('OTEL_SERVICE_NAME', 'edmund-agent')}),
+        sampler=ParentBased(TraceIdRatioBased(min(sample_rate, 1.0)))
+    )
+    # Local exporters write synchronously; remote ones export in the background
+    processor = SimpleSpanProcessor if exporter in ("memory", "console") else BatchSpanProcessor
+    provider.add_span_processor(processor(span_exporter))
+    if not isinstance(trace.get_tracer_provider(), TracerProvider):
+        trace.set_tracer_provider(provider)
+    _tracer = provider.get_tracer(TRACER_NAME)
+    logger.info(f"Tracing enabled ({exporter}, sample rate {sample_rate})")
+    return span_exporter
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, context: Any = None) -> Any:
+    """
+    Context manager for a span that is the current span inside the block.
+
+    Exceptions leaving the block are recorded on the span. Attributes that
+    are expensive to compute should be set inside `if span.is_recording():`.
+
+    Args:
+        name: Span name, e.g. "scoring.retrieval"
+        attributes: Initial attributes
+        context: Parent context (see extract()); defaults to the current span
+    """
+    if _tracer is None:
+        return NOOP_SPAN
+    return _tracer.start_as_current_span(name, context=context, attributes=attributes)
+
+
+def extract(headers: Mapping[str, str]) -> Any:
+    """The trace context of an incoming request's traceparent header, if any"""
+    if _tracer is None:
+        return None
+    from opentelemetry import propagate
+    return propagate.extract(headers)
+
+
+def mark_error(span: Any, error: BaseException):
+    """Flag a span whose stage failed without raising (e.g. a tool error reported to the model)"""
+    if not span.is_recording():
+        return
+    from opentelemetry.trace import Status, StatusCode
+    span.record_exception(error)
+    span.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+def set_usage(span: Any, usage: Any):
+    """Token counts of a completion, as OpenTelemetry gen_ai attributes"""
+    if usage is None or not span.is_recording():
+        return
+    span.set_attributes({
+        "gen_ai.usage.input_tokens": usage.prompt_tokens,
+        "gen_ai.usage.output_tokens": usage.completion_tokens
+    })
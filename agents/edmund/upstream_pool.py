@@ -0,0 +1,292 @@
+"""
+Pool of Azure OpenAI endpoints and deployments for Edmund's scoring engine.
+Requests go to the least loaded healthy deployment of the agent's model
+(outstanding requests weighted by recent latency), spill over to other
+endpoints when one is out of quota or failing, and fall back to the
+cheaper models in model.fallbackModels when every primary deployment is
+saturated. Configured by the "upstreams" block of agent-config.json.
+"""
+
+import os
+import time
+import logging
+from functools import partial
+from typing import Dict, Any, AsyncIterator, Callable, List, Mapping, Optional, Sequence, Tuple
+
+import openai
+
+from resilience import Resilience, CircuitOpenError, is_retryable
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.3
+INITIAL_LATENCY = 1.0
+
+
+class UpstreamUnavailableError(CircuitOpenError):
+    """No deployment of the model or its fallbacks can take the request"""
+
+    def __init__(self, model: str, retry_after: float):
+        openai.OpenAIError.__init__(self, f"No deployment available for {model} or its fallbacks")
+        self.deployment = model
+        self.retry_after = retry_after
+
+
+class Target:
+    """One deployment on one endpoint, with its live load and quota"""
+
+    def __init__(self, endpoint: str, client: Any, deployment: str,
+                 tokens_per_minute: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 clock=time.monotonic):
+        self.endpoint = endpoint
+        self.client = client
+        self.deployment = deployment
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self._clock = clock
+        self.outstanding = 0
+        self.latency = INITIAL_LATENCY
+        self.calls = 0
+        # Token bucket refilled at tokens_per_minute; usage is charged after each call
+        self.quota = float(tokens_per_minute or 0)
+        self.quota_updated = clock()
+
+    @property
+    def key(self) -> str:
+        return f"{self.endpoint}/{self.deployment}"
+
+    def _refill(self):
+        if not self.tokens_per_minute:
+            return
+        now = self._clock()
+        self.quota = min(self.tokens_per_minute,
+                         self.quota + (now - self.quota_updated) * self.tokens_per_minute / 60)
+        self.quota_updated = now
+
+    def saturated(self) -> bool:
+        """Out of token quota or at its concurrency limit"""
+        if self.max_concurrency and self.outstanding >= self.max_concurrency:
+            return True
+        self._refill()
+        return bool(self.tokens_per_minute) and self.quota <= 0
+
+    def load(self) -> float:
+        """Expected wait: requests in flight (plus this one) times recent latency"""
+        return (self.outstanding + 1) * self.latency
+
+    def record(self, elapsed: float):
+        self.calls += 1
+        self.latency += LATENCY_ALPHA * (elapsed - self.latency)
+
+    def charge(self, usage: Any):
+        """Take a completion's tokens out of the quota"""
+        if usage is not None and self.tokens_per_minute:
+            self._refill()
+            self.quota -= usage.total_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "endpoint": self.endpoint,
+            "deployment": self.deployment,
+            "outstanding": self.outstanding,
+            "latency_seconds": self.latency,
+            "calls": self.calls,
+            "quota_tokens": self.quota if self.tokens_per_minute else None
+        }
+
+
+async def _metered(stream: Any, target: Target) -> AsyncIterator[Any]:
+    """
+    Pass a completion stream through, charging its usage chunk to the target.
+
+    The stream counts as outstanding on the target until it is read to the
+    end or closed.
+    """
+    try:
+        async for chunk in stream:
+            if getattr(chunk, 'usage', None) is not None:
+                target.charge(chunk.usage)
+            yield chunk
+    finally:
+        target.outstanding -= 1
+
+
+class UpstreamPool:
+    """Balances completions over targets, model by model along the fallback chain"""
+
+    def __init__(self, targets: List[Target], resilience: Optional[Resilience] = None,
+                 fallback_models: Optional[Dict[str, List[str]]] = None):
+        self.targets = targets
+        self.resilience = resilience
+        self.fallback_models = fallback_models or {}
+
+    def chain(self, model: str, fallbacks: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        The requested model followed by its fallbacks.
+
+        Args:
+            model: Requested model
+            fallbacks: The calling agent's model.fallbackModels (default: those
+                of the serving agent, or the first agent using the model)
+        """
+        if fallbacks is None:
+            fallbacks = self.fallback_models.get(model, [])
+        return [model] + [m for m in fallbacks if m != model]
+
+    def ranked(self, model: str, fallbacks: Optional[Sequence[str]] = None) -> List[Target]:
+        """Targets to try: each model's unsaturated deployments, least loaded first"""
+        ranked = []
+        for name in self.chain(model, fallbacks):
+            candidates = [t for t in self.targets if t.deployment == name and not t.saturated()]
+            ranked.extend(sorted(candidates, key=Target.load))
+        return ranked
+
+    async def complete(self, model_params: Mapping[str, Any], hedge: bool = False,
+                       fallbacks: Optional[Sequence[str]] = None, **kwargs) -> Tuple[Any, str]:
+        """
+        Create a chat completion on the best available deployment.
+
+        A deployment that keeps failing after its retries, has an open
+        circuit or does not exist is skipped for the next one in line.
+
+        Args:
+            model_params: Completion parameters, including the requested model
+            hedge: Hedge slow calls (see Resilience.call)
+            fallbacks: The calling agent's fallback models (see chain())
+            **kwargs: Further chat.completions.create arguments
+
+        Returns:
+            (completion or stream, deployment that served it)
+
+        Raises:
+            UpstreamUnavailableError: If no deployment could take the request
+            openai.OpenAIError: Non-transient errors (e.g. a bad request)
+        """
+        model = model_params['model']
+        last_error: Optional[Exception] = None
+        for target in self.ranked(model, fallbacks):
+            if target.deployment != model:
+                logger.warning(f"Falling back from {model} to {target.deployment} on {target.endpoint}")
+            create: Callable = partial(
+                target.client.chat.completions.create, **kwargs, **dict(model_params, model=target.deployment)
+            )
+            target.outstanding += 1
+            started = time.perf_counter()
+            streaming = False
+            try:
+                if self.resilience is None:
+                    response = await create()
+                else:
+                    response = await self.resilience.call(target.key, create, hedge=hedge)
+                # An open stream stays outstanding until _metered finishes it
+                streaming = bool(kwargs.get('stream'))
+            except CircuitOpenError as e:
+                last_error = e
+                continue
+            except openai.NotFoundError as e:
+                logger.warning(f"Deployment {target.key} not found, skipping: {str(e)}")
+                last_error = e
+                continue
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                logger.warning(f"Spilling over from {target.key}: {str(e)}")
+                last_error = e
+                continue
+            finally:
+                if not streaming:
+                    target.outstanding -= 1
+            # For streams this is the time to the first byte; usage arrives with the last chunk
+            target.record(time.perf_counter() - started)
+            if streaming:
+                return _metered(response, target), target.deployment
+            target.charge(response.usage)
+            return response, target.deployment
+
+        if last_error is not None and not isinstance(last_error, CircuitOpenError):
+            raise last_error
+        raise UpstreamUnavailableError(model, self._retry_after(model, fallbacks))
+
+    def _retry_after(self, model: str, fallbacks: Optional[Sequence[str]] = None) -> float:
+        """Shortest wait until any deployment in the chain accepts requests again"""
+        if self.resilience is None:
+            return 1.0
+        chain = self.chain(model, fallbacks)
+        waits = [
+            self.resilience.breaker(t.key).retry_after()
+            for t in self.targets if t.deployment in chain
+        ]
+        return max(1.0, min(waits)) if waits else 1.0
+
+    async def close(self):
+        closed = set()
+        for target in self.targets:
+            if id(target.client) not in closed:
+                closed.add(id(target.client))
+                await target.client.close()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [target.stats() for target in self.targets]
+
+
+def create_upstream_pool(agent_config: Dict[str, Any], make_client: Callable[[str, str], Any],
+                         resilience: Optional[Resilience] = None,
+                         registry: Optional[Dict[str, Any]] = None) -> UpstreamPool:
+    """
+    Build the pool from agent-config.json.
+
+    "upstreams" lists endpoints, each naming the environment variables
+    holding its URL and key and the deployments it serves (with optional
+    tokensPerMinute and maxConcurrency). Without it, the single
+    AZURE_OPENAI_ENDPOINT serves every model used by the registered agents.
+    model.fallbackModels of each agent defines its fallback chain; callers
+    pass their agent's chain to complete(), and the default chain of a
+    model shared by several agents is the serving agent's.
+
+    Args:
+        agent_config: Configuration holding "upstreams" and "model"
+        make_client: Creates an async client for (endpoint URL, API key)
+        resilience: Retry and circuit breaker policy applied per target
+        registry: All registered agent configs (for their models' fallbacks)
+    """
+    # The serving agent first, so its fallbacks win for a shared model
+    configs = [agent_config] + list((registry or {}).values())
+    fallback_models: Dict[str, List[str]] = {}
+    models = []
+    for config in configs:
+        model_config = config.get('model', {})
+        model = model_config.get('modelName', 'gpt-4o')
+        fallbacks = list(model_config.get('fallbackModels', ()))
+        fallback_models.setdefault(model, fallbacks)
+        models.extend([model] + fallbacks)
+
+    upstreams = agent_config.get('upstreams') or [{
+        "name": "default",
+        "endpointEnv": "AZURE_OPENAI_ENDPOINT",
+        "apiKeyEnv": "AZURE_OPENAI_API_KEY",
+        "deployments": {model: {} for model in models}
+    }]
+
+    targets = []
+    for upstream in upstreams:
+        endpoint = os.getenv(upstream.get('endpointEnv', ''), upstream.get('endpoint'))
+        if not endpoint:
+            logger.warning(f"Upstream {upstream.get('name')} has no endpoint configured, skipping")
+            continue
+        client = make_client(endpoint, os.getenv(upstream.get('apiKeyEnv', ''), ''))
+        for deployment, limits in upstream.get('deployments', {}).items():
+            targets.append(Target(
+                upstream.get('name', endpoint), client, deployment,
+                tokens_per_minute=limits.get('tokensPerMinute'),
+                max_concurrency=limits.get('maxConcurrency')
+            ))
+    # Models no upstream lists (e.g. another agent's) are served by the first endpoint
+    served = {t.deployment for t in targets}
+    for model in dict.fromkeys(models):
+        if targets and model not in served:
+            targets.append(Target(targets[0].endpoint, targets[0].client, model))
+            served.add(model)
+    logger.info(f"Upstream pool: {', '.join(t.key for t in targets)}")
+    return UpstreamPool(targets, resilience, fallback_models)